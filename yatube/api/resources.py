@@ -0,0 +1,178 @@
+"""Поля ресурсов API и запросы под выбранные поля.
+
+Клиент перечисляет нужные поля в ``?fields=id,text,author``. Каждое поле
+знает, какие колонки ему нужны (``only``), какие связи подтянуть JOIN
+(``select_related``) и какие - отдельным запросом (``prefetch_related``),
+поэтому из базы читается ровно то, что попадет в ответ.
+"""
+from django.conf import settings
+from django.db.models import OuterRef, Prefetch, Subquery
+
+from posts.models import Comment
+from posts.views import COMMENTS_ORDERING
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class Field:
+    """Поле ресурса: значение и что для него читать из базы.
+
+    prefetch - функции, возвращающие Prefetch: объект Prefetch меняется
+    при использовании, поэтому на каждый запрос создается новый.
+    """
+
+    def __init__(self, get, columns=(), select=(), prefetch=()):
+        self.get = get
+        self.columns = columns
+        self.select = select
+        self.prefetch = prefetch
+
+
+def _isoformat(name):
+    def get(obj):
+        value = getattr(obj, name)
+        return value.isoformat() if value else None
+    return get
+
+
+def _file_url(name):
+    def get(obj):
+        value = getattr(obj, name)
+        return value.url if value else None
+    return get
+
+
+def _attr(name):
+    def get(obj):
+        return getattr(obj, name)
+    return get
+
+
+class Resource:
+    def __init__(self, fields, default):
+        self.fields = fields
+        self.default = default
+
+    def parse_fields(self, value):
+        """Имена полей из параметра fields, по умолчанию - default."""
+        if not value:
+            return list(self.default)
+        names = list(dict.fromkeys(
+            name.strip() for name in value.split(',') if name.strip()))
+        if not names:
+            raise ApiError(
+                f'Не указано ни одного поля. Доступны: '
+                f'{", ".join(self.fields)}')
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ApiError(
+                f'Неизвестные поля: {", ".join(unknown)}. '
+                f'Доступны: {", ".join(self.fields)}')
+        return names
+
+    def queryset(self, queryset, names, extra_columns=()):
+        """queryset только с колонками и связями выбранных полей.
+
+        extra_columns - колонки, нужные не для ответа (сортировка, курсор).
+        """
+        columns, select, prefetch = ['pk', *extra_columns], [], []
+        for name in names:
+            field = self.fields[name]
+            columns.extend(field.columns)
+            select.extend(field.select)
+            prefetch.extend(make() for make in field.prefetch)
+        queryset = queryset.only(*dict.fromkeys(columns))
+        if select:
+            queryset = queryset.select_related(*dict.fromkeys(select))
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+    def serialize(self, obj, names):
+        return {name: self.fields[name].get(obj) for name in names}
+
+
+def _author_stats(name):
+    def get(user):
+        # Счетчиков может еще не быть, см. posts/utils/counters.py
+        stats = getattr(user, 'stats', None)
+        return getattr(stats, name, 0)
+    return get
+
+
+COMMENT = Resource(
+    fields={
+        'id': Field(_attr('pk'), ['id']),
+        'text': Field(_attr('text'), ['text']),
+        'created': Field(_isoformat('created'), ['created']),
+        'author': Field(lambda comment: comment.author.username,
+                        ['author__username'], select=['author']),
+        'post': Field(_attr('post_id'), ['post']),
+    },
+    default=['id', 'author', 'text', 'created'],
+)
+
+
+def _post_comments():
+    # Последние API_POST_COMMENTS комментариев каждого поста страницы
+    # одним запросом; остальные - через api:post_comments. Срез в
+    # Prefetch Django 2.2 не поддерживает, поэтому лимит - в подзапросе
+    latest = (Comment.objects.filter(post=OuterRef('post'))
+              .order_by(*COMMENTS_ORDERING)
+              .values('pk')[:settings.API_POST_COMMENTS])
+    comments = COMMENT.queryset(
+        Comment.objects.filter(pk__in=Subquery(latest))
+        .order_by(*COMMENTS_ORDERING),
+        COMMENT.default, extra_columns=['post'])
+    return Prefetch('comments', queryset=comments)
+
+
+POST = Resource(
+    fields={
+        'id': Field(_attr('pk'), ['id']),
+        'text': Field(_attr('text'), ['text']),
+        'pub_date': Field(_isoformat('pub_date'), ['pub_date']),
+        'author': Field(lambda post: post.author.username,
+                        ['author__username'], select=['author']),
+        'group': Field(lambda post: post.group.slug if post.group else None,
+                       ['group__slug'], select=['group']),
+        'image': Field(_file_url('image'), ['image']),
+        'thumbnail': Field(_file_url('thumbnail'), ['thumbnail']),
+        'comments': Field(
+            lambda post: [COMMENT.serialize(comment, COMMENT.default)
+                          for comment in post.comments.all()],
+            prefetch=[_post_comments]),
+    },
+    default=['id', 'text', 'pub_date', 'author', 'group'],
+)
+
+GROUP = Resource(
+    fields={
+        'id': Field(_attr('pk'), ['id']),
+        'slug': Field(_attr('slug'), ['slug']),
+        'title': Field(_attr('title'), ['title']),
+        'description': Field(_attr('description'), ['description']),
+        'posts_count': Field(_attr('posts_count'), ['posts_count']),
+        'followers_count': Field(_attr('followers_count'),
+                                 ['followers_count']),
+    },
+    default=['slug', 'title', 'description', 'posts_count'],
+)
+
+PROFILE = Resource(
+    fields={
+        'username': Field(_attr('username'), ['username']),
+        'first_name': Field(_attr('first_name'), ['first_name']),
+        'last_name': Field(_attr('last_name'), ['last_name']),
+        'posts_count': Field(_author_stats('posts_count'),
+                             ['stats__posts_count'], select=['stats']),
+        'followers_count': Field(_author_stats('followers_count'),
+                                 ['stats__followers_count'],
+                                 select=['stats']),
+    },
+    default=['username', 'first_name', 'last_name', 'posts_count'],
+)
@@ -0,0 +1,196 @@
+import base64
+import gzip
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание'
+        )
+        cls.user = User.objects.create_user(
+            username='test_user', first_name='Тест')
+        for number in range(5):
+            cls.post = Post.objects.create(
+                author=cls.user, text=f'Запись #{number}', group=cls.group)
+            Comment.objects.create(post=cls.post, author=cls.user,
+                                   text=f'Комментарий #{number}')
+
+    def setUp(self):
+        self.client = Client()
+
+    def get_json(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return response.status_code, response.json()
+
+    def test_default_fields(self):
+        status, data = self.get_json(reverse('api:post_list'))
+        self.assertEqual(status, 200)
+        self.assertEqual(len(data['results']), 5)
+        self.assertEqual(data['results'][0], {
+            'id': self.post.pk,
+            'text': 'Запись #4',
+            'pub_date': self.post.pub_date.isoformat(),
+            'author': 'test_user',
+            'group': 'test_slug',
+        })
+
+    def test_sparse_fields_read_only_their_columns(self):
+        url = reverse('api:post_list')
+        with self.assertNumQueries(1) as queries:
+            status, data = self.get_json(url, fields='id,author')
+        self.assertEqual(data['results'][0],
+                         {'id': self.post.pk, 'author': 'test_user'})
+        sql = queries.captured_queries[0]['sql']
+        self.assertIn('"auth_user"."username"', sql)
+        self.assertNotIn('"posts_post"."text"', sql)
+        self.assertNotIn('posts_group', sql)
+
+        with self.assertNumQueries(1) as queries:
+            self.get_json(url, fields='id')
+        self.assertNotIn('JOIN', queries.captured_queries[0]['sql'])
+
+    def test_comments_are_prefetched(self):
+        with self.assertNumQueries(2):
+            status, data = self.get_json(reverse('api:post_list'),
+                                         fields='id,comments')
+        self.assertEqual(data['results'][0]['comments'][0]['text'],
+                         'Комментарий #4')
+
+    @override_settings(API_POST_COMMENTS=2)
+    def test_prefetched_comments_are_limited(self):
+        for number in range(3):
+            Comment.objects.create(post=self.post, author=self.user,
+                                   text=f'Еще комментарий #{number}')
+        with self.assertNumQueries(2):
+            status, data = self.get_json(reverse('api:post_list'),
+                                         fields='id,comments')
+        self.assertEqual(
+            [comment['text'] for comment in data['results'][0]['comments']],
+            ['Еще комментарий #2', 'Еще комментарий #1'])
+        self.assertEqual(len(data['results'][1]['comments']), 1)
+
+    def test_invalid_cursor(self):
+        cursors = [
+            'garbage',
+            [2, 'zzz', 'x'],
+            [0, '2020-01-01T00:00:00+00:00', '1'],
+            [1, None, None],
+            [float('inf'), '2020-01-01T00:00:00+00:00', '1'],
+            [2, '2020-01-01T00:00:00+00:00', str(2 ** 63)],
+        ]
+        # Неверная дата; у групп первое поле - slug, он подходит
+        dated = [[2, 'bad', '1']]
+        urls = {
+            reverse('api:post_list'): cursors + dated,
+            reverse('api:post_comments',
+                    kwargs={'post_id': self.post.pk}): cursors + dated,
+            reverse('api:group_list'): cursors,
+        }
+        for url, url_cursors in urls.items():
+            for cursor in url_cursors:
+                if not isinstance(cursor, str):
+                    cursor = base64.urlsafe_b64encode(
+                        json.dumps(cursor).encode()).decode()
+                for direction in ('after', 'before'):
+                    with self.subTest(url=url, cursor=cursor,
+                                      direction=direction):
+                        status, data = self.get_json(
+                            url, **{direction: cursor})
+                        self.assertEqual(status, 400)
+                        self.assertIn('курсор', data['error'])
+
+    def test_cursor_before_first_page(self):
+        cursor = base64.urlsafe_b64encode(json.dumps(
+            [2, '2099-01-01T00:00:00+00:00', '1']).encode()).decode()
+        status, data = self.get_json(reverse('api:post_list'),
+                                     fields='id', before=cursor)
+        self.assertEqual(status, 200)
+        self.assertEqual(len(data['results']), 5)
+        self.assertIsNone(data['previous'])
+
+    def test_unknown_field(self):
+        status, data = self.get_json(reverse('api:post_list'),
+                                     fields='id,password')
+        self.assertEqual(status, 400)
+        self.assertIn('password', data['error'])
+
+    def test_empty_fields(self):
+        for fields in (',,', ' , '):
+            with self.subTest(fields=fields):
+                status, data = self.get_json(reverse('api:post_list'),
+                                             fields=fields)
+                self.assertEqual(status, 400)
+                self.assertIn('Доступны', data['error'])
+
+    def test_cursor_pagination(self):
+        url = reverse('api:post_list')
+        status, first = self.get_json(url, fields='id', limit=3)
+        self.assertEqual(len(first['results']), 3)
+        self.assertIsNone(first['previous'])
+        status, second = self.get_json(url, fields='id', limit=3,
+                                       after=first['next'])
+        self.assertEqual(len(second['results']), 2)
+        self.assertIsNone(second['next'])
+        ids = [post['id'] for post in first['results'] + second['results']]
+        self.assertEqual(
+            ids, list(Post.objects.order_by('-pub_date', '-id')
+                      .values_list('pk', flat=True)))
+
+    def test_filters_and_details(self):
+        other = User.objects.create_user(username='other')
+        Post.objects.create(author=other, text='Чужая запись')
+        status, data = self.get_json(reverse('api:post_list'),
+                                     author='other', fields='text')
+        self.assertEqual(data['results'], [{'text': 'Чужая запись'}])
+        status, data = self.get_json(reverse('api:post_list'),
+                                     group='test_slug', fields='id')
+        self.assertEqual(len(data['results']), 5)
+
+        status, data = self.get_json(
+            reverse('api:post_comments', kwargs={'post_id': self.post.pk}))
+        self.assertEqual([comment['text'] for comment in data['results']],
+                         ['Комментарий #4'])
+        status, data = self.get_json(
+            reverse('api:group_detail', kwargs={'slug': 'test_slug'}),
+            fields='title,posts_count')
+        self.assertEqual(data, {'title': 'Тестовая группа', 'posts_count': 5})
+        status, data = self.get_json(
+            reverse('api:profile_detail', kwargs={'username': 'test_user'}))
+        self.assertEqual(data['first_name'], 'Тест')
+        self.assertEqual(data['posts_count'], 5)
+        status, data = self.get_json(
+            reverse('api:post_detail', kwargs={'post_id': 0}))
+        self.assertEqual(status, 404)
+
+    def test_read_only(self):
+        response = self.client.post(reverse('api:post_list'))
+        self.assertEqual(response.status_code, 405)
+
+    def test_gzip(self):
+        response = self.client.get(reverse('api:post_list'),
+                                   HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(data['results']), 5)
+
+    @override_settings(COMPRESSION_MIN_SIZE=10 ** 6)
+    def test_small_responses_are_not_compressed(self):
+        response = self.client.get(reverse('api:post_list'),
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
@@ -0,0 +1,110 @@
+from functools import wraps
+
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_safe
+
+from posts.models import Comment, Group, Post, User
+from posts.utils.paginator import (COUNT_NONE, FEED_ORDERING, InvalidCursor,
+                                   get_page_context)
+from posts.views import COMMENTS_ORDERING
+
+from .resources import COMMENT, GROUP, POST, PROFILE, ApiError
+
+GROUPS_ORDERING = ('slug', 'id')
+
+
+def api_view(view):
+    """Представление возвращает dict, декоратор делает из него JSON.
+
+    Только GET и HEAD, ошибки - тоже JSON. Ответы сжимает
+    core.compression.CompressionMiddleware.
+    """
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            data = view(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse({'error': str(error)}, status=error.status)
+        except Http404:
+            return JsonResponse({'error': 'Не найдено'}, status=404)
+        return JsonResponse(data, json_dumps_params={'ensure_ascii': False})
+    return wrapper
+
+
+def _page_size(request):
+    value = request.GET.get('limit')
+    if not value:
+        return settings.API_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ApiError('limit должен быть числом')
+    return min(max(limit, 1), settings.API_MAX_PAGE_SIZE)
+
+
+def _paginate(request, resource, queryset, ordering):
+    """Страница по курсору: results, next и previous."""
+    names = resource.parse_fields(request.GET.get('fields'))
+    queryset = resource.queryset(
+        queryset, names,
+        # Колонки сортировки нужны для курсора
+        extra_columns=[field.lstrip('-') for field in ordering])
+    try:
+        page = get_page_context(queryset, request, count_mode=COUNT_NONE,
+                                ordering=ordering,
+                                per_page=_page_size(request), strict=True)
+    except InvalidCursor:
+        raise ApiError('Неверный курсор в after или before')
+    return {
+        'results': [resource.serialize(obj, names) for obj in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }
+
+
+def _detail(request, resource, queryset, **lookup):
+    names = resource.parse_fields(request.GET.get('fields'))
+    obj = get_object_or_404(resource.queryset(queryset, names), **lookup)
+    return resource.serialize(obj, names)
+
+
+@api_view
+def post_list(request):
+    '''Posts, filtered by ?group=<slug> and ?author=<username>'''
+    posts = Post.objects.all()
+    if request.GET.get('group'):
+        posts = posts.filter(group__slug=request.GET['group'])
+    if request.GET.get('author'):
+        posts = posts.filter(author__username=request.GET['author'])
+    return _paginate(request, POST, posts, FEED_ORDERING)
+
+
+@api_view
+def post_detail(request, post_id):
+    return _detail(request, POST, Post.objects.all(), pk=post_id)
+
+
+@api_view
+def post_comments(request, post_id):
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    return _paginate(request, COMMENT, Comment.objects.filter(post_id=post_id),
+                     COMMENTS_ORDERING)
+
+
+@api_view
+def group_list(request):
+    return _paginate(request, GROUP, Group.objects.all(), GROUPS_ORDERING)
+
+
+@api_view
+def group_detail(request, slug):
+    return _detail(request, GROUP, Group.objects.all(), slug=slug)
+
+
+@api_view
+def profile_detail(request, username):
+    return _detail(request, PROFILE, User.objects.filter(is_active=True),
+                   username=username)
@@ -0,0 +1,25 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+from .tasks import requeue
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'task', 'status', 'attempts', 'max_attempts',
+                    'run_at', 'locked_by', 'created')
+    list_filter = ('status', 'task')
+    search_fields = ('task', 'key')
+    readonly_fields = ('payload', 'last_error', 'locked_by', 'locked_at')
+    actions = ('retry',)
+
+    def retry(self, request, queryset):
+        failed = queryset.filter(status=Job.FAILED).values_list(
+            'pk', flat=True)
+        for job_id in failed:
+            requeue(job_id, attempts=0, run_at=timezone.now())
+        self.message_user(request, f'Возвращено в очередь: {len(failed)}')
+    retry.short_description = 'Повторить упавшие задачи'
+
+
+admin.site.register(Job, JobAdmin)
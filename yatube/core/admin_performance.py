@@ -0,0 +1,177 @@
+"""Режим производительности для списков больших таблиц в админке.
+
+PerformanceModeAdmin вместо стандартного поведения ModelAdmin:
+
+  * не считает COUNT(*) по всей таблице (show_full_result_count = False),
+    а число найденных записей считает точно только до
+    ADMIN_EXACT_COUNT_LIMIT; дальше - оценка, см. estimated_count;
+  * сохраняет изменения list_editable одним bulk_update вместо UPDATE
+    и INSERT в журнал на каждую строку, см. bulk_save_list_editable;
+  * поля из autocomplete_fields в list_editable берут выбранный объект
+    из list_select_related, а не отдельным запросом на строку.
+"""
+import json
+
+from django.conf import settings
+from django.contrib.admin.models import CHANGE, LogEntry
+from django.contrib.admin.options import get_content_type_for_model
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, router, transaction
+from django.db.models import Max, Min
+from django.utils.functional import cached_property
+
+
+def table_estimate(model):
+    """Примерное число строк таблицы без прохода по ней.
+
+    PostgreSQL - статистика планировщика, SQLite - sqlite_stat1 после
+    ANALYZE; если статистики нет - разность крайних первичных ключей.
+    """
+    alias = router.db_for_read(model)
+    connection = connections[alias]
+    table = model._meta.db_table
+    try:
+        with transaction.atomic(using=alias), connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                    [table])
+            elif connection.vendor == 'sqlite':
+                cursor.execute(
+                    'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+                    [table])
+            else:
+                cursor.execute('SELECT NULL')
+            row = cursor.fetchone()
+    except DatabaseError:
+        row = None
+    if row and row[0] is not None:
+        # В sqlite_stat1 первое число stat - число строк
+        estimate = int(float(str(row[0]).split()[0]))
+        if estimate > 0:
+            return estimate
+    bounds = model._default_manager.using(alias).aggregate(
+        low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return 0
+    return bounds['high'] - bounds['low'] + 1
+
+
+def estimated_count(queryset, limit):
+    """Точное число записей, если их не больше limit, иначе оценка.
+
+    COUNT по подзапросу с LIMIT останавливается на limit + 1 строке.
+    Для всей таблицы дальше берется table_estimate, для выборки с
+    условием - сам limit: это нижняя граница.
+    """
+    exact = queryset.order_by()[:limit + 1].count()
+    if exact <= limit:
+        return exact
+    if not queryset.query.where:
+        return max(table_estimate(queryset.model), exact)
+    return limit
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        return estimated_count(self.object_list,
+                               settings.ADMIN_EXACT_COUNT_LIMIT)
+
+
+class PreloadedAutocompleteSelect(AutocompleteSelect):
+    """AutocompleteSelect, которому выбранный объект передан заранее."""
+
+    preloaded = ()
+
+    def optgroups(self, name, value, attr=None):
+        selected = {str(v) for v in value
+                    if str(v) not in self.choices.field.empty_values}
+        objects = [obj for obj in self.preloaded if str(obj.pk) in selected]
+        if len(objects) < len(selected):
+            return super().optgroups(name, value, attr)
+        # Как AutocompleteSelect.optgroups, но без запроса
+        default = (None, [], 0)
+        if not self.is_required and not self.allow_multiple_selected:
+            default[1].append(self.create_option(name, '', '', False, 0))
+        for obj in objects:
+            default[1].append(self.create_option(
+                name, obj.pk, self.choices.field.label_from_instance(obj),
+                selected, len(default[1])))
+        return [default]
+
+
+class PerformanceModeAdmin:
+    """Примесь к ModelAdmin для таблиц с миллионами строк."""
+
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if ('widget' not in kwargs
+                and db_field.name in self.get_autocomplete_fields(request)):
+            kwargs['widget'] = PreloadedAutocompleteSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using'))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        form_class = super().get_changelist_form(request, **kwargs)
+
+        class PreloadedForm(form_class):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                for name, field in self.fields.items():
+                    widget = getattr(field.widget, 'widget', field.widget)
+                    if not isinstance(widget, PreloadedAutocompleteSelect):
+                        continue
+                    model_field = self.instance._meta.get_field(name)
+                    if model_field.is_cached(self.instance):
+                        related = model_field.get_cached_value(self.instance)
+                        widget.preloaded = [related] if related else []
+
+        return PreloadedForm
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'POST' or '_save' not in request.POST:
+            return super().changelist_view(request, extra_context)
+        # save_model и log_change только копят изменения, пишутся они
+        # после обработки всей формы
+        request._list_editable_objects = []
+        request._list_editable_log = []
+        with transaction.atomic(using=router.db_for_write(self.model)):
+            response = super().changelist_view(request, extra_context)
+            if request._list_editable_objects:
+                self.bulk_save_list_editable(
+                    request, request._list_editable_objects)
+                LogEntry.objects.bulk_create(request._list_editable_log)
+        return response
+
+    def save_model(self, request, obj, form, change):
+        objects = getattr(request, '_list_editable_objects', None)
+        if objects is None:
+            return super().save_model(request, obj, form, change)
+        objects.append(obj)
+
+    def log_change(self, request, object, message):
+        log = getattr(request, '_list_editable_log', None)
+        if log is None:
+            return super().log_change(request, object, message)
+        log.append(LogEntry(
+            user_id=request.user.pk,
+            content_type_id=get_content_type_for_model(object).pk,
+            object_id=str(object.pk),
+            object_repr=str(object)[:200],
+            action_flag=CHANGE,
+            change_message=(json.dumps(message)
+                            if isinstance(message, list) else message),
+        ))
+
+    def bulk_save_list_editable(self, request, objects):
+        """Один UPDATE ... CASE для всех измененных строк.
+
+        post_save не отправляется: если модель зависит от сигналов,
+        переопределите метод.
+        """
+        self.model._default_manager.bulk_update(objects, self.list_editable)
@@ -0,0 +1,163 @@
+"""ASGI-адаптер для Django 2.2 с ограниченным пулом потоков.
+
+В Django 2.2 нет ни ASGI, ни асинхронных представлений, поэтому
+представления posts и about выполняются как есть, но в пуле из
+ASGI_THREADS потоков. Все, что зависит от скорости клиента, делает
+цикл событий, и поток при этом не занят:
+
+  * тело запроса читается до передачи в Django (большое - во временный
+    файл, как FILE_UPLOAD_MAX_MEMORY_SIZE у Django);
+  * готовый ответ отдается кусками по ASGI_CHUNK_SIZE байт, медленный
+    клиент задерживает только свою корутину.
+
+Поток пула занят только на время работы представления: запросов к
+базе и отрисовки шаблона. После этого ответ закрывается в том же
+потоке, и сигнал request_finished возвращает соединения с базой.
+StreamingHttpResponse - исключение: генератор может обращаться к базе,
+поэтому его куски читаются в том же потоке до конца ответа.
+
+Запуск: ``uvicorn yatube.asgi:application``.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+
+
+def build_environ(scope, body):
+    """WSGI environ из ASGI scope; body - файл с телом запроса."""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin1'),
+        'PATH_INFO': scope['path'].encode().decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('ascii'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': 'HTTP/%s' % scope.get('http_version', '1.1'),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        if name in environ:
+            value = environ[name] + ',' + value
+        environ[name] = value
+    return environ
+
+
+class ASGIHandler:
+    def __init__(self, wsgi_application=None, max_workers=None,
+                 chunk_size=None):
+        self.wsgi_application = wsgi_application or WSGIHandler()
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.ASGI_THREADS,
+            thread_name_prefix='asgi')
+        self.chunk_size = chunk_size or settings.ASGI_CHUNK_SIZE
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемый тип scope: {scope["type"]}')
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        with body:
+            status, headers, content = await loop.run_in_executor(
+                self.executor, self.run_django,
+                build_environ(scope, body), loop, send)
+        if content is None:
+            return
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': headers})
+        for start in range(0, len(content), self.chunk_size):
+            await send({
+                'type': 'http.response.body',
+                'body': content[start:start + self.chunk_size],
+                'more_body': True,
+            })
+        await send({'type': 'http.response.body'})
+
+    async def read_body(self, receive):
+        """Тело запроса в файле или None, если клиент отключился."""
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+        body.seek(0)
+        return body
+
+    def run_django(self, environ, loop, send):
+        """Выполняется в потоке пула.
+
+        Возвращает статус, заголовки и тело ответа. Потоковый ответ
+        отправляется отсюда же, тогда тело - None.
+        """
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [
+                int(status[:3]),
+                [(name.lower().encode('latin1'), value.encode('latin1'))
+                 for name, value in headers],
+            ]
+
+        response = self.wsgi_application(environ, start_response)
+        try:
+            if not getattr(response, 'streaming', False):
+                return started[0], started[1], b''.join(response)
+            self.send_from_thread(loop, send, {
+                'type': 'http.response.start',
+                'status': started[0],
+                'headers': started[1],
+            })
+            for chunk in response:
+                if chunk:
+                    self.send_from_thread(loop, send, {
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            self.send_from_thread(loop, send, {'type': 'http.response.body'})
+            return started[0], started[1], None
+        finally:
+            # request_finished: соединения с базой закрываются в том же
+            # потоке, где были открыты
+            if hasattr(response, 'close'):
+                response.close()
+
+    @staticmethod
+    def send_from_thread(loop, send, message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
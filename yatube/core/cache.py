@@ -0,0 +1,335 @@
+"""Двухуровневый кеш: LRU в памяти процесса перед общим бэкендом.
+
+Подключается в settings.CACHES::
+
+    'default': {
+        'BACKEND': 'core.cache.TieredCache',
+        'OPTIONS': {
+            'SHARED': 'shared',            # алиас общего кеша
+            'LOCAL_MAX_ENTRIES': 1000,     # ограничение LRU по записям
+            'LOCAL_MAX_BYTES': 16 * 2**20, # и по объему
+            'LOCAL_TIMEOUT': 5,            # сколько секунд верим копии
+        },
+    }
+
+Ключи обоих уровней строит database_key (KEY_FUNCTION): в них входит
+имя базы, поэтому тесты и замеры на своей базе не читают и не портят
+карточки рабочей базы, хотя id постов у них совпадают.
+
+Запись идет в оба уровня, чтение - сначала из памяти процесса. Изменения,
+сделанные другими процессами, становятся видны не позже чем через
+LOCAL_TIMEOUT секунд.
+
+get_or_set пересчитывает значение один раз на все процессы, только если
+add и incr общего бэкенда атомарны (memcached, redis - см.
+ATOMIC_BACKENDS или опцию ATOMIC_SHARED). У FileBasedCache они сводятся к
+проверке и записи файла: два процесса могут оба «взять» замок или
+потерять увеличение счетчика. С таким бэкендом пересчет один только
+внутри процесса, а между процессами значение может посчитаться
+несколько раз.
+"""
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_MISSING = object()
+
+# Бэкенды, у которых add и incr атомарны для всех клиентов. LocMemCache
+# атомарен в пределах процесса, но и виден только ему
+ATOMIC_BACKENDS = (
+    'django.core.cache.backends.memcached.MemcachedCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django_redis.cache.RedisCache',
+)
+
+
+@lru_cache(maxsize=None)
+def _namespace(database_name):
+    return hashlib.md5(str(database_name).encode()).hexdigest()[:8]
+
+
+def database_key(key, key_prefix, version):
+    """Ключ кеша в пространстве имен текущей базы default."""
+    name = connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+    return f'{_namespace(name)}:{key_prefix}:{version}:{key}'
+
+
+def is_atomic(cache):
+    """add и incr кеша атомарны для всех процессов, которые его видят."""
+    if isinstance(cache, TieredCache):
+        return cache.atomic_shared
+    backend = type(cache)
+    return f'{backend.__module__}.{backend.__qualname__}' in ATOMIC_BACKENDS
+
+
+class LocalLRU:
+    """Потокобезопасный LRU с ограничением по числу записей и байтам."""
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return _MISSING
+            expires, payload = item
+            if expires is not None and expires <= time.monotonic():
+                self._pop(key)
+                return _MISSING
+            self._data.move_to_end(key)
+        return pickle.loads(payload)
+
+    def set(self, key, value, timeout):
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.max_bytes:
+            self.delete(key)
+            return
+        expires = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._pop(key)
+            self._data[key] = (expires, payload)
+            self._bytes += len(payload)
+            while (len(self._data) > self.max_entries
+                   or self._bytes > self.max_bytes):
+                oldest = next(iter(self._data))
+                self._pop(oldest)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            return self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def size(self):
+        return self._bytes
+
+    def _pop(self, key):
+        item = self._data.pop(key, None)
+        if item is None:
+            return False
+        self._bytes -= len(item[1])
+        return True
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        # Общий кеш создается сразу: close() вызывается из close_caches
+        # во время обхода caches.all(), и новый кеш в этот момент ломает
+        # обход
+        self.shared = caches[options.get('SHARED', 'shared')]
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self.lock_timeout = options.get('LOCK_TIMEOUT', 10)
+        self._atomic_shared = options.get('ATOMIC_SHARED')
+        self.local = LocalLRU(
+            options.get('LOCAL_MAX_ENTRIES', 1000),
+            options.get('LOCAL_MAX_BYTES', 16 * 2 ** 20),
+        )
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = dict.fromkeys(
+            ('local_hits', 'shared_hits', 'misses', 'sets',
+             'recomputes', 'waits'), 0)
+
+    @property
+    def atomic_shared(self):
+        """Можно ли полагаться на add и incr общего кеша между процессами."""
+        if self._atomic_shared is None:
+            return is_atomic(self.shared)
+        return self._atomic_shared
+
+    def _count(self, name, value=1):
+        with self._stats_lock:
+            self._stats[name] += value
+
+    def _local_ttl(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            return self.local_timeout
+        return max(0, min(timeout - time.time(), self.local_timeout))
+
+    def stats(self):
+        """Счетчики этого процесса плюс текущий размер LRU."""
+        with self._stats_lock:
+            result = dict(self._stats)
+        result.update(local_entries=len(self.local),
+                      local_bytes=self.local.size,
+                      local_evictions=self.local.evictions)
+        return result
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats = dict.fromkeys(self._stats, 0)
+        self.local.evictions = 0
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version)
+        if added:
+            self._count('sets')
+            self.local.set(self.make_key(key, version), value,
+                           self._local_ttl(timeout))
+        return added
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_key(key, version)
+        self.validate_key(local_key)
+        value = self.local.get(local_key)
+        if value is not _MISSING:
+            self._count('local_hits')
+            return value
+        value = self.shared.get(key, _MISSING, version)
+        if value is _MISSING:
+            self._count('misses')
+            return default
+        self._count('shared_hits')
+        self.local.set(local_key, value, self.local_timeout)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_key(key, version)
+        self.validate_key(local_key)
+        self.shared.set(key, value, timeout, version)
+        self.local.set(local_key, value, self._local_ttl(timeout))
+        self._count('sets')
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self.local.delete(self.make_key(key, version))
+        return self.shared.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        self.local.delete(self.make_key(key, version))
+        self.shared.delete(key, version)
+
+    def get_many(self, keys, version=None):
+        result = {}
+        missing = []
+        for key in keys:
+            value = self.local.get(self.make_key(key, version))
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                result[key] = value
+        self._count('local_hits', len(result))
+        if missing:
+            found = self.shared.get_many(missing, version)
+            self._count('shared_hits', len(found))
+            self._count('misses', len(missing) - len(found))
+            for key, value in found.items():
+                self.local.set(self.make_key(key, version), value,
+                               self.local_timeout)
+            result.update(found)
+        return result
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version) or []
+        ttl = self._local_ttl(timeout)
+        for key, value in data.items():
+            if key not in failed:
+                self.local.set(self.make_key(key, version), value, ttl)
+        self._count('sets', len(data) - len(failed))
+        return failed
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.local.delete(self.make_key(key, version))
+        self.shared.delete_many(keys, version)
+
+    def has_key(self, key, version=None):
+        if self.local.get(self.make_key(key, version)) is not _MISSING:
+            return True
+        return self.shared.has_key(key, version)
+
+    def incr(self, key, delta=1, version=None):
+        # Атомарно, только если атомарен incr общего кеша, см. atomic_shared
+        value = self.shared.incr(key, delta, version)
+        self.local.set(self.make_key(key, version), value,
+                       self.local_timeout)
+        return value
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """Как BaseCache.get_or_set, но значение пересчитывает один клиент.
+
+        Внутри процесса конкурирующие потоки ждут на общей блокировке,
+        между процессами - на ключе-замке в общем кеше, если его add
+        атомарен (atomic_shared).
+        """
+        value = self.get(key, _MISSING, version)
+        if value is not _MISSING:
+            return value
+        if not callable(default):
+            self.add(key, default, timeout, version)
+            return self.get(key, default, version)
+
+        local_key = self.make_key(key, version)
+        with self._flights_lock:
+            flight = self._flights.setdefault(local_key, threading.Lock())
+        with flight:
+            value = self.get(key, _MISSING, version)
+            if value is not _MISSING:
+                self._count('waits')
+                return value
+            try:
+                return self._compute_once(key, default, timeout, version)
+            finally:
+                with self._flights_lock:
+                    self._flights.pop(local_key, None)
+
+    def _compute_once(self, key, default, timeout, version):
+        if not self.atomic_shared:
+            # Замок в таком кеше ничего не гарантирует
+            return self._compute(key, default, timeout, version)
+        lock_key = f'{key}:lock'
+        deadline = time.monotonic() + self.lock_timeout
+        while not self.shared.add(lock_key, 1, self.lock_timeout, version):
+            # Значение пересчитывает другой процесс - ждем его результат
+            time.sleep(0.05)
+            value = self.shared.get(key, _MISSING, version)
+            if value is not _MISSING:
+                self._count('waits')
+                self.local.set(self.make_key(key, version), value,
+                               self._local_ttl(timeout))
+                return value
+            if time.monotonic() > deadline:
+                break
+        try:
+            return self._compute(key, default, timeout, version)
+        finally:
+            self.shared.delete(lock_key, version)
+
+    def _compute(self, key, default, timeout, version):
+        value = default()
+        self._count('recomputes')
+        if value is not None:
+            self.set(key, value, timeout, version)
+        return value
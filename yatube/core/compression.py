@@ -0,0 +1,206 @@
+"""Сжатие ответов gzip или brotli по заголовку Accept-Encoding.
+
+CompressionMiddleware сжимает все ответы с текстовым Content-Type (см.
+COMPRESSION_CONTENT_TYPES): обычные - целиком, потоковые - по кускам,
+не дожидаясь конца ответа.
+
+brotli сжимает JSON и HTML заметно плотнее gzip, но нужен пакет Brotli;
+без него ответы сжимаются только gzip. Ответы короче
+COMPRESSION_MIN_SIZE байт отдаются как есть: выигрыш меньше заголовков.
+Уровни сжатия - для ответов, которые сжимаются при каждом запросе:
+максимальный уровень brotli в десятки раз медленнее при выигрыше в
+несколько процентов.
+
+Сколько байт ушло клиентам и сколько ушло бы без сжатия, копится по
+именам URL, см. compression_stats. Запросы, не попавшие ни в один URL,
+копятся под одним ключом UNRESOLVED: по пути каждый несуществующий адрес
+заводил бы свою запись до конца жизни процесса.
+"""
+import gzip
+import re
+import threading
+import zlib
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+_CODING = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?\s*$')
+
+UNRESOLVED = '<unresolved>'
+
+_report_lock = threading.Lock()
+_report = defaultdict(lambda: {
+    'responses': 0,
+    'compressed': 0,
+    'bytes_original': 0,
+    'bytes_sent': 0,
+})
+
+
+def encoding_weights(header):
+    """Кодировки из Accept-Encoding и их q."""
+    weights = {}
+    for part in header.split(','):
+        match = _CODING.match(part)
+        if not match:
+            continue
+        coding, q = match.groups()
+        try:
+            weights[coding.lower()] = float(q) if q else 1.0
+        except ValueError:
+            continue
+    return weights
+
+
+def choose_encoding(header):
+    """Кодировка с наибольшим q; при равных brotli предпочтительнее."""
+    available = ['br', 'gzip'] if brotli is not None else ['gzip']
+    weights = encoding_weights(header)
+    ranked = [
+        (weights.get(coding, weights.get('*', 0)), -index, coding)
+        for index, coding in enumerate(available)
+    ]
+    q, _, coding = max(ranked)
+    return coding if q > 0 else None
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data,
+                               quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=settings.COMPRESSION_GZIP_LEVEL)
+
+
+def compress_stream(chunks, encoding):
+    """Сжимает куски по мере поступления.
+
+    После каждого куска сжатые данные сбрасываются: клиент получает их
+    сразу, а не когда наберется буфер компрессора.
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(
+            quality=settings.COMPRESSION_BROTLI_QUALITY)
+        process, flush = compressor.process, compressor.flush
+        finish = compressor.finish
+    else:
+        compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL,
+                                      zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        process, finish = compressor.compress, compressor.flush
+
+        def flush():
+            return compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    for chunk in chunks:
+        data = process(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+
+def _counted(chunks, request, encoding):
+    """Куски как есть; по окончании учитывает их в отчете."""
+    original = sent = 0
+    if encoding is None:
+        for chunk in chunks:
+            original += len(chunk)
+            yield chunk
+        sent = original
+    else:
+        def counting(source):
+            nonlocal original
+            for chunk in source:
+                original += len(chunk)
+                yield chunk
+
+        for data in compress_stream(counting(chunks), encoding):
+            sent += len(data)
+            yield data
+    record(request, original, sent, encoding)
+
+
+def _compressible(response):
+    content_type = response.get('Content-Type', '').split(';')[0].strip()
+    return content_type.startswith(settings.COMPRESSION_CONTENT_TYPES)
+
+
+def compress_response(request, response):
+    """Сжимает ответ, если клиент это принимает."""
+    if response.has_header('Content-Encoding') or not _compressible(response):
+        return response
+    patch_vary_headers(response, ('Accept-Encoding',))
+    encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+
+    if response.streaming:
+        length = response.get('Content-Length')
+        if length and int(length) < settings.COMPRESSION_MIN_SIZE:
+            encoding = None
+        response.streaming_content = _counted(
+            response.streaming_content, request, encoding)
+        if encoding is None:
+            return response
+        del response['Content-Length']
+    else:
+        original = len(response.content)
+        if encoding is None or original < settings.COMPRESSION_MIN_SIZE:
+            record(request, original, original, None)
+            return response
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= original:
+            record(request, original, original, None)
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        record(request, original, len(compressed), encoding)
+
+    response['Content-Encoding'] = encoding
+    # Сжатый ответ не совпадает побайтно с несжатым
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag
+    return response
+
+
+class CompressionMiddleware:
+    """Сжимает ответы всех страниц, см. compress_response.
+
+    Стоит в MIDDLEWARE раньше всех, кто меняет тело ответа.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return compress_response(request, self.get_response(request))
+
+
+def record(request, original, sent, encoding):
+    match = getattr(request, 'resolver_match', None)
+    url_name = match.view_name if match else UNRESOLVED
+    with _report_lock:
+        row = _report[url_name]
+        row['responses'] += 1
+        row['compressed'] += encoding is not None
+        row['bytes_original'] += original
+        row['bytes_sent'] += sent
+
+
+def compression_stats():
+    """Байты без сжатия и отправленные клиентам по именам URL."""
+    with _report_lock:
+        snapshot = {name: dict(row) for name, row in _report.items()}
+    for row in snapshot.values():
+        row['bytes_saved'] = row['bytes_original'] - row['bytes_sent']
+        row['saved_ratio'] = (row['bytes_saved'] / row['bytes_original']
+                              if row['bytes_original'] else 0.0)
+    return snapshot
+
+
+def reset_compression_stats():
+    with _report_lock:
+        _report.clear()
@@ -0,0 +1,222 @@
+"""Пул соединений с базой для бэкендов core.db_backends.
+
+Django держит соединение в каждом потоке и закрывает его в конце
+запроса (CONN_MAX_AGE = 0) либо хранит бессрочно (CONN_MAX_AGE = None)
+без ограничения общего числа. Пул бэкендов core.db_backends вместо
+закрытия возвращает соединение в очередь процесса, и следующий запрос
+берет уже открытое. Настройки - ключ POOL в описании базы::
+
+    'POOL': {
+        'MAX_SIZE': 10,         # соединений на процесс
+        'TIMEOUT': 5,           # сколько ждать свободного, с
+        'IDLE_TIMEOUT': 300,    # простаивающее дольше закрывается
+        'HEALTH_CHECK_AFTER': 30,  # простоявшее дольше проверяется SELECT 1
+    }
+
+Время ожидания соединения попадает в статистику запроса
+(core.profiling) и в сводку pool_stats().
+"""
+import functools
+import logging
+import threading
+import time
+from collections import deque
+
+from django.db.utils import OperationalError
+
+from core.profiling import current_stats
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'MAX_SIZE': 10,
+    'TIMEOUT': 5,
+    'IDLE_TIMEOUT': 300,
+    'HEALTH_CHECK_AFTER': 30,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, alias, max_size, timeout, idle_timeout,
+                 health_check_after):
+        self.alias = alias
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        # (соединение, когда возвращено); берем с конца - самые «теплые»
+        self._idle = deque()
+        self._size = 0
+        self._condition = threading.Condition()
+        self.stats = {
+            'acquired': 0,
+            'created': 0,
+            'closed': 0,
+            'health_check_failures': 0,
+            'timeouts': 0,
+            'wait_total': 0.0,
+            'wait_max': 0.0,
+        }
+
+    def acquire(self, connect):
+        """Свободное соединение пула или новое через connect().
+
+        Возвращает соединение и время ожидания в секундах.
+        """
+        started = time.perf_counter()
+        while True:
+            conn = self._take(started)
+            if conn is None:
+                try:
+                    conn = connect()
+                except Exception:
+                    self._forget()
+                    raise
+                self._count('created')
+                break
+            if self._healthy(*conn):
+                conn = conn[0]
+                break
+            self._count('health_check_failures')
+            self._discard(conn[0])
+        wait = time.perf_counter() - started
+        with self._condition:
+            self.stats['acquired'] += 1
+            self.stats['wait_total'] += wait
+            self.stats['wait_max'] = max(self.stats['wait_max'], wait)
+        return conn, wait
+
+    def _take(self, started):
+        """Свободная пара (соединение, время возврата) или None, если
+        можно открыть новое. Ждет, пока пул заполнен."""
+        with self._condition:
+            while True:
+                self._expire_idle()
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None
+                remaining = self.timeout - (time.perf_counter() - started)
+                if remaining <= 0:
+                    self.stats['timeouts'] += 1
+                    raise PoolTimeout(
+                        f'Нет свободного соединения с {self.alias} '
+                        f'за {self.timeout} с (пул: {self.max_size})')
+                self._condition.wait(remaining)
+
+    def _expire_idle(self):
+        deadline = time.monotonic() - self.idle_timeout
+        while self._idle and self._idle[0][1] < deadline:
+            conn, _ = self._idle.popleft()
+            self._close(conn)
+            self._size -= 1
+
+    def _healthy(self, conn, released_at):
+        if time.monotonic() - released_at < self.health_check_after:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1')
+            cursor.close()
+        except Exception as error:
+            logger.warning('Соединение с %s не отвечает: %s',
+                           self.alias, error)
+            return False
+        return True
+
+    def release(self, conn):
+        """Возвращает соединение; незавершенная транзакция откатывается."""
+        try:
+            conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+        with self._condition:
+            self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    def _discard(self, conn):
+        self._close(conn)
+        self._forget()
+
+    def _forget(self):
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self.stats['closed'] += 1
+
+    def _count(self, name):
+        with self._condition:
+            self.stats[name] += 1
+
+    def snapshot(self):
+        with self._condition:
+            stats = dict(self.stats)
+            stats.update(size=self._size, idle=len(self._idle),
+                         in_use=self._size - len(self._idle),
+                         max_size=self.max_size)
+        acquired = stats['acquired'] or 1
+        stats['wait_ms_avg'] = stats.pop('wait_total') * 1000 / acquired
+        stats['wait_ms_max'] = stats.pop('wait_max') * 1000
+        return stats
+
+
+def get_pool(alias, settings_dict):
+    with _pools_lock:
+        if alias not in _pools:
+            options = {**DEFAULTS, **settings_dict.get('POOL', {})}
+            _pools[alias] = ConnectionPool(
+                alias,
+                max_size=options['MAX_SIZE'],
+                timeout=options['TIMEOUT'],
+                idle_timeout=options['IDLE_TIMEOUT'],
+                health_check_after=options['HEALTH_CHECK_AFTER'])
+        return _pools[alias]
+
+
+def pool_stats():
+    """Сводка по пулам процесса: размер, ожидание, проверки."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.snapshot() for alias, pool in pools.items()}
+
+
+class PooledDatabaseWrapperMixin:
+    """Примесь к DatabaseWrapper: соединения берутся из пула и
+    возвращаются в него вместо закрытия."""
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        connect = functools.partial(super().get_new_connection, conn_params)
+        conn, wait = self.pool.acquire(connect)
+        stats = current_stats()
+        if stats is not None:
+            stats.pool_wait += wait
+        return conn
+
+    def _close(self):
+        if self.connection is None:
+            return
+        if self.in_atomic_block:
+            # Обертка продолжит ссылаться на соединение до конца блока,
+            # поэтому в пул его отдавать нельзя
+            self.pool._discard(self.connection)
+            return
+        self.pool.release(self.connection)
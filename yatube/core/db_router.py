@@ -0,0 +1,148 @@
+"""Чтение с реплик, запись в основную базу.
+
+Реплики - алиасы из settings.DATABASE_REPLICAS. С них читают только
+GET- и HEAD-запросы, которые пропустил ReplicaRoutingMiddleware; команды,
+фоновые задачи и тесты всегда работают с основной базой.
+
+Read-your-writes:
+  * после первой записи в запросе его чтения идут в основную базу;
+  * после запроса с записью браузер получает cookie, и следующие
+    REPLICA_STICKY_SECONDS секунд его запросы читают из основной базы.
+
+Отставание реплики измеряется по отметке ReplicationHeartbeat: команда
+``manage.py replication_heartbeat`` раз в секунду пишет время в основную
+базу, а роутер сравнивает с ним копию на реплике. Реплика, отставшая
+больше чем на REPLICA_MAX_LAG секунд, недоступная или без отметки,
+пропускается до следующей проверки через REPLICA_LAG_CHECK_INTERVAL.
+Если подходящих реплик нет, чтение идет в основную базу.
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+from django.utils import timezone
+
+from core.models import ReplicationHeartbeat
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+_state = threading.local()
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Разрешает чтение с реплик в текущем потоке на время блока.
+
+    Возвращает состояние, у которого wrote - была ли запись.
+    """
+    _state.use_replicas = enabled
+    _state.wrote = False
+    try:
+        yield _state
+    finally:
+        _state.use_replicas = False
+
+
+def replication_lag(alias):
+    """Отставание реплики в секундах или None, если отметки нет."""
+    beat = (ReplicationHeartbeat.objects.using(alias)
+            .values_list('beat', flat=True).first())
+    if beat is None:
+        return None
+    return (timezone.now() - beat).total_seconds()
+
+
+def write_heartbeat():
+    ReplicationHeartbeat.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+        pk=1, defaults={'beat': timezone.now()})
+
+
+class LagMonitor:
+    """Кеширует в процессе результат проверки отставания реплик."""
+
+    def __init__(self):
+        self._checked = {}
+        self._lock = threading.Lock()
+
+    def is_fresh(self, alias):
+        now = time.monotonic()
+        with self._lock:
+            checked = self._checked.get(alias)
+        if checked and now - checked[0] < settings.REPLICA_LAG_CHECK_INTERVAL:
+            return checked[1]
+        fresh = self.check(alias)
+        with self._lock:
+            self._checked[alias] = (now, fresh)
+        return fresh
+
+    def check(self, alias):
+        try:
+            lag = replication_lag(alias)
+        except DatabaseError as error:
+            logger.warning('Реплика %s недоступна: %s', alias, error)
+            return False
+        if lag is None or lag > settings.REPLICA_MAX_LAG:
+            logger.warning('Реплика %s отстает: %s с', alias, lag)
+            return False
+        return True
+
+    def reset(self):
+        with self._lock:
+            self._checked.clear()
+
+
+monitor = LagMonitor()
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not getattr(_state, 'use_replicas', False):
+            return DEFAULT_DB_ALIAS
+        # Связанные объекты читаем из той же базы, что и исходный
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        replicas = [alias for alias in settings.DATABASE_REPLICAS
+                    if monitor.is_fresh(alias)]
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Дальше в этом запросе читаем свои же записи
+        _state.use_replicas = False
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Во всех базах одни и те же данные
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схему на реплики приносит репликация
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        enabled = bool(
+            settings.DATABASE_REPLICAS
+            and request.method in SAFE_METHODS
+            and settings.REPLICA_PIN_COOKIE not in request.COOKIES)
+        with replica_reads(enabled) as state:
+            response = self.get_response(request)
+            wrote = state.wrote
+        if settings.DATABASE_REPLICAS and (
+                wrote or request.method not in SAFE_METHODS):
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax')
+        return response
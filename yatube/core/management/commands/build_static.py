@@ -0,0 +1,41 @@
+import json
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.management.commands import collectstatic
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from core.staticfiles import BundledManifestStorage
+
+
+class Command(BaseCommand):
+    help = ('Собирает статику в STATIC_ROOT: наборы из STATIC_BUNDLES, '
+            'сжатие CSS/JS, отпечатки в именах и манифест')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить старые файлы из STATIC_ROOT перед сборкой')
+
+    def handle(self, *args, **options):
+        storage = BundledManifestStorage()
+        # collectstatic с нашим хранилищем, что бы ни стояло в
+        # STATICFILES_STORAGE
+        command = collectstatic.Command()
+        command.storage = storage
+        call_command(command, interactive=False, clear=options['clear'],
+                     verbosity=0)
+
+        with storage.open(storage.manifest_name) as manifest:
+            paths = json.load(manifest)['paths']
+        for name, sources in settings.STATIC_BUNDLES.items():
+            original = sum(os.path.getsize(finders.find(source))
+                           for source in sources)
+            built = storage.size(paths[name])
+            self.stdout.write(
+                f'{paths[name]}: {len(sources)} файл(а), '
+                f'{original} -> {built} байт')
+        self.stdout.write(self.style.SUCCESS(
+            f'Файлов в манифесте: {len(paths)}, {storage.location}'))
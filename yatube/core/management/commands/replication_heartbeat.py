@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.db_router import write_heartbeat
+
+
+class Command(BaseCommand):
+    help = ('Пишет отметку времени в основную базу; по ее копии на '
+            'репликах роутер измеряет их отставание')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Пауза между отметками, с')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Записать одну отметку и выйти')
+
+    def handle(self, *args, **options):
+        while True:
+            write_heartbeat()
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,41 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import tasks
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди core.Job'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.JOBS_WORKERS,
+            help='Число воркеров')
+        parser.add_argument(
+            '--pool', choices=(tasks.POOL_THREAD, tasks.POOL_PROCESS),
+            default=tasks.POOL_THREAD,
+            help='Воркеры-потоки или воркеры-процессы')
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Пауза между проверками пустой очереди, с')
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Завершиться, когда очередь опустеет')
+
+    def handle(self, *args, **options):
+        stop = tasks.stop_event(options['pool'])
+
+        def shutdown(signum, frame):
+            # Начатые задания дорабатываются, новые не берутся
+            self.stdout.write('Остановка воркеров...')
+            stop.set()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+        self.stdout.write(
+            f"Воркеров: {options['concurrency']} ({options['pool']})")
+        tasks.work(options['concurrency'], pool=options['pool'],
+                   poll_interval=options['poll_interval'],
+                   burst=options['burst'], stop=stop)
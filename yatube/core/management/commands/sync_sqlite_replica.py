@@ -0,0 +1,44 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.db_router import write_heartbeat
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файлы реплик - замена '
+            'репликации для локальной проверки роутера')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            help='Повторять копирование с этой паузой (имитация '
+                 'асинхронной репликации с отставанием), с')
+
+    def handle(self, *args, **options):
+        replicas = [connections[alias].settings_dict['NAME']
+                    for alias in settings.DATABASE_REPLICAS
+                    if connections[alias].vendor == 'sqlite']
+        if (connections[DEFAULT_DB_ALIAS].vendor != 'sqlite'
+                or not replicas):
+            raise CommandError('Нужны основная база и реплики на SQLite')
+        primary = connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+        while True:
+            write_heartbeat()
+            source = sqlite3.connect(primary)
+            try:
+                for name in replicas:
+                    target = sqlite3.connect(name)
+                    try:
+                        source.backup(target)
+                    finally:
+                        target.close()
+            finally:
+                source.close()
+            self.stdout.write(f'Реплик обновлено: {len(replicas)}')
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReplicationHeartbeat',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('beat', models.DateTimeField(verbose_name='Время отметки')),
+            ],
+            options={
+                'verbose_name': 'Отметка репликации',
+                'verbose_name_plural': 'Отметки репликации',
+            },
+        ),
+    ]
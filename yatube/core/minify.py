@@ -0,0 +1,88 @@
+"""Удаление лишних пробелов из HTML-шаблонов, CSS и JavaScript.
+
+minify_html применяется к тексту шаблона до разбора (см.
+core/template_loaders.py), поэтому стоит один раз на шаблон, а не на
+каждый ответ; с CachedLoader - один раз на процесс. minify_css и
+minify_js применяются при сборке статики, см. core/staticfiles.py.
+
+Правила minify_html безопасны для верстки:
+
+  * любая последовательность пробельных символов сводится к одному
+    символу (переводу строки, если он в ней был): браузер показывает
+    их одинаково;
+  * HTML-комментарии удаляются, кроме условных (<!--[if ...]>) и тех,
+    что содержат теги шаблона;
+  * содержимое <pre>, <textarea>, <script> и <style>, а также теги
+    шаблона ({% %}, {{ }}, {# #}) не меняются.
+"""
+import re
+
+_PRESERVED = re.compile(
+    r'(<(pre|textarea|script|style)\b.*?</\2\s*>'
+    r'|\{%.*?%\}|\{\{.*?\}\}|\{#.*?#\})',
+    re.IGNORECASE | re.DOTALL)
+_COMMENT = re.compile(r'<!--(?!\[if).*?-->', re.DOTALL)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _collapse(match):
+    return '\n' if '\n' in match.group() else ' '
+
+
+def _minify_text(text):
+    text = _COMMENT.sub(
+        lambda match: match.group() if '{' in match.group() else '', text)
+    return _WHITESPACE.sub(_collapse, text)
+
+
+def minify_html(source):
+    parts = []
+    position = 0
+    for match in _PRESERVED.finditer(source):
+        parts.append(_minify_text(source[position:match.start()]))
+        parts.append(match.group())
+        position = match.end()
+    parts.append(_minify_text(source[position:]))
+    return ''.join(parts)
+
+
+_CSS_TOKENS = re.compile(
+    r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*!.*?\*/)|/\*.*?\*/',
+    re.DOTALL)
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,])\s*')
+
+
+def _minify_css_text(text):
+    text = _WHITESPACE.sub(' ', text)
+    text = _CSS_PUNCTUATION.sub(r'\1', text)
+    return text.replace(': ', ':').replace(';}', '}')
+
+
+def minify_css(source):
+    """Без комментариев и лишних пробелов; строки и лицензии (/*! */)
+    не меняются.
+
+    Пробелы убираются только вокруг { } ; , и после двоеточия: вокруг
+    + и - они значимы в calc(), перед двоеточием - в селекторах.
+    """
+    parts = []
+    position = 0
+    for match in _CSS_TOKENS.finditer(source):
+        parts.append(_minify_css_text(source[position:match.start()]))
+        # Строки и лицензии остаются как есть, комментарии выбрасываются
+        parts.append(match.group(1) or '')
+        position = match.end()
+    parts.append(_minify_css_text(source[position:]))
+    return ''.join(parts).strip()
+
+
+def minify_js(source):
+    """Без отступов, пустых строк и строк-комментариев.
+
+    Переводы строк сохраняются: от них зависит автоматическая
+    расстановка точек с запятой, а разбирать JavaScript целиком
+    (строки, регулярные выражения) ради нескольких процентов не стоит.
+    """
+    lines = (line.strip() for line in source.splitlines())
+    return '\n'.join(line for line in lines
+                     if line and not line.startswith('//'))
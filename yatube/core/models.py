@@ -11,3 +11,66 @@ class CreatedModel(models.Model):
     class Meta:
         # Это абстрактная модель:
         abstract = True
+
+
+class Job(CreatedModel):
+    """Фоновая задача в очереди, см. core/tasks.py."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    )
+
+    task = models.CharField('Задача', max_length=200)
+    # Аргументы задачи в JSON: {"args": [...], "kwargs": {...}}
+    payload = models.TextField('Аргументы', default='{}')
+    key = models.CharField(
+        'Ключ идемпотентности',
+        max_length=200,
+        blank=True,
+        null=True)
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED)
+    run_at = models.DateTimeField('Выполнить после')
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveIntegerField('Максимум попыток')
+    locked_by = models.CharField('Воркер', max_length=100, blank=True)
+    locked_at = models.DateTimeField('Взята в работу', blank=True, null=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+
+    class Meta:
+        ordering = ('run_at', 'id')
+        constraints = [
+            # Одна и та же задача не ставится в очередь дважды, пока
+            # первая не взята в работу
+            models.UniqueConstraint(
+                fields=['key'],
+                condition=models.Q(status='queued'),
+                name='unique_queued_job_key'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'run_at', 'id'],
+                         name='job_status_run_at_idx'),
+        ]
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+
+    def __str__(self):
+        return f'{self.task} #{self.pk}'
+
+
+class ReplicationHeartbeat(models.Model):
+    """Отметка времени, которую пишет в основную базу команда
+    replication_heartbeat; по ее копии на реплике видно отставание
+    реплики, см. core/db_router.py."""
+    beat = models.DateTimeField('Время отметки')
+
+    class Meta:
+        verbose_name = 'Отметка репликации'
+        verbose_name_plural = 'Отметки репликации'
@@ -0,0 +1,215 @@
+"""Профилирование запросов: число SQL-запросов, время БД и шаблонов.
+
+QueryProfilingMiddleware собирает статистику каждого запроса, кладет ее
+в заголовки ответа (X-Query-Count и др.) и в скользящий отчет по имени
+URL, а также проверяет бюджеты из settings.QUERY_BUDGETS. Время
+отдельных шаблонов и include собирает core.template_loaders.
+
+Запросы, не попавшие ни в один URL, идут в отчет под одним ключом
+UNRESOLVED, а не по пути: иначе каждый несуществующий адрес заводил бы
+свою запись до конца жизни процесса.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+UNRESOLVED = '<unresolved>'
+
+_local = threading.local()
+_report_lock = threading.Lock()
+_report = defaultdict(lambda: deque(maxlen=settings.QUERY_REPORT_SIZE))
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def fingerprint(sql):
+    """SQL без литералов: одинаковые запросы с разными значениями."""
+    return _LITERALS.sub('?', sql)
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = []
+        self.template_time = 0.0
+        # Ожидание соединения из пула, см. core/db_pool.py
+        self.pool_wait = 0.0
+        # Имя шаблона -> [отрисовок, полное время, собственное время]
+        self.templates = defaultdict(lambda: [0, 0.0, 0.0])
+        self._template_stack = []
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+    @property
+    def sql_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    def duplicates(self):
+        """Отпечатки запросов, выполненных больше одного раза."""
+        counter = Counter(fingerprint(sql) for sql, _ in self.queries)
+        return {sql: count for sql, count in counter.items() if count > 1}
+
+
+def current_stats():
+    """Статистика текущего запроса или None вне middleware."""
+    return getattr(_local, 'stats', None)
+
+
+class template_timer:
+    """Добавляет время отрисовки шаблона к статистике запроса.
+
+    Вложенные отрисовки (include, render_to_string внутри тега)
+    учитываются в общем времени один раз - во внешнем шаблоне. Для
+    шаблона с именем копятся также число отрисовок, полное время и
+    собственное время - без вложенных шаблонов.
+    """
+
+    def __init__(self, name=None):
+        self.name = name
+
+    def __enter__(self):
+        self.stats = current_stats()
+        if self.stats is not None:
+            self.stats._template_stack.append(self)
+            self.nested = 0.0
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.stats is None:
+            return
+        elapsed = time.perf_counter() - self.started
+        stack = self.stats._template_stack
+        stack.pop()
+        if stack:
+            stack[-1].nested += elapsed
+        else:
+            self.stats.template_time += elapsed
+        if self.name:
+            row = self.stats.templates[self.name]
+            row[0] += 1
+            row[1] += elapsed
+            row[2] += elapsed - self.nested
+
+
+def _templates_summary(rows):
+    """Шаблоны, дольше всех отрисовывавшиеся сами, в среднем на запрос."""
+    totals = defaultdict(lambda: [0, 0.0, 0.0])
+    for row in rows:
+        for name, values in row['templates'].items():
+            for index, value in enumerate(values):
+                totals[name][index] += value
+    top = sorted(totals.items(), key=lambda item: item[1][2],
+                 reverse=True)[:settings.TEMPLATE_REPORT_TOP]
+    return {
+        name: {
+            'renders_avg': count / len(rows),
+            'ms_avg': total / len(rows),
+            'self_ms_avg': own / len(rows),
+        }
+        for name, (count, total, own) in top
+    }
+
+
+def report():
+    """Сводка по последним запросам для каждого имени URL."""
+    with _report_lock:
+        snapshot = {name: list(rows) for name, rows in _report.items()}
+    summary = {}
+    for name, rows in snapshot.items():
+        counts = sorted(row['queries'] for row in rows)
+        duplicates = Counter()
+        for row in rows:
+            duplicates.update(row['duplicates'])
+        summary[name] = {
+            'requests': len(rows),
+            'queries_avg': sum(counts) / len(counts),
+            'queries_max': counts[-1],
+            'sql_ms_avg': sum(row['sql_ms'] for row in rows) / len(rows),
+            'template_ms_avg': (sum(row['template_ms'] for row in rows)
+                                / len(rows)),
+            'pool_wait_ms_avg': (sum(row['pool_wait_ms'] for row in rows)
+                                 / len(rows)),
+            'budget': settings.QUERY_BUDGETS.get(name),
+            'duplicates': dict(duplicates.most_common(5)),
+            'templates': _templates_summary(rows),
+        }
+    return summary
+
+
+def reset_report():
+    with _report_lock:
+        _report.clear()
+
+
+class QueryProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        _local.stats = stats
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(stats.record_query))
+                response = self.get_response(request)
+        finally:
+            _local.stats = None
+
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.view_name if match else UNRESOLVED
+        duplicates = stats.duplicates()
+        with _report_lock:
+            _report[url_name].append({
+                'queries': stats.query_count,
+                'sql_ms': stats.sql_time * 1000,
+                'template_ms': stats.template_time * 1000,
+                'pool_wait_ms': stats.pool_wait * 1000,
+                'duplicates': duplicates,
+                'templates': {
+                    name: (count, total * 1000, own * 1000)
+                    for name, (count, total, own) in stats.templates.items()
+                },
+            })
+        if settings.QUERY_PROFILING_HEADERS:
+            response['X-Query-Count'] = stats.query_count
+            response['X-Query-Time-Ms'] = f'{stats.sql_time * 1000:.2f}'
+            response['X-Template-Time-Ms'] = (
+                f'{stats.template_time * 1000:.2f}')
+            response['X-DB-Pool-Wait-Ms'] = f'{stats.pool_wait * 1000:.2f}'
+            response['X-Duplicate-Queries'] = sum(
+                count - 1 for count in duplicates.values())
+        self.check_budget(url_name, stats)
+        return response
+
+    def check_budget(self, url_name, stats):
+        budget = settings.QUERY_BUDGETS.get(url_name)
+        if budget is None or stats.query_count <= budget:
+            return
+        message = (f'{url_name}: {stats.query_count} SQL-запросов '
+                   f'при бюджете {budget}')
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
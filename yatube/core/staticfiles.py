@@ -0,0 +1,80 @@
+"""Сборка статики: наборы файлов, минификация и отпечатки в именах.
+
+STATIC_BUNDLES описывает наборы - файл, склеенный из нескольких
+исходников в STATICFILES_DIRS::
+
+    STATIC_BUNDLES = {
+        'css/site.css': ['css/bootstrap.min.css', 'css/yatube.css'],
+    }
+
+Команда build_static собирает статику в STATIC_ROOT хранилищем
+BundledManifestStorage: наборы склеиваются и сжимаются (core/minify.py),
+затем все файлы получают копию с хешем содержимого в имени
+(site.3f2a9c1b0d4e.css), а соответствие имен пишется в манифест
+staticfiles.json.
+
+Шаблоны подключают наборы тегом {% bundle %} (core/templatetags/assets.py)
+и остальные файлы обычным {% static %}. С BundledManifestStorage в
+STATICFILES_STORAGE (settings_production.py) оба берут имя из манифеста,
+и файл можно кешировать навсегда: при изменении меняется имя. Без него -
+исходники по отдельности, как при разработке.
+"""
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.utils.module_loading import import_string
+
+from core.minify import minify_css, minify_js
+
+MINIFIERS = {
+    '.css': minify_css,
+    '.js': minify_js,
+}
+
+# Отпечаток ManifestStaticFilesStorage - 12 символов md5 перед расширением
+FINGERPRINT_RE = re.compile(r'\.[0-9a-f]{12}(?:\.[^/.]+)?$')
+
+
+def is_fingerprinted(name):
+    return FINGERPRINT_RE.search(name) is not None
+
+
+def build_bundle(name):
+    """Склеенные и сжатые исходники набора name."""
+    minify = MINIFIERS.get(name[name.rfind('.'):], lambda source: source)
+    parts = []
+    for source in settings.STATIC_BUNDLES[name]:
+        path = finders.find(source)
+        if path is None:
+            raise ImproperlyConfigured(
+                f'Файл {source} из набора {name} не найден')
+        with open(path, encoding='utf-8') as source_file:
+            parts.append(minify(source_file.read()))
+    # ; между скриптами: файл без нее в конце иначе склеится со
+    # следующим в одно выражение
+    separator = ';\n' if name.endswith('.js') else '\n'
+    return separator.join(parts) + '\n'
+
+
+def bundles_are_built():
+    """Подключать наборы целиком, а не исходники по отдельности."""
+    return issubclass(import_string(settings.STATICFILES_STORAGE),
+                      BundledManifestStorage)
+
+
+class BundledManifestStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage, который перед хешированием собирает
+    наборы из STATIC_BUNDLES."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for name in settings.STATIC_BUNDLES:
+                if self.exists(name):
+                    self.delete(name)
+                self.save(name, ContentFile(build_bundle(name).encode()))
+                paths[name] = (self, name)
+        yield from super().post_process(paths, dry_run, **options)
@@ -0,0 +1,109 @@
+"""Хранилище медиафайлов с именами по содержимому.
+
+ContentAddressedStorage сохраняет файл под именем из sha256 его байтов:
+``posts/ab/cd/abcd...ef.jpg``. Каталог (upload_to поля) сохраняется,
+расширение тоже, исходное имя файла отбрасывается. Два уровня каталогов
+по первым символам хеша не дают одному каталогу разрастись.
+
+Отсюда два следствия:
+
+  * одинаковые файлы хранятся один раз - повторное сохранение просто
+    возвращает имя уже записанного;
+  * файл под таким именем никогда не меняется, поэтому его можно отдавать
+    с ``Cache-Control: immutable`` (см. core.views.serve_media, для nginx -
+    тот же заголовок на location /media/).
+
+Файлы не удаляются вместе с постами: другой пост может ссылаться на тот
+же файл. Лишние файлы убирает команда gc_media, см. sweep.
+"""
+import hashlib
+import os
+import re
+import time
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# Два уровня по два символа хеша: 65536 каталогов
+SHARD_LEVELS = 2
+SHARD_WIDTH = 2
+
+CONTENT_NAME_RE = re.compile(
+    r'(?:^|/)' + r'[0-9a-f]{%d}/' % SHARD_WIDTH * SHARD_LEVELS
+    + r'(?P<digest>[0-9a-f]{64})(?:\.\w+)?$')
+
+
+def content_name(directory, digest, extension):
+    """posts, abcd...ef, .jpg -> posts/ab/cd/abcd...ef.jpg"""
+    shards = [digest[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH]
+              for i in range(SHARD_LEVELS)]
+    return '/'.join(filter(None, [directory, *shards,
+                                  digest + extension.lower()]))
+
+
+def is_content_addressed(name):
+    return CONTENT_NAME_RE.search(name) is not None
+
+
+class _AlreadyStored(Exception):
+    pass
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        directory, basename = os.path.split(name)
+        name = content_name(directory, digest.hexdigest(),
+                            os.path.splitext(basename)[1])
+        if self.exists(name):
+            # Свежая дата изменения: gc_media, который уже собрал ссылки,
+            # не удалит файл, на который сейчас сошлется новый пост
+            os.utime(self.path(name))
+            return name
+        try:
+            return self._save(name, content)
+        except _AlreadyStored:
+            # Тот же файл одновременно записал другой процесс
+            return name
+
+    def get_available_name(self, name, max_length=None):
+        # Занятое имя значит, что такой файл уже есть: другое не нужно
+        if self.exists(name):
+            raise _AlreadyStored(name)
+        return name
+
+
+def sweep(storage, directory, referenced, min_age, dry_run=False):
+    """Удаляет из directory файлы, которых нет в referenced.
+
+    Файлы моложе min_age секунд не трогаются: их могли записать, но еще
+    не сохранить ссылку на них в базе. Возвращает (число файлов, байты).
+    """
+    removed = freed = 0
+    deadline = time.time() - min_age
+    directories, files = storage.listdir(directory)
+    for filename in files:
+        name = f'{directory.rstrip("/")}/{filename}'
+        if name in referenced:
+            continue
+        if storage.get_modified_time(name).timestamp() > deadline:
+            continue
+        freed += storage.size(name)
+        removed += 1
+        if not dry_run:
+            storage.delete(name)
+    for subdirectory in directories:
+        sub_removed, sub_freed = sweep(
+            storage, f'{directory.rstrip("/")}/{subdirectory}', referenced,
+            min_age, dry_run)
+        removed += sub_removed
+        freed += sub_freed
+    return removed, freed
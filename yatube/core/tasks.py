@@ -0,0 +1,257 @@
+"""Очередь фоновых задач на таблице core.Job.
+
+Задача - функция с декоратором ``@task`` из модуля ``tasks.py``
+приложения. ``enqueue`` записывает задание в базу в той же транзакции,
+что и основные изменения, поэтому воркер увидит его только после
+фиксации. Воркер (``manage.py run_jobs``) выполняет задания в пуле
+потоков или процессов; упавшее задание повторяется с экспоненциальной
+задержкой, пока не кончатся попытки. Выполненные задания удаляются,
+оставшиеся с ошибкой видны в админке.
+
+При JOBS_EAGER задачи выполняются сразу при постановке в очередь.
+"""
+import functools
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from core.models import Job
+
+logger = logging.getLogger(__name__)
+
+POOL_THREAD = 'thread'
+POOL_PROCESS = 'process'
+
+_registry = {}
+
+
+class UnknownTask(Exception):
+    pass
+
+
+class Task:
+    def __init__(self, func, name, max_attempts=None):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, key=None, delay=None, **kwargs):
+        return enqueue(self.name, *args, key=key, delay=delay, **kwargs)
+
+
+def task(func=None, *, name=None, max_attempts=None):
+    """Регистрирует функцию как фоновую задачу.
+
+    Задача должна быть идемпотентной: при сбое воркера или повторе после
+    ошибки она может выполниться больше одного раза.
+    """
+    def register(func):
+        registered = Task(func, name or f'{func.__module__}.{func.__name__}',
+                          max_attempts)
+        _registry[registered.name] = registered
+        return registered
+
+    return register(func) if func else register
+
+
+def get_task(name):
+    if name not in _registry:
+        autodiscover_modules('tasks')
+    try:
+        return _registry[name]
+    except KeyError:
+        raise UnknownTask(name)
+
+
+def enqueue(name, *args, key=None, delay=None, **kwargs):
+    """Ставит задачу в очередь.
+
+    Если задание с тем же ``key`` еще ждет в очереди, второе не создается:
+    повторные сохранения объекта схлопываются в одно выполнение.
+    """
+    registered = get_task(name)
+    if settings.JOBS_EAGER:
+        registered(*args, **kwargs)
+        return
+    job = Job(
+        task=name,
+        payload=json.dumps({'args': args, 'kwargs': kwargs}),
+        key=key,
+        run_at=timezone.now() + (delay or timedelta()),
+        max_attempts=registered.max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+    # Один INSERT без предварительной проверки; дубликат по ключу
+    # отбрасывает уникальный индекс unique_queued_job_key
+    Job.objects.bulk_create([job], ignore_conflicts=True)
+
+
+def backoff(attempts):
+    """Задержка перед повтором: 2^(n-1) * JOBS_RETRY_BACKOFF с потолком.
+
+    Случайный множитель разводит повторы заданий, упавших одновременно.
+    """
+    delay = min(settings.JOBS_RETRY_BACKOFF * 2 ** (attempts - 1),
+                settings.JOBS_RETRY_BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.5, 1))
+
+
+def requeue(job_id, **fields):
+    """Возвращает задание в очередь."""
+    try:
+        with transaction.atomic():
+            Job.objects.filter(pk=job_id).update(
+                status=Job.QUEUED, locked_by='', locked_at=None, **fields)
+    except IntegrityError:
+        # В очереди уже есть задание с тем же ключом - оно и выполнит работу
+        Job.objects.filter(pk=job_id).delete()
+
+
+def requeue_stale():
+    """Возвращает в очередь задания, зависшие у упавших воркеров."""
+    deadline = timezone.now() - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    stale = list(Job.objects.filter(
+        status=Job.RUNNING, locked_at__lt=deadline,
+    ).values_list('pk', flat=True))
+    for job_id in stale:
+        requeue(job_id)
+    return len(stale)
+
+
+class Worker:
+    def __init__(self, name=None):
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+
+    def claim(self):
+        """Забирает одно готовое к выполнению задание или возвращает None.
+
+        Задание забирает тот воркер, чей UPDATE первым сменил статус.
+        """
+        now = timezone.now()
+        candidates = Job.objects.filter(
+            status=Job.QUEUED, run_at__lte=now,
+        ).values_list('pk', flat=True)[:10]
+        for job_id in candidates:
+            claimed = Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+                status=Job.RUNNING, locked_by=self.name, locked_at=now,
+                attempts=F('attempts') + 1)
+            if claimed:
+                return Job.objects.get(pk=job_id)
+        return None
+
+    def execute(self, job):
+        """Выполняет задание. Возвращает True при успехе."""
+        payload = json.loads(job.payload)
+        try:
+            get_task(job.task)(*payload.get('args', ()),
+                               **payload.get('kwargs', {}))
+        except UnknownTask:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.FAILED, last_error=f'Неизвестная задача {job.task}')
+            logger.error('Неизвестная задача %s (#%s)', job.task, job.pk)
+            return False
+        except Exception:
+            self.retry_or_fail(job, traceback.format_exc())
+            return False
+        Job.objects.filter(pk=job.pk).delete()
+        return True
+
+    def retry_or_fail(self, job, error):
+        if job.attempts >= job.max_attempts:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.FAILED, last_error=error)
+            logger.error('Задание %s не выполнено за %s попыток:\n%s',
+                         job, job.attempts, error)
+            return
+        requeue(job.pk, run_at=timezone.now() + backoff(job.attempts),
+                last_error=error)
+        logger.warning('Задание %s упало, попытка %s из %s',
+                       job, job.attempts, job.max_attempts)
+
+    def run_once(self):
+        """Выполняет одно задание. False - если очередь пуста."""
+        job = self.claim()
+        if job is None:
+            return False
+        self.execute(job)
+        return True
+
+    def run(self, stop, poll_interval=1.0, burst=False):
+        """Выполняет задания, пока не выставлен stop.
+
+        В режиме burst воркер завершается, когда очередь опустела.
+        """
+        try:
+            while not stop.is_set():
+                if self.run_once():
+                    continue
+                if burst:
+                    break
+                stop.wait(poll_interval)
+        finally:
+            connections.close_all()
+
+
+def run_pending():
+    """Выполняет все готовые задания в текущем потоке (тесты, отладка).
+    """
+    worker = Worker('inline')
+    done = 0
+    while worker.run_once():
+        done += 1
+    return done
+
+
+def _run_process(stop, poll_interval, burst):
+    django.setup()
+    Worker().run(stop, poll_interval, burst)
+
+
+def stop_event(pool):
+    """Событие остановки, видимое воркерам выбранного пула."""
+    if pool == POOL_PROCESS:
+        return multiprocessing.get_context('spawn').Event()
+    return threading.Event()
+
+
+def work(concurrency, pool=POOL_THREAD, poll_interval=1.0, burst=False,
+         stop=None):
+    """Запускает concurrency воркеров в потоках или процессах и ждет их.
+    """
+    requeue_stale()
+    stop = stop or stop_event(pool)
+    if pool == POOL_PROCESS:
+        # Дочерние процессы открывают свои соединения
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        workers = [context.Process(target=_run_process,
+                                   args=(stop, poll_interval, burst))
+                   for _ in range(concurrency)]
+    else:
+        workers = [
+            threading.Thread(
+                target=Worker(f'{socket.gethostname()}:{os.getpid()}:'
+                              f'{number}').run,
+                args=(stop, poll_interval, burst))
+            for number in range(concurrency)
+        ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
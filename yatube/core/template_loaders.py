@@ -0,0 +1,78 @@
+"""Загрузчик шаблонов с замером времени отрисовки каждого шаблона.
+
+Оборачивает обычные загрузчики::
+
+    'loaders': [
+        ('core.template_loaders.ProfilingLoader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
+В продакшене вместо него CachedLoader (см. yatube/settings_production.py):
+шаблоны разбираются один раз, а время отрисовки по-прежнему попадает в
+статистику core.profiling - по каждому шаблону, включая вложенные через
+include.
+
+При TEMPLATE_MINIFY_HTML из HTML-шаблонов перед разбором убираются
+лишние пробелы, см. core/minify.py.
+"""
+from django.conf import settings
+from django.template import Template, TemplateDoesNotExist
+from django.template.loaders import cached
+from django.template.loaders.base import Loader
+
+from core.minify import minify_html
+from core.profiling import template_timer
+
+
+class ProfiledTemplate(Template):
+    def render(self, context):
+        with template_timer(self.name or '<string>'):
+            return super().render(context)
+
+
+class BaseProfilingLoader(Loader):
+    """Создает ProfiledTemplate вместо Template."""
+
+    def get_template(self, template_name, skip=None):
+        # Как Loader.get_template, но с классом ProfiledTemplate
+        tried = []
+        for origin in self.get_template_sources(template_name):
+            if skip is not None and origin in skip:
+                tried.append((origin, 'Skipped'))
+                continue
+            try:
+                contents = self.get_contents(origin)
+            except TemplateDoesNotExist:
+                tried.append((origin, 'Source does not exist'))
+                continue
+            if (settings.TEMPLATE_MINIFY_HTML
+                    and origin.template_name.endswith('.html')):
+                contents = minify_html(contents)
+            return ProfiledTemplate(contents, origin, origin.template_name,
+                                    self.engine)
+        raise TemplateDoesNotExist(template_name, tried=tried)
+
+
+class ProfilingLoader(BaseProfilingLoader):
+    """Обертка над загрузчиками, шаблоны читаются при каждом запросе."""
+
+    def __init__(self, engine, loaders):
+        super().__init__(engine)
+        self.loaders = engine.get_template_loaders(loaders)
+
+    def get_template_sources(self, template_name):
+        for loader in self.loaders:
+            yield from loader.get_template_sources(template_name)
+
+    def get_contents(self, origin):
+        return origin.loader.get_contents(origin)
+
+    def reset(self):
+        for loader in self.loaders:
+            loader.reset()
+
+
+class CachedLoader(cached.Loader, BaseProfilingLoader):
+    """cached.Loader: шаблон разбирается один раз на процесс."""
@@ -0,0 +1,28 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from core.staticfiles import bundles_are_built
+
+register = template.Library()
+
+TAGS = {
+    '.css': '<link rel="stylesheet" href="{}">',
+    '.js': '<script src="{}" defer></script>',
+}
+
+
+@register.simple_tag
+def bundle(name):
+    """Подключает набор из STATIC_BUNDLES, см. core/staticfiles.py.
+
+    После build_static - один файл с отпечатком в имени, иначе исходники
+    по отдельности.
+    """
+    tag = TAGS[name[name.rfind('.'):]]
+    if bundles_are_built():
+        return format_html(tag, static(name))
+    return format_html_join(
+        '\n', tag, ((static(source),)
+                    for source in settings.STATIC_BUNDLES[name]))
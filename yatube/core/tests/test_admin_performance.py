@@ -0,0 +1,97 @@
+from django.contrib.admin.models import LogEntry
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.admin_performance import estimated_count, table_estimate
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class EstimatedCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        for number in range(5):
+            Post.objects.create(author=cls.user, text=f'Пост {number}')
+
+    def test_exact_below_limit(self):
+        self.assertEqual(estimated_count(Post.objects.all(), 10), 5)
+
+    def test_estimate_above_limit(self):
+        self.assertEqual(estimated_count(Post.objects.all(), 3),
+                         table_estimate(Post))
+        self.assertGreaterEqual(table_estimate(Post), 5)
+        # С условием - нижняя граница
+        self.assertEqual(
+            estimated_count(Post.objects.filter(author=self.user), 3), 3)
+
+
+class PostAdminTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.other_group = Group.objects.create(
+            title='Другая', slug='other', description='Описание')
+        cls.user = User.objects.create_user(username='test_user')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {number}',
+                                group=cls.group)
+            for number in range(3)
+        ]
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:posts_post_changelist')
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        # Сессия, пользователь, ограниченный COUNT и сами посты: группы
+        # для виджетов autocomplete берутся из list_select_related
+        with self.assertNumQueries(4) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('LIMIT 10001', queries.captured_queries[2]['sql'])
+        self.assertContains(
+            response, f'<option value="{self.group.pk}" selected>Группа',
+            count=len(self.posts))
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=2)
+    def test_large_table_uses_estimate(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['cl'].result_count,
+                         table_estimate(Post))
+
+    def test_list_editable_is_one_update(self):
+        data = {
+            'form-TOTAL_FORMS': 3,
+            'form-INITIAL_FORMS': 3,
+            'form-MIN_NUM_FORMS': 0,
+            'form-MAX_NUM_FORMS': 1000,
+            '_save': 'Сохранить',
+        }
+        for index, post in enumerate(self.posts):
+            data[f'form-{index}-id'] = post.pk
+            data[f'form-{index}-group'] = (
+                self.other_group.pk if index else self.group.pk)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, 302)
+        updates = [query['sql'] for query in queries.captured_queries
+                   if query['sql'].startswith('UPDATE "posts_post"')]
+        self.assertEqual(len(updates), 1)
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual((self.group.posts_count,
+                          self.other_group.posts_count), (1, 2))
+        self.assertEqual(
+            Post.objects.filter(group=self.other_group).count(), 2)
+        self.assertEqual(LogEntry.objects.count(), 2)
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+
+from django.http import StreamingHttpResponse
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from core.asgi import ASGIHandler
+from yatube.asgi import application
+
+
+def call(app, scope, body_parts=(b'',)):
+    """Вызывает ASGI-приложение, возвращает отправленные сообщения."""
+    messages = list(body_parts)
+    sent = []
+
+    async def receive():
+        body = messages.pop(0)
+        return {'type': 'http.request', 'body': body,
+                'more_body': bool(messages)}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent
+
+
+def http_scope(path, method='GET', headers=()):
+    return {'type': 'http', 'method': method, 'path': path,
+            'query_string': b'a=1', 'headers': list(headers)}
+
+
+class ASGIHandlerTest(SimpleTestCase):
+    def test_environ_and_chunked_body(self):
+        seen = {}
+
+        def wsgi_app(environ, start_response):
+            seen.update(environ, body=environ['wsgi.input'].read())
+            start_response('201 Created', [('X-Test', '1')])
+            return [b'x' * 10]
+
+        sent = call(ASGIHandler(wsgi_app, max_workers=1, chunk_size=4),
+                    http_scope('/путь/', 'POST', [
+                        (b'content-type', b'text/plain'),
+                        (b'x-forwarded-for', b'a'),
+                        (b'x-forwarded-for', b'b')]),
+                    body_parts=[b'he', b'llo'])
+        self.assertEqual(seen['body'], b'hello')
+        self.assertEqual(seen['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(seen['HTTP_X_FORWARDED_FOR'], 'a,b')
+        self.assertEqual(seen['QUERY_STRING'], 'a=1')
+        self.assertEqual(sent[0], {'type': 'http.response.start',
+                                   'status': 201,
+                                   'headers': [(b'x-test', b'1')]})
+        self.assertEqual([message.get('body') for message in sent[1:]],
+                         [b'xxxx', b'xxxx', b'xx', None])
+
+    def test_response_is_closed_in_worker_thread(self):
+        threads = []
+
+        class Body(list):
+            def close(self):
+                threads.append(threading.current_thread().name)
+
+        def wsgi_app(environ, start_response):
+            threads.append(threading.current_thread().name)
+            start_response('200 OK', [])
+            return Body([b'ok'])
+
+        call(ASGIHandler(wsgi_app, max_workers=1), http_scope('/'))
+        self.assertEqual(len(set(threads)), 1)
+        self.assertTrue(threads[0].startswith('asgi'))
+
+    def test_streaming_response(self):
+        def wsgi_app(environ, start_response):
+            response = StreamingHttpResponse(iter([b'a', b'', b'b']))
+            start_response('200 OK', [])
+            return response
+
+        sent = call(ASGIHandler(wsgi_app, max_workers=1), http_scope('/'))
+        self.assertEqual([message.get('body') for message in sent[1:]],
+                         [b'a', b'b', None])
+
+    def test_django_page(self):
+        sent = call(application, dict(
+            http_scope(reverse('about:author')),
+            headers=[(b'host', b'testserver')]))
+        self.assertEqual(sent[0]['status'], 200)
+        content = b''.join(message.get('body', b'') for message in sent[1:])
+        self.assertIn(b'<html', content)
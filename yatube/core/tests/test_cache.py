@@ -0,0 +1,147 @@
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.core.signals import request_finished
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+
+from core.cache import is_atomic
+from posts.utils.fragments import VERSION_KEY, bump_version
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.TieredCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_MAX_ENTRIES': 3,
+            'LOCAL_MAX_BYTES': 2 ** 20,
+            'LOCAL_TIMEOUT': 60,
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tiered-cache-tests',
+    },
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class TieredCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.cache = caches['default']
+        self.cache.clear()
+        self.cache.reset_stats()
+
+    def test_write_through_and_local_hit(self):
+        self.cache.set('key', 'value')
+        self.assertEqual(caches['shared'].get('key'), 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.stats()['local_hits'], 1)
+
+    def test_shared_hit_fills_local_tier(self):
+        caches['shared'].set('key', 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        stats = self.cache.stats()
+        self.assertEqual((stats['shared_hits'], stats['local_hits']), (1, 1))
+
+    def test_local_tier_is_bounded(self):
+        for number in range(5):
+            self.cache.set(f'key{number}', number)
+        stats = self.cache.stats()
+        self.assertEqual(stats['local_entries'], 3)
+        self.assertEqual(stats['local_evictions'], 2)
+        # Вытесненные из памяти значения остаются в общем кеше
+        self.assertEqual(self.cache.get('key0'), 0)
+
+    def test_per_key_timeout(self):
+        self.cache.set('short', 'value', timeout=0.05)
+        self.cache.set('long', 'value', timeout=60)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertEqual(self.cache.get('long'), 'value')
+
+    def test_close_after_local_hit(self):
+        """Запрос, прочитавший только память процесса, закрывается."""
+        with override_settings(CACHES=TEST_CACHES):
+            caches['default'].local.set(
+                caches['default'].make_key('key'), 'value', 60)
+            self.assertEqual(caches['default'].get('key'), 'value')
+            request_finished.send(sender=self.__class__)
+
+    def test_get_or_set_recomputes_once(self):
+        """Конкурирующие потоки дожидаются единственного пересчета."""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    self.cache.get_or_set('hot', compute)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 5)
+        self.assertEqual(self.cache.stats()['recomputes'], 1)
+
+
+@override_settings(CACHES={
+    **TEST_CACHES,
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': tempfile.gettempdir() + '/tiered-cache-tests',
+    },
+})
+class NonAtomicSharedCacheTest(SimpleTestCase):
+    """Файловый кеш не дает атомарных add и incr между процессами."""
+
+    def setUp(self):
+        self.cache = caches['default']
+        self.cache.clear()
+        self.addCleanup(shutil.rmtree, caches['shared']._dir, True)
+
+    def test_backend_is_not_atomic(self):
+        self.assertFalse(self.cache.atomic_shared)
+        self.assertFalse(is_atomic(self.cache))
+        with self.settings(CACHES=TEST_CACHES):
+            self.assertTrue(is_atomic(caches['default']))
+
+    def test_get_or_set_does_not_lock_in_shared_cache(self):
+        with mock.patch.object(self.cache.shared, 'add') as add:
+            self.assertEqual(self.cache.get_or_set('key', lambda: 1), 1)
+        add.assert_not_called()
+        self.assertEqual(caches['shared'].get('key'), 1)
+
+    def test_fragment_version_is_replaced_not_incremented(self):
+        key = VERSION_KEY.format(kind='post', pk=1)
+        future = int(time.time() * 1000) + 10 ** 6
+        self.cache.set(key, future, None)
+        with mock.patch.object(self.cache, 'incr') as incr:
+            bump_version('post', 1)
+        incr.assert_not_called()
+        self.assertEqual(self.cache.get(key), future + 1)
+
+
+class DatabaseKeyTest(SimpleTestCase):
+    """Ключи кеша разных баз не пересекаются."""
+
+    def test_other_database_does_not_see_values(self):
+        cache.set('database-key-test', 'value')
+        self.addCleanup(cache.delete, 'database-key-test')
+        with mock.patch.dict(connection.settings_dict, NAME='other.sqlite3'):
+            self.assertIsNone(cache.get('database-key-test'))
+            self.assertIsNone(caches['shared'].get('database-key-test'))
+        self.assertEqual(cache.get('database-key-test'), 'value')
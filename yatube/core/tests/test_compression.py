@@ -0,0 +1,132 @@
+import gzip
+import zlib
+from unittest import mock, skipIf
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from core import compression
+from posts.models import Post
+
+User = get_user_model()
+
+
+class ChooseEncodingTest(SimpleTestCase):
+    def test_quality_values(self):
+        self.assertEqual(
+            compression.encoding_weights('gzip;q=0.5, br, identity;q=0'),
+            {'gzip': 0.5, 'br': 1.0, 'identity': 0.0})
+
+    def test_brotli_is_optional(self):
+        with mock.patch.object(compression, 'brotli', None):
+            self.assertEqual(compression.choose_encoding('br, gzip'), 'gzip')
+            self.assertIsNone(compression.choose_encoding('br'))
+            self.assertIsNone(compression.choose_encoding(''))
+            self.assertEqual(compression.choose_encoding('*'), 'gzip')
+        with mock.patch.object(compression, 'brotli', mock.Mock()):
+            self.assertEqual(compression.choose_encoding('gzip, br'), 'br')
+            self.assertEqual(
+                compression.choose_encoding('gzip, br;q=0.5'), 'gzip')
+
+
+class CompressionMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        user = User.objects.create_user(username='test_user')
+        for index in range(5):
+            Post.objects.create(author=user, text=f'Пост номер {index}')
+
+    def setUp(self):
+        compression.reset_compression_stats()
+
+    def request(self, **headers):
+        return RequestFactory().get('/', **headers)
+
+    def test_pages_are_compressed(self):
+        response = self.client.get(reverse('posts:index'),
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn('Пост номер 4',
+                      gzip.decompress(response.content).decode())
+
+        stats = compression.compression_stats()['posts:index']
+        self.assertEqual(stats['responses'], 1)
+        self.assertEqual(stats['compressed'], 1)
+        self.assertEqual(stats['bytes_sent'], len(response.content))
+        self.assertGreater(stats['saved_ratio'], 0.5)
+
+    def test_uncompressed_responses_are_counted(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        stats = compression.compression_stats()['posts:index']
+        self.assertEqual(stats['compressed'], 0)
+        self.assertEqual(stats['bytes_sent'], stats['bytes_original'])
+        self.assertEqual(stats['bytes_saved'], 0)
+
+    def test_binary_content_is_skipped(self):
+        response = HttpResponse(b'\0' * 1000, content_type='image/png')
+        response = compression.compress_response(
+            self.request(HTTP_ACCEPT_ENCODING='gzip'), response)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertFalse(response.has_header('Vary'))
+
+    def test_streaming_response(self):
+        chunks = [f'строка {index}\n'.encode() * 50 for index in range(20)]
+        response = StreamingHttpResponse(iter(chunks),
+                                         content_type='text/csv')
+        response['Content-Length'] = str(sum(map(len, chunks)))
+        response = compression.compress_response(
+            self.request(HTTP_ACCEPT_ENCODING='gzip'), response)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+
+        stream = response.streaming_content
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        # Первый кусок можно распаковать, не дожидаясь остальных
+        self.assertEqual(decompressor.decompress(next(stream)), chunks[0])
+        body = chunks[0] + b''.join(
+            decompressor.decompress(data) for data in stream)
+        self.assertEqual(body, b''.join(chunks))
+
+        stats = compression.compression_stats()[compression.UNRESOLVED]
+        self.assertEqual(stats['bytes_original'], len(body))
+        self.assertLess(stats['bytes_sent'], len(body) / 5)
+
+    def test_small_streaming_response_is_not_compressed(self):
+        response = StreamingHttpResponse(iter([b'short']),
+                                         content_type='text/plain')
+        response['Content-Length'] = '5'
+        response = compression.compress_response(
+            self.request(HTTP_ACCEPT_ENCODING='gzip'), response)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), b'short')
+
+    @skipIf(compression.brotli is None, 'нужен пакет Brotli')
+    def test_brotli_streaming(self):
+        chunks = [b'<p>brotli</p>' * 100] * 3
+        response = compression.compress_response(
+            self.request(HTTP_ACCEPT_ENCODING='br'),
+            StreamingHttpResponse(iter(chunks)))
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(
+            compression.brotli.decompress(
+                b''.join(response.streaming_content)),
+            b''.join(chunks))
+
+    def test_unknown_urls_share_one_entry(self):
+        for number in range(50):
+            self.client.get(f'/nope-{number}/', HTTP_ACCEPT_ENCODING='gzip')
+        stats = compression.compression_stats()
+        self.assertEqual(list(stats), [compression.UNRESOLVED])
+        self.assertEqual(stats[compression.UNRESOLVED]['responses'], 50)
+
+    def test_report_view(self):
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        self.client.get(reverse('posts:index'), HTTP_ACCEPT_ENCODING='gzip')
+        response = self.client.get(reverse('compression_report'))
+        self.assertIn('posts:index', response.json())
@@ -0,0 +1,134 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from core import db_pool
+from core.db_backends.sqlite3.base import DatabaseWrapper
+from core.db_pool import ConnectionPool, PoolTimeout
+
+User = get_user_model()
+
+
+def make_pool(**options):
+    params = dict(max_size=2, timeout=0.05, idle_timeout=60,
+                  health_check_after=60)
+    params.update(options)
+    return ConnectionPool('test', **params)
+
+
+def connect():
+    return sqlite3.connect(':memory:', check_same_thread=False)
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    def test_released_connection_is_reused(self):
+        pool = make_pool()
+        conn, _ = pool.acquire(connect)
+        pool.release(conn)
+        self.assertIs(pool.acquire(connect)[0], conn)
+        stats = pool.snapshot()
+        self.assertEqual(stats['created'], 1)
+        self.assertEqual(stats['acquired'], 2)
+        self.assertEqual(stats['in_use'], 1)
+
+    def test_max_size_and_timeout(self):
+        pool = make_pool()
+        pool.acquire(connect)
+        pool.acquire(connect)
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(connect)
+        stats = pool.snapshot()
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertEqual(stats['size'], 2)
+
+    def test_waiter_gets_released_connection(self):
+        pool = make_pool(max_size=1, timeout=5)
+        conn, _ = pool.acquire(connect)
+        timer = threading.Timer(0.05, pool.release, [conn])
+        timer.start()
+        acquired, wait = pool.acquire(connect)
+        timer.join()
+        self.assertIs(acquired, conn)
+        self.assertGreater(wait, 0.01)
+        self.assertGreater(pool.snapshot()['wait_ms_max'], 10)
+
+    def test_idle_connections_expire(self):
+        pool = make_pool(idle_timeout=0)
+        conn, _ = pool.acquire(connect)
+        pool.release(conn)
+        time.sleep(0.01)
+        self.assertIsNot(pool.acquire(connect)[0], conn)
+        stats = pool.snapshot()
+        self.assertEqual(stats['closed'], 1)
+        self.assertEqual(stats['size'], 1)
+
+    def test_broken_connection_is_replaced(self):
+        pool = make_pool(health_check_after=0)
+        conn, _ = pool.acquire(connect)
+        pool.release(conn)
+        # rollback на закрытом соединении sqlite3 падает, поэтому
+        # «ломаем» его уже в пуле
+        conn.close()
+        self.assertIsNot(pool.acquire(connect)[0], conn)
+        stats = pool.snapshot()
+        self.assertEqual(stats['health_check_failures'], 1)
+        self.assertEqual(stats['size'], 1)
+
+    def test_failed_connect_frees_slot(self):
+        pool = make_pool(max_size=1)
+
+        def fail():
+            raise sqlite3.OperationalError('нет базы')
+
+        with self.assertRaises(sqlite3.OperationalError):
+            pool.acquire(fail)
+        self.assertEqual(pool.snapshot()['size'], 0)
+        pool.acquire(connect)
+
+
+class PooledBackendTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_dict = dict(
+            connection.settings_dict,
+            ENGINE='core.db_backends.sqlite3',
+            NAME=os.path.join(directory.name, 'pool.sqlite3'),
+            POOL={'MAX_SIZE': 1})
+        self.wrapper = DatabaseWrapper(settings_dict, alias='pool-test')
+        self.addCleanup(db_pool._pools.pop, 'pool-test', None)
+
+    def test_close_returns_connection_to_pool(self):
+        self.wrapper.ensure_connection()
+        raw = self.wrapper.connection
+        self.wrapper.close()
+        self.assertIsNone(self.wrapper.connection)
+
+        self.wrapper.ensure_connection()
+        self.assertIs(self.wrapper.connection, raw)
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.wrapper.close()
+        stats = db_pool.pool_stats()['pool-test']
+        self.assertEqual(stats['created'], 1)
+        self.assertEqual(stats['idle'], 1)
+        self.assertEqual(stats['max_size'], 1)
+
+
+class PoolReportTest(TestCase):
+    def test_report_is_staff_only(self):
+        url = reverse('db_pool_report')
+        client = Client()
+        self.assertEqual(client.get(url).status_code, 302)
+        client.force_login(
+            User.objects.create_user(username='admin', is_staff=True))
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.json(), dict)
@@ -0,0 +1,89 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from core.db_router import (LagMonitor, PrimaryReplicaRouter,
+                            ReplicaRoutingMiddleware, monitor, replica_reads,
+                            replication_lag, write_heartbeat)
+from core.models import ReplicationHeartbeat
+from posts.models import Post
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+        patcher = mock.patch.object(monitor, 'is_fresh', return_value=True)
+        self.is_fresh = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_read_your_writes_within_request(self):
+        with replica_reads() as state:
+            self.assertEqual(self.router.db_for_read(Post), 'replica')
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+            self.assertTrue(state.wrote)
+
+    def test_lagging_replica_is_skipped(self):
+        self.is_fresh.return_value = False
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def get_with_middleware(self, request):
+        """Ответ и база, выбранная для чтения внутри запроса."""
+        chosen = []
+
+        def view(request):
+            chosen.append(self.router.db_for_read(Post))
+            if request.method == 'POST':
+                self.router.db_for_write(Post)
+            return HttpResponse()
+
+        response = ReplicaRoutingMiddleware(view)(request)
+        return response, chosen[0]
+
+    def test_write_pins_reader_to_primary(self):
+        response, db = self.get_with_middleware(self.factory.get('/'))
+        self.assertEqual(db, 'replica')
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+        response, db = self.get_with_middleware(self.factory.post('/'))
+        self.assertEqual(db, 'default')
+        cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_STICKY_SECONDS)
+
+        request = self.factory.get('/')
+        request.COOKIES[settings.REPLICA_PIN_COOKIE] = '1'
+        self.assertEqual(self.get_with_middleware(request)[1], 'default')
+
+
+@override_settings(REPLICA_MAX_LAG=10)
+class ReplicationLagTest(TestCase):
+    def test_heartbeat_lag(self):
+        self.assertIsNone(replication_lag('default'))
+        self.assertFalse(LagMonitor().check('default'))
+
+        write_heartbeat()
+        self.assertLess(replication_lag('default'), 1)
+        self.assertTrue(LagMonitor().check('default'))
+
+        ReplicationHeartbeat.objects.update(
+            beat=timezone.now() - timedelta(minutes=1))
+        self.assertGreater(replication_lag('default'), 10)
+        self.assertFalse(LagMonitor().check('default'))
+
+    def test_check_result_is_cached(self):
+        lag_monitor = LagMonitor()
+        with mock.patch.object(lag_monitor, 'check',
+                               return_value=True) as check:
+            lag_monitor.is_fresh('replica')
+            lag_monitor.is_fresh('replica')
+        self.assertEqual(check.call_count, 1)
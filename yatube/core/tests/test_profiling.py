@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.profiling import (UNRESOLVED, QueryBudgetExceeded, report,
+                            reset_report)
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(QUERY_PROFILING_HEADERS=True)
+class QueryProfilingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        reset_report()
+        self.client = Client()
+
+    def test_headers(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertGreater(int(response['X-Query-Count']), 0)
+        self.assertGreater(float(response['X-Template-Time-Ms']), 0)
+        self.assertIn('X-Query-Time-Ms', response)
+        self.assertEqual(response['X-Duplicate-Queries'], '0')
+
+    def test_report_is_grouped_by_url_name(self):
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index') + '?page=1')
+        self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        summary = report()
+        self.assertEqual(summary['posts:index']['requests'], 2)
+        self.assertEqual(summary['posts:post_detail']['requests'], 1)
+
+    def test_unknown_urls_share_one_entry(self):
+        for number in range(20):
+            self.client.get(f'/nope-{number}/')
+        summary = report()
+        self.assertEqual(list(summary), [UNRESOLVED])
+        self.assertEqual(summary[UNRESOLVED]['requests'], 20)
+
+    @override_settings(QUERY_BUDGETS={'posts:index': 0},
+                       QUERY_BUDGET_STRICT=True)
+    def test_strict_budget_raises(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('posts:index'))
+
+    def test_report_view_is_for_staff_only(self):
+        response = self.client.get(reverse('query_report'))
+        self.assertEqual(response.status_code, 302)
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        self.client.force_login(admin)
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('query_report'))
+        self.assertIn('posts:index', response.json())
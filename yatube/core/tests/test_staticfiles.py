@@ -0,0 +1,98 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.minify import minify_css, minify_js
+from core.staticfiles import build_bundle, is_fingerprinted
+
+BUNDLED_STORAGE = 'core.staticfiles.BundledManifestStorage'
+
+
+class MinifyAssetsTest(SimpleTestCase):
+    def test_css(self):
+        source = ('/* комментарий */\n.a , .b > .c {\n  color : red ;\n'
+                  '  width: calc(100% - 2px);\n'
+                  '  background: url("data:image/svg+xml,a  b;c");\n}\n'
+                  '@media (max-width: 600px) { .a { margin: 0 } }\n')
+        self.assertEqual(
+            minify_css(source),
+            '.a,.b > .c{color :red;width:calc(100% - 2px);'
+            'background:url("data:image/svg+xml,a  b;c")}'
+            '@media (max-width:600px){.a{margin:0}}')
+
+    def test_js_keeps_line_breaks(self):
+        source = ('// комментарий\nvar a = 1\n\n    var b = "// не '
+                  'комментарий"\n')
+        self.assertEqual(minify_js(source),
+                         'var a = 1\nvar b = "// не комментарий"')
+
+    def test_bundle_is_concatenated(self):
+        css = build_bundle('css/site.css')
+        self.assertIn('.navbar-yatube{background-color:lightskyblue}', css)
+        self.assertLess(css.index('bootstrap'), css.index('navbar-yatube'))
+        js = build_bundle('js/site.js')
+        self.assertNotIn('\n  ', js)
+        self.assertTrue(js.endswith(';\n'))
+
+
+class BuildStaticTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(
+            STATIC_ROOT=cls.static_root)
+        cls.settings_override.enable()
+        output = StringIO()
+        call_command('build_static', stdout=output)
+        cls.output = output.getvalue()
+        with open(os.path.join(cls.static_root, 'staticfiles.json')) as file:
+            cls.manifest = json.load(file)['paths']
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.static_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_manifest(self):
+        for name in ('css/site.css', 'js/site.js', 'img/logo.png'):
+            with self.subTest(name=name):
+                self.assertTrue(is_fingerprinted(self.manifest[name]))
+                self.assertTrue(os.path.exists(
+                    os.path.join(self.static_root, self.manifest[name])))
+        self.assertIn(self.manifest['css/site.css'], self.output)
+
+    def test_pages_use_sources_without_build(self):
+        response = self.client.get(reverse('posts:index'))
+        for source in ('css/bootstrap.min.css', 'css/yatube.css',
+                       'js/comments.js'):
+            with self.subTest(source=source):
+                self.assertContains(response, settings.STATIC_URL + source)
+
+    def test_pages_use_manifest(self):
+        with override_settings(STATICFILES_STORAGE=BUNDLED_STORAGE):
+            response = self.client.get(reverse('posts:index'))
+        for name in ('css/site.css', 'js/site.js', 'img/logo.png',
+                     'img/fav/favicon.ico'):
+            with self.subTest(name=name):
+                self.assertContains(
+                    response, settings.STATIC_URL + self.manifest[name])
+        self.assertNotContains(response, 'css/bootstrap.min.css')
+
+    def test_fingerprinted_files_are_immutable(self):
+        response = Client().get(
+            settings.STATIC_URL + self.manifest['css/site.css'])
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('navbar-yatube',
+                      b''.join(response.streaming_content).decode())
+        response = Client().get(settings.STATIC_URL + 'css/site.css')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Cache-Control'))
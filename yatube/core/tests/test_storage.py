@@ -0,0 +1,157 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+
+from core.storage import (ContentAddressedStorage, content_name,
+                          is_content_addressed)
+from posts.models import Post
+from posts.utils.thumbnails import generate_thumbnail
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+GIF_DIGEST = hashlib.sha256(SMALL_GIF).hexdigest()
+
+
+class ContentAddressedStorageTest(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        self.storage = ContentAddressedStorage(location=self.location)
+
+    def test_name_is_content_hash(self):
+        name = self.storage.save('posts/Photo.GIF', ContentFile(SMALL_GIF))
+        self.assertEqual(
+            name, f'posts/{GIF_DIGEST[:2]}/{GIF_DIGEST[2:4]}/{GIF_DIGEST}.gif')
+        self.assertEqual(name, content_name('posts', GIF_DIGEST, '.GIF'))
+        self.assertTrue(is_content_addressed(name))
+        self.assertFalse(is_content_addressed('posts/photo.gif'))
+        with self.storage.open(name) as stored:
+            self.assertEqual(stored.read(), SMALL_GIF)
+
+    def test_same_content_is_stored_once(self):
+        first = self.storage.save('posts/a.gif', ContentFile(SMALL_GIF))
+        path = self.storage.path(first)
+        os.utime(path, (0, 0))
+        second = self.storage.save('posts/b.gif', ContentFile(SMALL_GIF))
+        self.assertEqual(first, second)
+        directories, files = self.storage.listdir(os.path.dirname(first))
+        self.assertEqual(files, [os.path.basename(first)])
+        # Повторное сохранение продлевает жизнь файла для gc_media
+        self.assertGreater(os.path.getmtime(path), 0)
+
+    def test_concurrent_write_of_same_content(self):
+        name = content_name('posts', GIF_DIGEST, '.gif')
+        self.storage.save('posts/a.gif', ContentFile(SMALL_GIF))
+        # Другой процесс записал файл между exists() и записью
+        with mock.patch.object(self.storage, 'exists',
+                               side_effect=[False, True]):
+            self.assertEqual(
+                self.storage.save('posts/b.gif', ContentFile(SMALL_GIF)),
+                name)
+        self.assertEqual(self.storage.listdir(os.path.dirname(name))[1],
+                         [os.path.basename(name)])
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, name='small.gif'):
+        return Post.objects.create(
+            author=self.user, text='Пост с картинкой',
+            image=SimpleUploadedFile(name, SMALL_GIF,
+                                     content_type='image/gif'))
+
+    def gc_media(self, **options):
+        output = StringIO()
+        call_command('gc_media', stdout=output, **options)
+        return output.getvalue()
+
+    def test_posts_share_identical_images(self):
+        first = self.create_post('first.gif')
+        second = self.create_post('second.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(is_content_addressed(first.image.name))
+
+    def test_thumbnail_is_content_addressed(self):
+        post = self.create_post()
+        name = generate_thumbnail(post.pk)
+        self.assertTrue(name.startswith('posts/thumbs/'))
+        self.assertTrue(is_content_addressed(name))
+        # Миниатюра той же картинки у другого поста - тот же файл
+        self.assertEqual(generate_thumbnail(self.create_post().pk), name)
+
+    def test_immutable_cache_headers(self):
+        post = self.create_post()
+        response = Client().get(post.image.url)
+        self.assertEqual(b''.join(response.streaming_content), SMALL_GIF)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn(f'max-age={settings.MEDIA_IMMUTABLE_MAX_AGE}',
+                      response['Cache-Control'])
+
+    def test_mutable_names_are_not_cached_forever(self):
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'), exist_ok=True)
+        with open(os.path.join(TEMP_MEDIA_ROOT, 'posts', 'old.gif'),
+                  'wb') as legacy:
+            legacy.write(SMALL_GIF)
+        response = Client().get(f'{settings.MEDIA_URL}posts/old.gif')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Cache-Control'))
+
+    def test_gc_removes_only_orphans(self):
+        kept = self.create_post()
+        generate_thumbnail(kept.pk)
+        kept.refresh_from_db()
+        orphan = Post._meta.get_field('image').storage.save(
+            'posts/orphan.gif', ContentFile(SMALL_GIF + b'\0'))
+        fresh = Post._meta.get_field('image').storage.save(
+            'posts/fresh.gif', ContentFile(SMALL_GIF + b'\0\0'))
+        storage = kept.image.storage
+        old = time.time() - settings.MEDIA_GC_MIN_AGE - 1
+        for name in (kept.image.name, kept.thumbnail.name, orphan):
+            os.utime(storage.path(name), (old, old))
+
+        self.assertIn('Будет удалено файлов: 1', self.gc_media(dry_run=True))
+        self.assertTrue(storage.exists(orphan))
+
+        self.gc_media()
+        self.assertFalse(storage.exists(orphan))
+        # Свежий файл мог еще не получить ссылку из базы
+        self.assertTrue(storage.exists(fresh))
+        self.assertTrue(storage.exists(kept.image.name))
+        self.assertTrue(storage.exists(kept.thumbnail.name))
+
+        Post.objects.all().delete()
+        self.gc_media(min_age=0)
+        self.assertFalse(storage.exists(kept.image.name))
+        self.assertFalse(storage.exists(kept.thumbnail.name))
@@ -0,0 +1,101 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core.models import Job
+from core.tasks import (UnknownTask, Worker, enqueue, requeue_stale,
+                        run_pending, task)
+
+calls = []
+
+
+@task(name='tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task(name='tests.fail', max_attempts=2)
+def fail():
+    raise ValueError('Ошибка задачи')
+
+
+class TaskQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_and_run(self):
+        record.enqueue(1)
+        record.enqueue(value=2)
+        self.assertEqual(calls, [])
+        self.assertEqual(run_pending(), 2)
+        self.assertEqual(calls, [1, 2])
+        self.assertFalse(Job.objects.exists())
+
+    def test_same_key_is_queued_once(self):
+        record.enqueue(1, key='post:1')
+        record.enqueue(1, key='post:1')
+        self.assertEqual(Job.objects.count(), 1)
+        run_pending()
+        record.enqueue(1, key='post:1')
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_delayed_job_waits(self):
+        record.enqueue(1, delay=timedelta(minutes=5))
+        self.assertEqual(run_pending(), 0)
+        self.assertEqual(calls, [])
+
+    def test_failed_job_is_retried_with_backoff(self):
+        fail.enqueue()
+        self.assertEqual(run_pending(), 1)
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('Ошибка задачи', job.last_error)
+
+        Job.objects.update(run_at=timezone.now())
+        run_pending()
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(run_pending(), 0)
+
+    def test_unknown_task(self):
+        Job.objects.create(task='tests.missing', run_at=timezone.now(),
+                           max_attempts=5)
+        self.assertTrue(Worker().run_once())
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+        with self.assertRaises(UnknownTask):
+            enqueue('tests.missing')
+
+    def test_stale_job_is_requeued(self):
+        record.enqueue(1)
+        Job.objects.update(status=Job.RUNNING, locked_by='dead',
+                           locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(), 1)
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.locked_by), (Job.QUEUED, ''))
+        run_pending()
+        self.assertEqual(calls, [1])
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_mode(self):
+        record.enqueue(1)
+        self.assertEqual(calls, [1])
+        self.assertFalse(Job.objects.exists())
+
+
+class RunJobsCommandTest(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_burst(self):
+        for value in range(3):
+            record.enqueue(value)
+        call_command('run_jobs', concurrency=1, burst=True,
+                     stdout=StringIO())
+        self.assertEqual(sorted(calls), [0, 1, 2])
+        self.assertFalse(Job.objects.exists())
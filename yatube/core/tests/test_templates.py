@@ -0,0 +1,101 @@
+import importlib
+import os
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.template import Engine
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.minify import minify_html
+from core.profiling import report, reset_report
+from core.template_backends import ProfilingDjangoTemplates
+from core.template_loaders import ProfiledTemplate
+from posts.models import Post
+
+User = get_user_model()
+
+
+class TemplateProfilingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        reset_report()
+        self.client = Client()
+
+    def test_includes_are_reported(self):
+        self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        templates = report()['posts:post_detail']['templates']
+        for name in ('posts/post_detail.html', 'includes/header.html',
+                     'posts/includes/add_comment.html',
+                     'posts/includes/thumbnail.html'):
+            with self.subTest(name=name):
+                self.assertEqual(templates[name]['renders_avg'], 1)
+        page = templates['posts/post_detail.html']
+        self.assertLess(page['self_ms_avg'], page['ms_avg'])
+
+    def test_cards_are_counted_per_render(self):
+        Post.objects.create(author=self.user, text='Второй пост')
+        self.client.get(reverse('posts:index'))
+        templates = report()['posts:index']['templates']
+        self.assertEqual(
+            templates['posts/includes/cards/index.html']['renders_avg'], 2)
+
+
+class ProductionTemplatesTest(TestCase):
+    def test_cached_loader_keeps_profiling(self):
+        with mock.patch.dict(os.environ, {'DJANGO_SECRET_KEY': 'test'}):
+            production = importlib.import_module(
+                'yatube.settings_production')
+        params = dict(production.TEMPLATES[0], NAME='production',
+                      APP_DIRS=False)
+        params.pop('BACKEND')
+        engine = ProfilingDjangoTemplates(params).engine
+        first = engine.get_template('posts/includes/paginator.html')
+        self.assertIsInstance(first, ProfiledTemplate)
+        self.assertIs(
+            engine.get_template('posts/includes/paginator.html'), first)
+
+
+class MinifyHtmlTest(TestCase):
+    def test_whitespace_is_collapsed(self):
+        source = ('<div>\n    <p>  Текст\t поста  </p>\n'
+                  '    <!-- старая верстка -->\n</div>\n')
+        self.assertEqual(minify_html(source),
+                         '<div>\n<p> Текст поста </p>\n</div>\n')
+
+    def test_preserved_blocks(self):
+        source = ('<pre>  код\n    с отступами</pre>\n'
+                  '<script>\n  // комментарий\n  run();\n</script>\n'
+                  '{% if  a %}  {{ b|default:"x  y" }}  {% endif %}\n'
+                  '<!--[if IE]><p>IE</p><![endif]-->\n'
+                  '<!-- {% url "posts:index" %} -->')
+        minified = minify_html(source)
+        for block in ('<pre>  код\n    с отступами</pre>',
+                      '<script>\n  // комментарий\n  run();\n</script>',
+                      '{% if  a %}', '{{ b|default:"x  y" }}',
+                      '<!--[if IE]>', '{% url "posts:index" %}'):
+            with self.subTest(block=block):
+                self.assertIn(block, minified)
+
+    def test_pages_render_minified(self):
+        user = User.objects.create_user(username='test_user')
+        Post.objects.create(author=user, text='Пост')
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, 'Пост')
+        self.assertNotIn('    <', response.content.decode())
+
+    @override_settings(TEMPLATE_MINIFY_HTML=False)
+    def test_can_be_disabled(self):
+        engine = Engine(loaders=[
+            ('core.template_loaders.ProfilingLoader',
+             ['django.template.loaders.filesystem.Loader']),
+        ], dirs=[settings.TEMPLATES_DIR])
+        source = engine.get_template('posts/includes/paginator.html').source
+        self.assertIn('  ', source)
@@ -0,0 +1,20 @@
+"""Бэкенды sorl-thumbnail, см. THUMBNAIL_BACKEND."""
+from django.conf import settings
+from sorl.thumbnail.base import EXTENSIONS, ThumbnailBackend
+from sorl.thumbnail.helpers import serialize, tokey
+
+
+class ContentAddressedThumbnailBackend(ThumbnailBackend):
+    """Миниатюры sorl-thumbnail в ContentAddressedStorage.
+
+    Имя, которое выбирает sorl, - только заготовка: окончательное дает
+    хранилище (THUMBNAIL_STORAGE) по содержимому миниатюры. Поэтому
+    хранилище ключей sorl по заготовке миниатюру не находит и строит ее
+    заново; posts.utils.thumbnails вызывает get_thumbnail один раз на
+    картинку и запоминает имя в Post.thumbnail.
+    """
+
+    def _get_thumbnail_filename(self, source, geometry_string, options):
+        key = tokey(source.key, geometry_string, serialize(options))
+        return (f'{settings.THUMBNAIL_PREFIX}{key}.'
+                f'{EXTENSIONS[options["format"]]}')
@@ -1,4 +1,14 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
+from django.views import static
+
+from core.compression import compression_stats
+from core.db_pool import pool_stats
+from core.profiling import report
+from core.staticfiles import is_fingerprinted
+from core.storage import is_content_addressed
 
 
 def page_not_found(request, exception):
@@ -7,3 +17,48 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def query_report(request):
+    """Скользящий отчет о запросах к БД по именам URL."""
+    return JsonResponse(report(), json_dumps_params={'ensure_ascii': False})
+
+
+@staff_member_required
+def db_pool_report(request):
+    """Состояние пулов соединений процесса."""
+    return JsonResponse(pool_stats())
+
+
+@staff_member_required
+def compression_report(request):
+    """Байты до и после сжатия ответов по именам URL."""
+    return JsonResponse(compression_stats(),
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def serve_media(request, path):
+    """Медиафайлы без отдельного веб-сервера.
+
+    Файл с именем по содержимому не меняется, и браузер не перепроверяет
+    его до истечения MEDIA_IMMUTABLE_MAX_AGE.
+    """
+    response = static.serve(request, path, document_root=settings.MEDIA_ROOT)
+    if is_content_addressed(path):
+        response['Cache-Control'] = (
+            f'public, max-age={settings.MEDIA_IMMUTABLE_MAX_AGE}, immutable')
+    return response
+
+
+def serve_static(request, path):
+    """Собранная статика из STATIC_ROOT, см. core/staticfiles.py.
+
+    Файлы с отпечатком в имени кешируются как неизменяемые.
+    """
+    response = static.serve(request, path,
+                            document_root=settings.STATIC_ROOT)
+    if is_fingerprinted(path):
+        response['Cache-Control'] = (
+            f'public, max-age={settings.STATIC_IMMUTABLE_MAX_AGE}, immutable')
+    return response
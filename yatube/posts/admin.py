@@ -1,9 +1,21 @@
 from django.contrib import admin
 
+from core.admin_performance import PerformanceModeAdmin
+
 from .models import Group, Post
+from .utils.bulk import bulk_update_groups
+from .utils.search import backend as search_backend
+
+
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'title', 'slug', 'posts_count')
+    # Нужен для поиска в выпадающем списке групп у поста
+    search_fields = ('title', 'slug')
 
 
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(PerformanceModeAdmin, admin.ModelAdmin):
+    # Режим производительности: без COUNT(*) по всей таблице, изменения
+    # из списка сохраняются одним запросом, см. core/admin_performance.py
     # По поводу коммментов мы уже общались в Slack. Я помню, что в методически
     # просят удалять, но они нужны мне для того, чтобы быстро вспомнить, что
     # делает данный код
@@ -14,18 +26,36 @@ class PostAdmin(admin.ModelAdmin):
                     'author',
                     'group'
                     )
+    # Автор и группа - тем же запросом, что и посты
+    list_select_related = ('author', 'group')
     # Это позволит изменять поле group в любом посте
     list_editable = ('group',)
+    # Вместо выпадающих списков со всеми группами и пользователями
+    autocomplete_fields = ('author', 'group')
     # Добавляем интерфейс для поиска по тексту постов
     search_fields = ('text',)
-    # Добавляем возможность фильтрации по дате
+    # Сколько самых релевантных постов показывать в результатах поиска
+    search_limit = 1000
+    # Добавляем возможность фильтрации по дате. Диапазоны по pub_date и
+    # сортировка списка (-pub_date, -pk) идут по индексу post_pub_date_idx
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Ищем по полнотекстовому индексу вместо LIKE '%term%'
+        if not search_term:
+            return queryset, False
+        page = search_backend.search(search_term, limit=self.search_limit)
+        return queryset.filter(pk__in=page.post_ids), False
+
+    def bulk_save_list_editable(self, request, objects):
+        # Счетчики групп и кеши, которые для одного поста обновляет post_save
+        bulk_update_groups(objects)
+
 # При регистрации модели Post источником конфигурации для неё назначаем
 # класс PostAdmin
 
 
 admin.site.register(Post, PostAdmin)
 
-admin.site.register(Group)
+admin.site.register(Group, GroupAdmin)
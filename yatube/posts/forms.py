@@ -1,3 +1,4 @@
+from django import forms
 from django.forms import ModelForm
 
 from .models import Post, Comment
@@ -9,7 +10,30 @@ class PostForm(ModelForm):
         labels = {'group': 'Группа', 'text': 'Сообщение'}
         help_texts = {'group': 'Выберите группу', 'text': 'Введите сообщение'}
         fields = ["group", "text"]
-        # fields = ["group", "text", "image"]
+
+
+class PostImageForm(forms.Form):
+    """Картинка поста: файл уже проверен при загрузке.
+
+    Отдельно от PostForm, потому что в Post.image попадает не сам файл,
+    а результат перекодирования, см. posts/utils/uploads.py.
+    """
+    image = forms.FileField(
+        label='Картинка',
+        required=False,
+        help_text='JPEG, PNG, GIF или WebP',
+        widget=forms.FileInput(attrs={'accept': 'image/*'}))
+
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if not image:
+            return None
+        if not hasattr(image, 'sha256'):
+            # Файл пришел в обход ImageUploadHandler
+            raise forms.ValidationError('Загрузка картинок не настроена')
+        if image.upload_error:
+            raise forms.ValidationError(image.upload_error)
+        return image
 
 
 class CommentForm(ModelForm):
@@ -0,0 +1,40 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.utils.thumbnails import generate_in_worker, init_worker
+
+
+class Command(BaseCommand):
+    help = 'Строит недостающие миниатюры для постов с картинками'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int,
+            default=settings.POST_THUMBNAIL_WORKERS or 1,
+            help='Число процессов-воркеров')
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Перестроить и уже готовые миниатюры')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(thumbnail='')
+        post_ids = posts.order_by('pk').values_list('pk', flat=True)
+
+        done = 0
+        with ProcessPoolExecutor(
+            max_workers=options['workers'],
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_worker,
+        ) as executor:
+            for name in executor.map(generate_in_worker,
+                                     post_ids.iterator(), chunksize=16):
+                if name:
+                    done += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Построено миниатюр: {done}'))
@@ -0,0 +1,144 @@
+import json
+import os
+import platform
+import random
+import subprocess
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from posts.utils import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Наполняет отдельную базу тестовыми данными и замеряет '
+            'задержки, число запросов и пропускную способность страниц')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', choices=sorted(benchmark.SCALES), default='10k',
+            help='Объем данных (число постов)')
+        parser.add_argument(
+            '--iterations', type=int, default=200,
+            help='Запросов на каждый сценарий')
+        parser.add_argument(
+            '--transport', choices=('client', 'wsgi'), default='client',
+            help='django.test.Client или локальный WSGI-сервер')
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Параллельных клиентов (только для --transport=wsgi)')
+        parser.add_argument(
+            '--slow-clients', type=int, default=0,
+            help='Сравнить WSGI и ASGI при стольких медленных клиентах')
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Потоков сервера для --slow-clients')
+        parser.add_argument(
+            '--read-delay', type=float, default=20,
+            help='Сколько мс медленный клиент читает 16 КБ ответа')
+        parser.add_argument(
+            '--database', default=os.path.join(settings.BASE_DIR,
+                                               'benchmark.sqlite3'),
+            help='Файл базы для замеров; сохраняется между запусками')
+        parser.add_argument(
+            '--output', default='benchmark-results.json',
+            help='Куда записать результаты (JSON)')
+        parser.add_argument(
+            '--compare',
+            help='JSON прошлого прогона для сравнения')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] > 1 and options['transport'] != 'wsgi':
+            raise CommandError('--concurrency требует --transport=wsgi')
+        # Замеры идут в отдельной базе, рабочая база не затрагивается
+        connection.settings_dict['TEST']['NAME'] = options['database']
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=True)
+        caches = benchmark.isolated_caches()
+        try:
+            with override_settings(QUERY_PROFILING_HEADERS=True,
+                                   ALLOWED_HOSTS=['*'], CACHES=caches):
+                result = self.benchmark(options)
+        finally:
+            benchmark.remove_file_caches(caches)
+            connection.creation.destroy_test_db(old_name, verbosity=0,
+                                                keepdb=True)
+
+        with open(options['output'], 'w') as output:
+            json.dump(result, output, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f"Результаты записаны в {options['output']}"))
+
+        if options['compare']:
+            with open(options['compare']) as previous:
+                changes = benchmark.compare(json.load(previous), result)
+            self.write_changes(changes)
+
+    def write_changes(self, changes):
+        for name, change in changes.items():
+            # Прошлый p95 мог быть нулевым - изменение не определено
+            p95 = ('n/a' if change['p95_change'] is None
+                   else f"{change['p95_change']:+.1%}")
+            self.stdout.write(
+                f"{name}: p95 {p95}, "
+                f"запросов {change['queries_change']:+.1f}")
+
+    def benchmark(self, options):
+        posts, users, groups, comments = benchmark.SCALES[options['scale']]
+        benchmark.seed(posts, users, groups, comments, log=self.log)
+
+        rng = random.Random(0)
+        meta = {
+            'commit': self.git_commit(),
+            'date': timezone.now().isoformat(),
+            'scale': options['scale'],
+            'iterations': options['iterations'],
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        }
+        if options['slow_clients']:
+            slow_clients = benchmark.run_slow_clients(
+                benchmark.default_scenarios(rng), options['iterations'],
+                clients=options['slow_clients'],
+                workers=options['workers'],
+                delay=options['read_delay'] / 1000, log=self.log)
+            meta.update(slow_clients=options['slow_clients'],
+                        workers=options['workers'],
+                        read_delay_ms=options['read_delay'])
+            return {'meta': meta, 'results': {},
+                    'slow_clients': slow_clients}
+
+        user = benchmark.User.objects.filter(
+            username__startswith='bench_user_').order_by('pk').first()
+        if options['transport'] == 'wsgi':
+            transport = benchmark.WSGITransport(user)
+        else:
+            transport = benchmark.ClientTransport(user)
+        try:
+            results = benchmark.run(
+                benchmark.default_scenarios(rng), transport,
+                options['iterations'], concurrency=options['concurrency'],
+                log=self.log)
+        finally:
+            if hasattr(transport, 'close'):
+                transport.close()
+        meta.update(transport=options['transport'],
+                    concurrency=options['concurrency'])
+        return {'meta': meta, 'results': results}
+
+    def log(self, message):
+        self.stdout.write(message)
+
+    @staticmethod
+    def git_commit():
+        try:
+            return subprocess.check_output(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL,
+            ).decode().strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts.utils import query_plan
+
+
+class Command(BaseCommand):
+    help = ('Выполняет EXPLAIN QUERY PLAN для всех SELECT, которые делают '
+            'страницы posts, и отмечает полные просмотры таблиц и '
+            'сортировки во временном B-дереве')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Печатать планы всех запросов, а не только проблемных')
+        parser.add_argument(
+            '--strict', action='store_true',
+            help='Завершаться с ошибкой, если найдены проблемы')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('EXPLAIN QUERY PLAN поддерживается только '
+                               'для SQLite')
+        requests, user = query_plan.default_requests()
+        if not requests:
+            raise CommandError('В базе нет постов - проверять нечего')
+        for name in sorted(query_plan.uncovered_views(requests)):
+            self.stdout.write(self.style.WARNING(
+                f'{name}: страница не проверяется'))
+
+        planned = query_plan.collect(requests, user)
+        problems = 0
+        for query in planned:
+            if not (query.problems or options['all']):
+                continue
+            problems += bool(query.problems)
+            style = self.style.ERROR if query.problems else self.style.SUCCESS
+            self.stdout.write(style(f'[{query.url_name}] {query.sql}'))
+            for line in query.plan:
+                marker = '!' if line in query.problems else ' '
+                self.stdout.write(f'  {marker} {line}')
+
+        summary = (f'Запросов проверено: {len(planned)}, '
+                   f'с проблемами: {problems}')
+        if problems and options['strict']:
+            raise CommandError(summary)
+        self.stdout.write(summary)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from posts.utils import transfer
+
+
+class Command(BaseCommand):
+    help = ('Выгружает пользователей, группы, посты и комментарии в '
+            'каталог: по файлу NDJSON или CSV на модель')
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Каталог выгрузки')
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS, default='ndjson')
+        parser.add_argument(
+            '--models', nargs='+', choices=transfer.MODELS,
+            default=transfer.MODELS, help='Какие модели выгрузить')
+        parser.add_argument(
+            '--batch-size', type=int, default=transfer.BATCH_SIZE,
+            help='Строк на один запрос к базе')
+
+    def handle(self, *args, **options):
+        stats = transfer.export(
+            options['directory'], options['format'],
+            names=[name for name in transfer.MODELS
+                   if name in options['models']],
+            batch_size=options['batch_size'], log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено строк: {sum(counter.rows for counter in stats)}'))
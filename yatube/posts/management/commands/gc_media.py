@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from core.storage import sweep
+from posts.models import Post
+from posts.utils.uploads import staging_name
+
+
+class Command(BaseCommand):
+    help = ('Удаляет картинки и миниатюры, на которые не ссылается '
+            'ни один пост, и брошенные исходники загрузок')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=int, default=settings.MEDIA_GC_MIN_AGE,
+            help='Не удалять файлы моложе стольких секунд')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать, что было бы удалено')
+
+    def handle(self, *args, **options):
+        # Отметка: все имена, на которые ссылаются посты
+        referenced = set()
+        rows = Post.objects.values_list('image', 'thumbnail', 'image_source')
+        for image, thumbnail, image_source in rows.iterator():
+            referenced.update((image, thumbnail))
+            if image_source and not image:
+                # Загрузка еще ждет перекодирования
+                referenced.add(staging_name(image_source))
+        referenced.discard('')
+
+        # Очистка: файлы в каталогах картинок, которых нет среди отметок
+        storages = {}
+        for field in (Post._meta.get_field('image'),
+                      Post._meta.get_field('thumbnail')):
+            directory = field.upload_to.split('/')[0]
+            storages[(field.storage.location, directory)] = field.storage
+        storages[(default_storage.location,
+                  settings.IMAGE_STAGING_DIR.rstrip('/'))] = default_storage
+
+        removed = freed = 0
+        for (location, directory), storage in storages.items():
+            if not storage.exists(directory):
+                continue
+            files, size = sweep(storage, directory, referenced,
+                                options['min_age'], options['dry_run'])
+            removed += files
+            freed += size
+        verb = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} файлов: {removed}, {freed / 2 ** 20:.1f} МБ; '
+            f'ссылок в базе: {len(referenced)}'))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.models import Post
+from posts.utils import transfer
+from posts.utils.counters import recount_posts
+from posts.utils.search import backend
+
+
+class Command(BaseCommand):
+    help = ('Загружает выгрузку export_content пачками bulk_create; '
+            'прерванную загрузку можно продолжить с --resume')
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Каталог выгрузки')
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS, default='ndjson')
+        parser.add_argument(
+            '--models', nargs='+', choices=transfer.MODELS,
+            default=transfer.MODELS, help='Какие модели загрузить')
+        parser.add_argument(
+            '--batch-size', type=int, default=transfer.BATCH_SIZE,
+            help='Строк в одной пачке bulk_create')
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить с контрольной точки прошлой загрузки')
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Не пересчитывать счетчики и поисковый индекс')
+
+    def handle(self, *args, **options):
+        try:
+            stats = transfer.import_(
+                options['directory'], options['format'],
+                names=[name for name in transfer.MODELS
+                       if name in options['models']],
+                batch_size=options['batch_size'],
+                resume=options['resume'], log=self.stdout.write)
+        except transfer.TransferError as error:
+            raise CommandError(
+                f'{error}. Загруженное сохранено, продолжить: --resume')
+        if not options['skip_rebuild']:
+            # bulk_create не вызывает сигналы posts
+            recount_posts()
+            backend.reindex(Post.objects.order_by('pk'),
+                            batch_size=options['batch_size'])
+            self.stdout.write('Счетчики и поисковый индекс перестроены')
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено строк: {sum(counter.rows for counter in stats)}'))
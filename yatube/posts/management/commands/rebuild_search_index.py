@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.utils.search import backend
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        backend.reindex(Post.objects.order_by('pk'),
+                        batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {Post.objects.count()} '
+            f'за {time.monotonic() - started:.1f} с'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.utils.counters import recount_posts
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики постов и подписчиков авторов и групп'
+
+    def handle(self, *args, **options):
+        recount_posts()
+        self.stdout.write(self.style.SUCCESS('Счетчики пересчитаны'))
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_post_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, upload_to='posts/thumbs/', verbose_name='Миниатюра'),
+        ),
+    ]
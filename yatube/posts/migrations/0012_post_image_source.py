@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_follow_timelines'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_source',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='Хеш загруженной картинки'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:10
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_image_source'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=core.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image_source',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, verbose_name='Хеш загруженной картинки'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, storage=core.storage.ContentAddressedStorage(), upload_to='posts/thumbs/', verbose_name='Миниатюра'),
+        ),
+    ]
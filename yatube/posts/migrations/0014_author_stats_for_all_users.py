@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_author_stats(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    missing = (User.objects.filter(stats__isnull=True).annotate(
+        total=models.Count('posts', distinct=True),
+        followers=models.Count('following', distinct=True),
+    ).values_list('pk', 'total', 'followers').iterator())
+    AuthorStats.objects.bulk_create(
+        (AuthorStats(user_id=pk, posts_count=total,
+                     followers_count=followers)
+         for pk, total, followers in missing),
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0013_content_addressed_media'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_author_stats, migrations.RunPython.noop),
+    ]
@@ -3,6 +3,7 @@ from django.contrib.auth import get_user_model
 from django.db import models
 
 from core.models import CreatedModel
+from core.storage import ContentAddressedStorage
 
 
 User = get_user_model()
@@ -12,11 +13,46 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=50, unique=True)
     description = models.TextField()
+    # Денормализованный счетчик постов группы, см. posts/signals.py
+    posts_count = models.PositiveIntegerField(
+        'Количество постов',
+        default=0,
+        editable=False)
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+        editable=False)
 
     def __str__(self):
         return self.title
 
 
+class AuthorStats(models.Model):
+    """Денормализованные счетчики автора.
+
+    Модель пользователя встроенная, поэтому счетчики хранятся отдельно.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Автор')
+    posts_count = models.PositiveIntegerField(
+        'Количество постов',
+        default=0)
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0)
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return f'{self.user_id}: {self.posts_count}'
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст поста',
@@ -39,14 +75,47 @@ class Post(models.Model):
         verbose_name='Группа',
         help_text='Группа, к которой будет относиться пост')
 
+    # Картинка и миниатюра хранятся под именами по содержимому,
+    # см. core/storage.py
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    # Готовая миниатюра, ее генерирует фоновый процесс,
+    # см. posts/utils/thumbnails.py
+    thumbnail = models.ImageField(
+        'Миниатюра',
+        upload_to='posts/thumbs/',
+        storage=ContentAddressedStorage(),
+        blank=True,
+        editable=False
+    )
+    # sha256 исходного файла последней загрузки; картинку перекодирует
+    # фоновая задача, см. posts/utils/uploads.py. По индексу находится
+    # уже перекодированная копия той же загрузки
+    image_source = models.CharField(
+        'Хеш загруженной картинки',
+        max_length=64,
+        blank=True,
+        editable=False,
+        db_index=True
+    )
 
     class Meta:
         ordering = ('-pub_date',)
+        # Ленты сортируются по (-pub_date, -id), см. posts/utils/paginator.py;
+        # индексы покрывают сортировку, чтобы не было SCAN и TEMP B-TREE.
+        # Проверка: manage.py explain_feeds
+        indexes = [
+            models.Index(fields=['pub_date', 'id'],
+                         name='post_pub_date_idx'),
+            models.Index(fields=['group', 'pub_date', 'id'],
+                         name='post_group_pub_date_idx'),
+            models.Index(fields=['author', 'pub_date', 'id'],
+                         name='post_author_pub_date_idx'),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -54,10 +123,22 @@ class Post(models.Model):
         # выводим текст поста
         return self.text[:15]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Запоминаем загруженные значения, чтобы при сохранении понять,
+        # сменились ли автор и группа, без дополнительного запроса
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
 
 class Comment(CreatedModel):
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            models.Index(fields=['post', 'created', 'id'],
+                         name='comment_post_created_idx'),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -84,3 +165,85 @@ class Comment(CreatedModel):
     def __str__(self) -> str:
         # выводим текст поста
         return self.text[:15]
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower',
+        verbose_name='Подписчик')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following',
+        verbose_name='Автор')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='unique_follow'),
+            models.CheckConstraint(check=~models.Q(user=models.F('author')),
+                                   name='no_self_follow'),
+        ]
+        verbose_name = 'Подписка на автора'
+        verbose_name_plural = 'Подписки на авторов'
+
+    def __str__(self):
+        return f'{self.user_id} -> {self.author_id}'
+
+
+class GroupFollow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='group_follows',
+        verbose_name='Подписчик')
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='followers',
+        verbose_name='Группа')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'group'],
+                                    name='unique_group_follow'),
+        ]
+        verbose_name = 'Подписка на группу'
+        verbose_name_plural = 'Подписки на группы'
+
+    def __str__(self):
+        return f'{self.user_id} -> {self.group_id}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в материализованной ленте подписчика, см. posts/utils/timelines.py.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик')
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост')
+    # Копия Post.pub_date: лента читается по индексу без JOIN с постами
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'pub_date', 'post'],
+                         name='timeline_user_pub_date_idx'),
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
@@ -0,0 +1,216 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import tasks
+from .models import (AuthorStats, Comment, Follow, Group, GroupFollow, Post,
+                     User)
+from .utils import timelines
+from .utils.conditional import GROUPS, POSTS, USERS, touch
+from .utils.counters import (bump_author, bump_author_followers, bump_group,
+                             bump_group_followers)
+from .utils.fragments import bump_version
+
+
+def _image_changed(instance):
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded is None:
+        return True
+    return loaded.get('image') != instance.image.name
+
+
+@receiver(pre_save, sender=Post)
+def reset_thumbnail(sender, instance, raw=False, **kwargs):
+    """Старая миниатюра не подходит к новой картинке."""
+    if not raw and instance.pk and _image_changed(instance):
+        instance.thumbnail = ''
+
+
+@receiver(post_save, sender=Post)
+def update_counters_on_save(sender, instance, created, raw=False, **kwargs):
+    """Поддерживает счетчики постов при создании и переносе поста.
+
+    Сюда же попадают изменения группы через list_editable в админке:
+    ModelAdmin сохраняет каждый пост через save().
+    """
+    if raw:
+        return
+    if created:
+        bump_author(instance.author_id, 1)
+        bump_group(instance.group_id, 1)
+    else:
+        loaded = getattr(instance, '_loaded_values', {})
+        old_author = loaded.get('author_id', instance.author_id)
+        old_group = loaded.get('group_id', instance.group_id)
+        if old_author != instance.author_id:
+            bump_author(old_author, -1)
+            bump_author(instance.author_id, 1)
+        if old_group != instance.group_id:
+            bump_group(old_group, -1)
+            bump_group(instance.group_id, 1)
+
+
+@receiver(post_save, sender=Post)
+def generate_thumbnail_on_save(sender, instance, raw=False, **kwargs):
+    if not raw and instance.image and not instance.thumbnail:
+        tasks.generate_thumbnail.enqueue(
+            instance.pk, key=f'thumbnail:{instance.pk}')
+
+
+@receiver(post_save, sender=Post)
+def process_image_on_save(sender, instance, raw=False, **kwargs):
+    # Загрузку, привязанную attach_image, перекодирует воркер
+    digest = getattr(instance, '_pending_image', None)
+    if digest and not raw:
+        del instance._pending_image
+        tasks.process_image.enqueue(
+            instance.pk, digest, key=f'image:{instance.pk}:{digest}')
+
+
+def _related_names(instance, field_name, ids, attname):
+    """Значения attname связанных объектов с id из ids.
+
+    Уже загруженный в instance объект берется без запроса к базе.
+    """
+    field = Post._meta.get_field(field_name)
+    ids = set(ids) - {None}
+    names = []
+    if field.is_cached(instance):
+        related = field.get_cached_value(instance)
+        if related is not None and related.pk in ids:
+            names.append(getattr(related, attname))
+            ids.discard(related.pk)
+    if ids:
+        names += field.related_model.objects.filter(
+            pk__in=ids).values_list(attname, flat=True)
+    return names
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def touch_post_pages(sender, instance, raw=False, **kwargs):
+    """Отмечает изменение лент и страницы поста для условных GET.
+
+    Перенесенный пост меняет ленты и прежних автора и группы.
+    """
+    if raw:
+        return
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    authors = _related_names(
+        instance, 'author',
+        {instance.author_id, loaded.get('author_id')}, 'username')
+    groups = _related_names(
+        instance, 'group',
+        {instance.group_id, loaded.get('group_id')}, 'slug')
+    touch(POSTS, ('post', instance.pk),
+          *[('author', username) for username in authors],
+          *[('group', slug) for slug in groups])
+
+
+@receiver(post_save, sender=Post)
+def remember_loaded_values(sender, instance, **kwargs):
+    # Обработчики выше сравнивают с этими значениями при следующем save()
+    instance._loaded_values = {
+        'author_id': instance.author_id,
+        'group_id': instance.group_id,
+        'image': instance.image.name,
+    }
+
+
+@receiver(post_delete, sender=Post)
+def update_counters_on_delete(sender, instance, **kwargs):
+    # Автор может удаляться вместе с постами, поэтому счетчик не создаем
+    bump_author(instance.author_id, -1, create_missing=False)
+    bump_group(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_card(sender, instance, **kwargs):
+    bump_version('post', instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        tasks.sync_search_index.enqueue(
+            instance.pk, key=f'search:{instance.pk}')
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    tasks.sync_search_index.enqueue(
+        instance.pk, key=f'search:{instance.pk}')
+
+
+@receiver(post_save, sender=Post)
+def fan_out_on_create(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        tasks.fan_out.enqueue(instance.pk, key=f'fan-out:{instance.pk}')
+
+
+@receiver(post_save, sender=Follow)
+def follow_author(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        bump_author_followers(instance.author_id, 1)
+        timelines.follow_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def unfollow_author(sender, instance, **kwargs):
+    bump_author_followers(instance.author_id, -1, create_missing=False)
+    timelines.unfollow_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=GroupFollow)
+def follow_group(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        bump_group_followers(instance.group_id, 1)
+        timelines.follow_group(instance.user_id, instance.group_id)
+
+
+@receiver(post_delete, sender=GroupFollow)
+def unfollow_group(sender, instance, **kwargs):
+    bump_group_followers(instance.group_id, -1)
+    timelines.unfollow_group(instance.user_id, instance.group_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+@receiver(post_save, sender=GroupFollow)
+@receiver(post_delete, sender=GroupFollow)
+def touch_viewer_pages(sender, instance, raw=False, **kwargs):
+    # Кнопки «Подписаться» / «Отписаться» на страницах автора и группы
+    if not raw:
+        touch(('viewer', instance.user_id))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_comment_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        touch(('post', instance.post_id))
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_cards(sender, instance, created, raw=False, **kwargs):
+    bump_version('group', instance.pk)
+    if not (created or raw):
+        touch(('group', instance.slug), GROUPS)
+
+
+@receiver(post_save, sender=User)
+def create_author_stats(sender, instance, created, raw=False, **kwargs):
+    # Страницы автора читают счетчики, но не создают их
+    if created and not raw:
+        AuthorStats.objects.create(user=instance)
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_cards(sender, instance, created=False, raw=False,
+                            update_fields=None, **kwargs):
+    # Вход пользователя обновляет только last_login - карточки не меняются
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    bump_version('author', instance.pk)
+    if not (created or raw):
+        touch(('author', instance.username), USERS)
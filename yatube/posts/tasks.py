@@ -0,0 +1,34 @@
+"""Фоновые задачи posts: их ставят в очередь обработчики из signals.py."""
+from core.tasks import task
+from posts.models import Post
+from posts.utils import thumbnails, timelines, uploads
+from posts.utils.search import backend as search_backend
+
+
+@task
+def generate_thumbnail(post_id):
+    return thumbnails.generate_thumbnail(post_id)
+
+
+@task
+def process_image(post_id, digest):
+    return uploads.process_image(post_id, digest)
+
+
+@task
+def fan_out(post_id):
+    return timelines.fan_out(post_id)
+
+
+@task
+def sync_search_index(post_id):
+    """Приводит запись поискового индекса к текущему состоянию поста.
+
+    Одна задача на создание, правку и удаление, поэтому задания с ключом
+    поста схлопываются в очереди в одно.
+    """
+    post = Post.objects.only('pk', 'text').filter(pk=post_id).first()
+    if post is None:
+        search_backend.remove(post_id)
+    else:
+        search_backend.index(post)
@@ -0,0 +1,12 @@
+# posts/templatetags/post_cards.py
+from django import template
+
+from posts.utils.fragments import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts, template_name):
+    """Карточки постов страницы из кеша фрагментов."""
+    return render_cards(posts, template_name)
@@ -0,0 +1,62 @@
+import random
+from io import StringIO
+
+from django.conf import settings
+from django.test import TestCase
+
+from posts.management.commands.benchmark import Command
+from posts.models import Comment, Group, Post, User
+from posts.utils import benchmark
+
+
+class BenchmarkTest(TestCase):
+    def test_seed_is_idempotent(self):
+        benchmark.seed(30, 5, 2, 10, log=lambda message: None)
+        benchmark.seed(30, 5, 2, 10, log=lambda message: None)
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Group.objects.count(), 2)
+        self.assertEqual(Comment.objects.count(), 10)
+        author = Post.objects.first().author
+        self.assertEqual(author.stats.posts_count, author.posts.count())
+
+    def test_run_reports_percentiles(self):
+        benchmark.seed(30, 5, 2, 10, log=lambda message: None)
+        with self.settings(QUERY_PROFILING_HEADERS=True):
+            results = benchmark.run(
+                benchmark.default_scenarios(random.Random(0)),
+                benchmark.ClientTransport(User.objects.first()),
+                iterations=3, warmup=0, log=lambda message: None)
+        self.assertEqual(set(results), {
+            'index', 'group_posts', 'profile', 'post_detail',
+            'post_create', 'add_comment'})
+        for name, result in results.items():
+            with self.subTest(scenario=name):
+                self.assertEqual(result['requests'], 3)
+                self.assertEqual(result['errors'], 0)
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+                self.assertGreater(result['queries_per_request'], 0)
+
+    def test_compare_with_zero_p95(self):
+        old = {'results': {
+            'index': {'p95_ms': 0, 'queries_per_request': 3},
+            'profile': {'p95_ms': 10, 'queries_per_request': 5},
+        }}
+        new = {'results': {
+            'index': {'p95_ms': 4, 'queries_per_request': 3},
+            'profile': {'p95_ms': 12, 'queries_per_request': 4},
+        }}
+        output = StringIO()
+        Command(stdout=output).write_changes(benchmark.compare(old, new))
+        self.assertEqual(output.getvalue().splitlines(), [
+            'index: p95 n/a, запросов +0.0',
+            'profile: p95 +20.0%, запросов -1.0',
+        ])
+
+    def test_isolated_caches(self):
+        caches = benchmark.isolated_caches()
+        self.assertEqual(caches['shared']['LOCATION'],
+                         settings.CACHES['shared']['LOCATION'] + '-benchmark')
+        for params in caches.values():
+            self.assertEqual(params['KEY_PREFIX'], 'benchmark')
+        self.assertNotIn('KEY_PREFIX', settings.CACHES['default'])
@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class PostCommentsTest(TestCase):
+    TOTAL_COMMENTS = 45
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        cls.quiet_post = Post.objects.create(author=cls.user,
+                                             text='Пост без обсуждения')
+        for number in range(cls.TOTAL_COMMENTS):
+            commenter = User.objects.create_user(username=f'reader{number}')
+            Comment.objects.create(post=cls.post, author=commenter,
+                                   text=f'Комментарий #{number}')
+        Comment.objects.create(post=cls.quiet_post, author=cls.user,
+                               text='Единственный комментарий')
+
+    def setUp(self):
+        self.client = Client()
+
+    def count_queries(self, post):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(
+                reverse('posts:post_detail', kwargs={'post_id': post.pk}))
+        return len(queries)
+
+    def test_detail_query_count_does_not_grow(self):
+        """Число запросов не зависит от количества комментариев."""
+        self.assertEqual(self.count_queries(self.post),
+                         self.count_queries(self.quiet_post))
+
+    def test_detail_shows_first_page(self):
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        comments = response.context['comments']
+        self.assertEqual(len(comments), settings.COMMENTS_PER_PAGE)
+        self.assertEqual(comments[0].text,
+                         f'Комментарий #{self.TOTAL_COMMENTS - 1}')
+        self.assertTrue(comments.has_next())
+
+    def test_load_more_as_fragment_and_json(self):
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        cursor = response.context['comments'].next_cursor
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+
+        response = self.client.get(url, {'after': cursor})
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+        self.assertNotContains(response, '<html')
+        self.assertEqual(len(response.context['comments']),
+                         settings.COMMENTS_PER_PAGE)
+
+        data = self.client.get(url, {'after': cursor, 'format': 'json'}).json()
+        texts = [comment['text'] for comment in data['comments']]
+        self.assertEqual(texts[0], f'Комментарий #{self.TOTAL_COMMENTS - 21}')
+        last = self.client.get(
+            url, {'after': data['next_cursor'], 'format': 'json'}).json()
+        self.assertEqual(len(last['comments']),
+                         self.TOTAL_COMMENTS - 2 * settings.COMMENTS_PER_PAGE)
+        self.assertIsNone(last['next_cursor'])
+
+    def test_unknown_post_is_404(self):
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 999}))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,184 @@
+import io
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core.tasks import run_pending
+from posts.models import Comment, Follow, Group, Post, User
+from posts.utils.thumbnails import generate_thumbnail
+
+
+class ConditionalGetTest(TransactionTestCase):
+    """Области отмечаются после фиксации транзакции (transaction.on_commit),
+    поэтому изменения в тестах должны фиксироваться."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Тестовая группа', slug='test_slug', description='...')
+        self.other_group = Group.objects.create(
+            title='Другая группа', slug='other_slug', description='...')
+        self.post = Post.objects.create(
+            author=self.author, text='Тестовый пост', group=self.group)
+        cache.clear()
+        self.client = Client()
+
+    def revalidate(self, url, client=None):
+        """Статус повторного запроса с ETag из первого ответа."""
+        client = client or self.client
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def assertNotModified(self, url, client=None):
+        self.assertEqual(self.revalidate(url, client), 304)
+
+    def test_not_modified_skips_page_queries(self):
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        self.assertIn('private', response['Cache-Control'])
+        with self.assertNumQueries(0):
+            response = self.client.get(url,
+                                       HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since(self):
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url,
+                                   HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_pages_change_with_their_posts(self):
+        index = reverse('posts:index')
+        group = reverse('posts:group_list', kwargs={'slug': 'test_slug'})
+        other = reverse('posts:group_list', kwargs={'slug': 'other_slug'})
+        profile = reverse('posts:profile', kwargs={'username': 'author'})
+        etags = {url: self.client.get(url)['ETag']
+                 for url in (index, group, other, profile)}
+        Post.objects.create(author=self.author, text='Новый пост',
+                            group=self.group)
+        for url, changed in ((index, True), (group, True),
+                             (other, False), (profile, True)):
+            with self.subTest(url=url):
+                response = self.client.get(url,
+                                           HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code,
+                                 200 if changed else 304)
+
+    def test_moved_post_changes_old_group(self):
+        url = reverse('posts:group_list', kwargs={'slug': 'test_slug'})
+        etag = self.client.get(url)['ETag']
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = self.other_group
+        post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_post_detail_changes_with_comments(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Комментарий')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotModified(url)
+
+    def test_etag_depends_on_user(self):
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+        etag = self.client.get(url)['ETag']
+        reader = Client()
+        reader.force_login(self.reader)
+        response = reader.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Cookie', response['Vary'].split(', '))
+
+        etag = response['ETag']
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = reader.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Отписаться')
+        self.assertNotModified(url, reader)
+
+    def test_pages_are_touched_after_commit(self):
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+        etag = self.client.get(url)['ETag']
+        with transaction.atomic():
+            Post.objects.create(author=self.author, text='Новый пост')
+            # До фиксации страница еще старая - и ETag тоже
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_post_has_no_validators(self):
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': 0}))
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR))
+class BackgroundChangesTest(TransactionTestCase):
+    """Изменения в обход сигналов тоже меняют ETag страниц."""
+
+    def setUp(self):
+        self.addCleanup(shutil.rmtree, settings.MEDIA_ROOT, True)
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(
+            title='Тестовая группа', slug='test_slug', description='...')
+        cache.clear()
+        self.client = Client()
+
+    def etags(self, urls):
+        return {url: self.client.get(url)['ETag'] for url in urls}
+
+    def assertChanged(self, etags):
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_image_jobs(self):
+        image = io.BytesIO()
+        Image.new('RGB', (40, 20), 'red').save(image, 'JPEG')
+        author = Client()
+        author.force_login(self.author)
+        author.post(reverse('posts:post_create'), {
+            'text': 'С картинкой', 'group': self.group.pk,
+            'image': SimpleUploadedFile('picture.jpg', image.getvalue()),
+        })
+        post = Post.objects.get()
+        urls = (reverse('posts:index'),
+                reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+                reverse('posts:profile', kwargs={'username': 'author'}),
+                reverse('posts:post_detail', kwargs={'post_id': post.pk}))
+        etags = self.etags(urls)
+        # Перекодирование картинки и построение миниатюры
+        run_pending()
+        self.assertChanged(etags)
+
+        Post.objects.filter(pk=post.pk).update(thumbnail='')
+        etags = self.etags(urls)
+        self.assertIsNotNone(generate_thumbnail(post.pk))
+        self.assertChanged(etags)
+
+    def test_import(self):
+        etags = self.etags((
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+            reverse('posts:profile', kwargs={'username': 'author'})))
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        call_command('import_content', directory, stdout=StringIO())
+        self.assertChanged(etags)
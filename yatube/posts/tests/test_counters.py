@@ -0,0 +1,117 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import AuthorStats, Follow, Group, GroupFollow, Post
+
+User = get_user_model()
+
+
+class PostCountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other_slug',
+            description='Тестовое описание'
+        )
+        cls.user = User.objects.create_user(username='test_user')
+        cls.other_user = User.objects.create_user(username='other_user')
+
+    def assertCounters(self, author_count, group_count, other_group_count):
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.user).posts_count, author_count)
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, group_count)
+        self.assertEqual(self.other_group.posts_count, other_group_count)
+
+    def test_create_move_delete(self):
+        """Счетчики следуют за созданием, переносом и удалением поста."""
+        post = Post.objects.create(author=self.user, text='Пост',
+                                   group=self.group)
+        Post.objects.create(author=self.user, text='Пост без группы')
+        self.assertCounters(2, 1, 0)
+
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.other_group
+        post.save()
+        self.assertCounters(2, 0, 1)
+
+        post.author = self.other_user
+        post.save()
+        self.assertCounters(1, 0, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.other_user).posts_count, 1)
+
+        post.delete()
+        self.assertCounters(1, 0, 0)
+
+    def test_admin_list_editable_moves_counter(self):
+        """Смена группы через list_editable в админке меняет счетчики."""
+        post = Post.objects.create(author=self.user, text='Пост',
+                                   group=self.group)
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        client = Client()
+        client.force_login(admin)
+        response = client.post(reverse('admin:posts_post_changelist'), {
+            'form-TOTAL_FORMS': 1,
+            'form-INITIAL_FORMS': 1,
+            'form-MIN_NUM_FORMS': 0,
+            'form-MAX_NUM_FORMS': 1000,
+            'form-0-id': post.pk,
+            'form-0-group': self.other_group.pk,
+            '_save': 'Сохранить',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertCounters(1, 0, 1)
+
+    def test_recount_command_repairs_counters(self):
+        Post.objects.create(author=self.user, text='Пост', group=self.group)
+        Group.objects.update(posts_count=42)
+        AuthorStats.objects.update(posts_count=42)
+        call_command('recount_posts', stdout=StringIO())
+        self.assertCounters(1, 1, 0)
+
+    def test_recount_keeps_followers(self):
+        Post.objects.create(author=self.user, text='Пост')
+        Follow.objects.create(user=self.other_user, author=self.user)
+        GroupFollow.objects.create(user=self.other_user, group=self.group)
+        call_command('recount_posts', stdout=StringIO())
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.user).followers_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.followers_count, 1)
+
+    def test_profile_does_not_count_posts(self):
+        """Профиль берет число постов из счетчика."""
+        for number in range(3):
+            Post.objects.create(author=self.user, text=f'Пост {number}')
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'test_user'}))
+        self.assertEqual(response.context['count_post'], 3)
+        self.assertEqual(response.context['page_obj'].paginator.count, 3)
+
+    def test_stats_are_created_with_user(self):
+        user = User.objects.create_user(username='new_user')
+        stats = AuthorStats.objects.get(user=user)
+        self.assertEqual((stats.posts_count, stats.followers_count), (0, 0))
+
+    def test_profile_without_stats_does_not_write(self):
+        """Без строки счетчиков профиль считает посты, но не создает ее."""
+        Post.objects.create(author=self.user, text='Пост')
+        AuthorStats.objects.filter(user=self.user).delete()
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'test_user'}))
+        self.assertEqual(response.context['count_post'], 1)
+        self.assertFalse(AuthorStats.objects.filter(user=self.user).exists())
@@ -0,0 +1,119 @@
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import (AuthorStats, Follow, Group, GroupFollow, Post,
+                          TimelineEntry, User)
+from posts.utils.timelines import fan_out
+
+
+class FollowTimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test_slug', description='...')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def publish(self, count=1, **kwargs):
+        """Создает посты и раскладывает их по лентам, как фоновый поток."""
+        posts = []
+        for number in range(count):
+            post = Post.objects.create(
+                author=kwargs.get('author', self.author),
+                group=kwargs.get('group'), text=f'Пост {number}')
+            fan_out(post.pk)
+            posts.append(post)
+        return posts
+
+    def feed(self, **params):
+        response = self.client.get(reverse('posts:follow_index'), params)
+        return response.context['page_obj']
+
+    def test_follow_backfills_timeline(self):
+        posts = self.publish(2)
+        self.client.get(reverse('posts:profile_follow',
+                                kwargs={'username': 'author'}))
+        self.assertEqual(AuthorStats.objects.get(
+            user=self.author).followers_count, 1)
+        self.assertEqual(list(self.feed()), posts[::-1])
+
+    def test_cannot_follow_self(self):
+        self.client.get(reverse('posts:profile_follow',
+                                kwargs={'username': 'reader'}))
+        self.assertFalse(Follow.objects.exists())
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        stranger = User.objects.create_user(username='stranger')
+        post, = self.publish()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertFalse(TimelineEntry.objects.filter(user=stranger).exists())
+        self.assertEqual(list(self.feed()), [post])
+
+    @override_settings(TIMELINE_FANOUT_BATCH=2)
+    def test_fan_out_in_batches(self):
+        readers = [User.objects.create_user(username=f'reader_{number}')
+                   for number in range(5)]
+        for reader in readers:
+            Follow.objects.create(user=reader, author=self.author)
+        GroupFollow.objects.create(user=readers[0], group=self.group)
+        post, = self.publish(group=self.group)
+        self.assertEqual(fan_out(post.pk), 5)
+        self.assertEqual(
+            TimelineEntry.objects.filter(post=post).count(), 5)
+
+    def test_unfollow_keeps_posts_of_followed_group(self):
+        in_group, = self.publish(group=self.group)
+        self.publish()
+        Follow.objects.create(user=self.reader, author=self.author)
+        GroupFollow.objects.create(user=self.reader, group=self.group)
+        self.client.get(reverse('posts:profile_unfollow',
+                                kwargs={'username': 'author'}))
+        self.assertEqual(list(self.feed()), [in_group])
+        self.client.get(reverse('posts:group_unfollow',
+                                kwargs={'slug': 'test_slug'}))
+        self.assertEqual(list(self.feed()), [])
+        self.assertEqual(Group.objects.get(pk=self.group.pk)
+                         .followers_count, 0)
+
+    @override_settings(TIMELINE_MAX_LENGTH=3, TIMELINE_TRIM_EVERY=1)
+    def test_timeline_is_capped(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = self.publish(5)
+        self.assertEqual(
+            list(TimelineEntry.objects.filter(user=self.reader)
+                 .order_by('-pub_date', '-post_id')
+                 .values_list('post_id', flat=True)),
+            [post.pk for post in posts[:1:-1]])
+
+    @override_settings(TIMELINE_CELEBRITY_FOLLOWERS=1)
+    def test_celebrity_posts_are_read_on_request(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        post, = self.publish()
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(list(self.feed()), [post])
+
+    def test_feed_pages_by_cursor(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = self.publish(13)[::-1]
+        first = self.feed()
+        self.assertEqual(list(first), posts[:10])
+        second = self.feed(after=first.next_cursor)
+        self.assertEqual(list(second), posts[10:])
+        self.assertFalse(second.has_next())
+
+    def test_follow_buttons(self):
+        response = self.client.get(reverse('posts:profile',
+                                           kwargs={'username': 'author'}))
+        self.assertContains(response, 'Подписаться')
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.client.get(reverse('posts:profile',
+                                           kwargs={'username': 'author'}))
+        self.assertTrue(response.context['following'])
+        self.assertContains(response, 'Отписаться')
@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+from posts.utils import fragments
+
+User = get_user_model()
+
+
+class PostCardsCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание'
+        )
+        cls.user = User.objects.create_user(username='test_user')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Запись #{number}',
+                                group=cls.group)
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        fragments.reset_stats()
+        self.client = Client()
+
+    def test_second_render_is_served_from_cache(self):
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(fragments.stats(), {'hits': 0, 'misses': 3})
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(fragments.stats(), {'hits': 3, 'misses': 3})
+
+    def test_post_edit_rerenders_only_its_card(self):
+        self.client.get(reverse('posts:index'))
+        post = self.posts[0]
+        post.text = 'Измененная запись'
+        post.save()
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(fragments.stats(), {'hits': 2, 'misses': 4})
+        self.assertContains(response, 'Измененная запись')
+
+    def test_group_and_author_changes_invalidate_cards(self):
+        self.client.get(reverse('posts:index'))
+        self.group.title = 'Новое название'
+        self.group.save()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Новое название')
+        self.user.first_name = 'Лев'
+        self.user.last_name = 'Толстой'
+        self.user.save()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Лев Толстой')
+        self.assertEqual(fragments.stats()['hits'], 0)
@@ -0,0 +1,167 @@
+import base64
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+from posts.utils.paginator import (COUNT_ESTIMATE, COUNT_NONE,
+                                   CursorPaginator, InvalidCursor)
+
+User = get_user_model()
+
+
+class CursorPaginatorTest(TestCase):
+    TOTAL_POSTS = 25
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        for number in range(cls.TOTAL_POSTS):
+            Post.objects.create(author=cls.user,
+                                text=f'Тестовая запись #{number}')
+        cls.expected = list(
+            Post.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True))
+
+    def setUp(self):
+        self.client = Client()
+
+    def ids(self, page):
+        return [post.id for post in page]
+
+    def test_walk_forward_and_back_by_cursor(self):
+        """Курсоры ведут по тем же записям, что и OFFSET."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        first = paginator.page(1)
+        second = paginator.page_after(first.next_cursor)
+        third = paginator.page_after(second.next_cursor)
+        self.assertEqual(self.ids(first), self.expected[:10])
+        self.assertEqual(self.ids(second), self.expected[10:20])
+        self.assertEqual(self.ids(third), self.expected[20:])
+        self.assertEqual(third.number, 3)
+        self.assertFalse(third.has_next())
+        back = paginator.page_before(third.previous_cursor)
+        self.assertEqual(self.ids(back), self.expected[10:20])
+        self.assertTrue(back.has_previous())
+        first_again = paginator.page_before(back.previous_cursor)
+        self.assertEqual(self.ids(first_again), self.expected[:10])
+        self.assertFalse(first_again.has_previous())
+
+    def test_cursor_page_does_not_count(self):
+        """Переход по курсору в режиме none не выполняет COUNT(*)."""
+        paginator = CursorPaginator(Post.objects.all(), 10,
+                                    count_mode=COUNT_NONE)
+        cursor = paginator.page(1).next_cursor
+        with self.assertNumQueries(1):
+            page = paginator.page_after(cursor)
+            self.assertEqual(len(page), 10)
+            self.assertTrue(page.has_next())
+        self.assertIsNone(paginator.num_pages)
+
+    def test_estimate_is_capped(self):
+        with self.settings(PAGINATOR_ESTIMATE_LIMIT=20):
+            paginator = CursorPaginator(Post.objects.all(), 10,
+                                        count_mode=COUNT_ESTIMATE)
+            self.assertEqual(paginator.count, 20)
+            self.assertTrue(paginator.count_is_estimate)
+
+    def test_views_accept_cursor(self):
+        response = self.client.get(reverse('posts:index'))
+        cursor = response.context['page_obj'].next_cursor
+        response = self.client.get(reverse('posts:index') + f'?after={cursor}')
+        self.assertEqual(self.ids(response.context['page_obj']),
+                         self.expected[settings.POST_PER_PAGE:
+                                       2 * settings.POST_PER_PAGE])
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse('posts:index') + '?after=garbage')
+        self.assertEqual(response.context['page_obj'].number, 1)
+
+    def test_tampered_cursor_is_invalid(self):
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        cursors = {
+            'bad date': [2, 'bad', '1'],
+            'bad id': [2, '2020-01-01T00:00:00+00:00', 'x'],
+            'page below 1': [0, '2020-01-01T00:00:00+00:00', '1'],
+            'missing value': [2, '2020-01-01T00:00:00+00:00'],
+            'null values': [1, None, None],
+            'infinite page': [float('inf'), '2020-01-01T00:00:00+00:00',
+                              '1'],
+            'huge page': [2 ** 63, '2020-01-01T00:00:00+00:00', '1'],
+            'huge id': [2, '2020-01-01T00:00:00+00:00', str(2 ** 63)],
+        }
+        post_id = self.expected[0]
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'test_user'}),
+            reverse('posts:post_detail', kwargs={'post_id': post_id}),
+            reverse('posts:post_comments', kwargs={'post_id': post_id}),
+        )
+        for case, raw in cursors.items():
+            cursor = base64.urlsafe_b64encode(
+                json.dumps(raw).encode()).decode()
+            with self.subTest(case=case):
+                with self.assertRaises(InvalidCursor):
+                    paginator.page_after(cursor)
+                for url in urls:
+                    for direction in ('after', 'before'):
+                        response = self.client.get(url, {direction: cursor})
+                        self.assertEqual(response.status_code, 200)
+                response = self.client.get(
+                    reverse('posts:index'), {'after': cursor})
+                self.assertEqual(response.context['page_obj'].number, 1)
+
+    def test_cursor_before_newest_post_gives_first_page(self):
+        """Перед курсором из будущего нет записей - первая страница."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        cursor = base64.urlsafe_b64encode(json.dumps(
+            [2, '2099-01-01T00:00:00+00:00', '1']).encode()).decode()
+        page = paginator.page_before(cursor)
+        self.assertEqual(page.number, 1)
+        self.assertEqual(self.ids(page), self.expected[:10])
+        self.assertIsNone(page.previous_cursor)
+        self.assertIsNotNone(page.next_cursor)
+
+    def test_empty_page_has_no_cursors(self):
+        paginator = CursorPaginator(Post.objects.none(), 10)
+        page = paginator._get_page([], 2, paginator,
+                                   has_next=True, has_previous=True)
+        self.assertIsNone(page.next_cursor)
+        self.assertIsNone(page.previous_cursor)
+
+    def test_elided_page_range(self):
+        paginator = CursorPaginator(Post.objects.all(), 1)
+        gap = paginator.ELLIPSIS
+        cases = {
+            1: [1, 2, 3, 4, gap, 24, 25],
+            7: [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, gap, 24, 25],
+            12: [1, 2, gap, 9, 10, 11, 12, 13, 14, 15, gap, 24, 25],
+            25: [1, 2, gap, 22, 23, 24, 25],
+        }
+        for number, expected in cases.items():
+            with self.subTest(number=number):
+                self.assertEqual(
+                    paginator.get_elided_page_range(number), expected)
+
+    def test_elided_page_range_without_count(self):
+        paginator = CursorPaginator(Post.objects.all(), 1,
+                                    count_mode=COUNT_NONE)
+        page = paginator.page_after(paginator.page(11).next_cursor)
+        self.assertEqual(page.number, 12)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                page.elided_page_range,
+                [1, 2, paginator.ELLIPSIS, 9, 10, 11, 12, 13,
+                 paginator.ELLIPSIS])
+
+    def test_template_renders_window_only(self):
+        with self.settings(POST_PER_PAGE=1):
+            response = self.client.get(reverse('posts:index'),
+                                       {'page': 12})
+        self.assertContains(response, '?page=15"')
+        self.assertContains(response, '?page=25"')
+        self.assertNotContains(response, '?page=20"')
@@ -0,0 +1,86 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTest(TransactionTestCase):
+    """Страницы укладываются в бюджеты settings.QUERY_BUDGETS.
+
+    При превышении QueryProfilingMiddleware бросает QueryBudgetExceeded,
+    и тест падает. Кеш карточек очищается, чтобы мерить холодный путь.
+    Внутри TestCase транзакция view превращается в SAVEPOINT, а BEGIN и
+    COMMIT не выполняются, поэтому запросы считаются вне его.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание'
+        )
+        self.user = User.objects.create_user(username='test_user')
+        for number in range(15):
+            self.post = Post.objects.create(
+                author=self.user, text=f'Запись #{number}', group=self.group)
+            Comment.objects.create(post=self.post, author=self.user,
+                                   text=f'Комментарий #{number}')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_read_views(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+            reverse('posts:profile', kwargs={'username': 'test_user'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk}),
+            reverse('posts:post_create'),
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+        )
+        for url in urls:
+            for client in (self.client, self.authorized_client):
+                with self.subTest(url=url):
+                    client.get(url)
+
+    def test_write_views(self):
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Новая запись', 'group': self.group.pk})
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            {'text': 'Измененная запись', 'group': self.group.pk})
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Новый комментарий'})
+
+    def test_write_views_with_image(self):
+        media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, media_root, True)
+        image = io.BytesIO()
+        Image.new('RGB', (40, 20), 'red').save(image, 'JPEG')
+        with self.settings(MEDIA_ROOT=media_root):
+            for url in (reverse('posts:post_create'),
+                        reverse('posts:post_edit',
+                                kwargs={'post_id': self.post.pk})):
+                with self.subTest(url=url):
+                    self.authorized_client.post(url, {
+                        'text': 'Запись с картинкой',
+                        'group': self.group.pk,
+                        'image': SimpleUploadedFile('picture.jpg',
+                                                    image.getvalue()),
+                    })
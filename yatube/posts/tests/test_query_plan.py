@@ -0,0 +1,44 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Comment, Post
+from posts.utils import benchmark, query_plan
+
+
+class ExplainFeedsTest(TestCase):
+    def setUp(self):
+        benchmark.seed(40, 5, 2, 30, log=lambda message: None)
+
+    def test_all_views_are_checked(self):
+        requests, _ = query_plan.default_requests()
+        self.assertEqual(query_plan.uncovered_views(requests), set())
+
+    def test_feed_queries_use_indexes(self):
+        """Ленты, профиль и комментарии не сканируют таблицы целиком."""
+        out = StringIO()
+        call_command('explain_feeds', '--strict', stdout=out)
+        self.assertIn('с проблемами: 0', out.getvalue())
+        # Проверка ничего не оставляет в базе
+        self.assertEqual(Comment.objects.count(), 30)
+
+    def test_unindexed_filter_is_reported(self):
+        sql, params = Post.objects.filter(text='x').query.sql_with_params()
+        planned = query_plan.PlannedQuery(
+            'test', sql, query_plan.explain(sql, params))
+        self.assertEqual(len(planned.problems), 1)
+        self.assertTrue(planned.problems[0].startswith('SCAN posts_post'))
+
+    def test_is_problem(self):
+        select = 'SELECT * FROM posts_post WHERE group_id = %s'
+        self.assertTrue(query_plan.is_problem('SCAN posts_post', select))
+        self.assertTrue(query_plan.is_problem(
+            'USE TEMP B-TREE FOR ORDER BY', select))
+        self.assertTrue(query_plan.is_problem(
+            'SCAN posts_post USING INDEX post_pub_date_idx', select))
+        self.assertFalse(query_plan.is_problem(
+            'SCAN posts_post USING INDEX post_pub_date_idx',
+            'SELECT * FROM posts_post ORDER BY pub_date DESC LIMIT 10'))
+        self.assertFalse(query_plan.is_problem(
+            'SCAN posts_group', 'SELECT * FROM posts_group'))
@@ -0,0 +1,110 @@
+import base64
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.tasks import run_pending
+from posts.models import Post
+from posts.utils.search import decode_cursor, search_posts
+
+User = get_user_model()
+
+
+class PostSearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+
+    def setUp(self):
+        self.client = Client()
+        self.strong = Post.objects.create(
+            author=self.user, text='Котики котики котики и собаки')
+        self.weak = Post.objects.create(
+            author=self.user,
+            text='Длинный рассказ о погоде, море, горах, лесах и котиках')
+        self.other = Post.objects.create(author=self.user, text='Про собак')
+        # Индекс обновляют фоновые задачи
+        run_pending()
+
+    def test_ranked_by_relevance(self):
+        posts, _ = search_posts('котик')
+        self.assertEqual(posts, [self.strong, self.weak])
+
+    def test_index_follows_edit_and_delete(self):
+        self.other.text = 'Теперь про котиков'
+        self.other.save()
+        run_pending()
+        posts, _ = search_posts('котик')
+        self.assertIn(self.other, posts)
+        self.strong.delete()
+        run_pending()
+        posts, _ = search_posts('котик')
+        self.assertNotIn(self.strong, posts)
+
+    def test_keyset_pages(self):
+        for number in range(5):
+            Post.objects.create(author=self.user, text=f'Котик номер {number}')
+        run_pending()
+        seen = []
+        cursor = None
+        while True:
+            posts, page = search_posts('котик', cursor, limit=3)
+            seen += posts
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
+
+    def test_query_syntax_is_escaped(self):
+        posts, _ = search_posts('"котик OR NEAR(')
+        self.assertEqual(posts, [])
+
+    def test_control_characters_are_ignored(self):
+        for query in ['\x00', 'котик\x00', 'кот\x00ик']:
+            with self.subTest(query=query):
+                search_posts(query)
+        self.assertEqual(search_posts('котик\x00')[0],
+                         [self.strong, self.weak])
+        response = self.client.get(reverse('posts:search'), {'q': '\x00'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_out_of_range_cursor_is_invalid(self):
+        for key in [[1.0, 2 ** 63], [1.0, 0], ['Infinity', 1],
+                    [1e999, 1], [1.0, None]]:
+            with self.subTest(key=key):
+                cursor = base64.urlsafe_b64encode(
+                    json.dumps(key).encode()).decode()
+                self.assertIsNone(decode_cursor(cursor))
+                response = self.client.get(reverse('posts:search'),
+                                           {'q': 'котик', 'after': cursor})
+                self.assertEqual(response.status_code, 200)
+
+    def test_search_view(self):
+        response = self.client.get(reverse('posts:search'), {'q': 'собак'})
+        self.assertEqual(response.context['posts'],
+                         [self.other, self.strong])
+        self.assertContains(response, 'Про собак')
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM posts_post_fts')
+        self.assertEqual(search_posts('собак')[0], [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(search_posts('собак')[0]), 2)
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin:posts_post_changelist'),
+                                   {'q': 'котик'})
+        self.assertEqual(
+            set(response.context['cl'].result_list),
+            {self.strong, self.weak})
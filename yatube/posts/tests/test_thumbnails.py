@@ -0,0 +1,70 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from posts.utils.thumbnails import generate_thumbnail
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostThumbnailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF,
+                                     content_type='image/gif'),
+        )
+
+    def test_placeholder_until_thumbnail_is_ready(self):
+        """Пока миниатюры нет, страница не строит ее сама."""
+        response = Client().get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        self.assertContains(response, 'thumbnail-placeholder.svg')
+
+    def test_generate_thumbnail(self):
+        name = generate_thumbnail(self.post.pk)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.thumbnail.name, name)
+        self.assertTrue(default_storage.exists(name))
+        response = Client().get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        self.assertContains(response, self.post.thumbnail.url)
+
+    def test_new_image_resets_thumbnail(self):
+        generate_thumbnail(self.post.pk)
+        post = Post.objects.get(pk=self.post.pk)
+        post.image = SimpleUploadedFile('other.gif', SMALL_GIF,
+                                        content_type='image/gif')
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.thumbnail.name, '')
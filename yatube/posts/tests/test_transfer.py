@@ -0,0 +1,97 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from posts.models import Comment, Group, Post, User
+from posts.utils import transfer
+from posts.utils.search import search_posts
+
+
+class ContentTransferTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author',
+                                            password='secret')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test_slug', description='...')
+        for number in range(5):
+            post = Post.objects.create(
+                author=cls.user, text=f'Запись про котиков #{number}',
+                group=cls.group if number % 2 else None)
+            Comment.objects.create(post=post, author=cls.user,
+                                   text=f'Комментарий #{number}')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def snapshot(self):
+        return (
+            list(Post.objects.order_by('pk').values_list(
+                'pk', 'author__username', 'group__slug', 'text', 'pub_date')),
+            list(Comment.objects.order_by('pk').values_list(
+                'pk', 'post_id', 'author__username', 'text', 'created')),
+        )
+
+    def export(self, fmt='ndjson'):
+        call_command('export_content', self.directory, format=fmt,
+                     stdout=StringIO())
+
+    def clear(self):
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        User.objects.all().delete()
+
+    def import_(self, fmt='ndjson', **options):
+        call_command('import_content', self.directory, format=fmt,
+                     batch_size=2, stdout=StringIO(), **options)
+
+    def test_round_trip(self):
+        for fmt in transfer.FORMATS:
+            with self.subTest(fmt=fmt):
+                before = self.snapshot()
+                self.export(fmt)
+                self.clear()
+                self.import_(fmt)
+                self.assertEqual(self.snapshot(), before)
+                user = User.objects.get(username='author')
+                self.assertTrue(user.check_password('secret'))
+                self.assertEqual(Group.objects.get().posts_count, 2)
+                self.assertEqual(len(search_posts('котик')[0]), 5)
+
+    def test_import_skips_existing_rows(self):
+        self.export()
+        before = self.snapshot()
+        self.import_()
+        self.assertEqual(self.snapshot(), before)
+
+    def test_resume_from_checkpoint(self):
+        self.export()
+        Comment.objects.filter(pk__gt=Comment.objects.order_by('pk')[1].pk
+                               ).delete()
+        transfer.save_checkpoint(self.directory, {
+            'users': 1, 'groups': 1, 'posts': 5, 'comments': 2})
+        # Уже загруженные строки не читаются: их удаление не вернется
+        Comment.objects.order_by('pk').first().delete()
+        self.import_(resume=True, skip_rebuild=True)
+        self.assertEqual(Comment.objects.count(), 4)
+        with open(os.path.join(self.directory,
+                               transfer.CHECKPOINT_FILE)) as source:
+            self.assertEqual(json.load(source)['comments'], 5)
+
+    def test_unknown_author(self):
+        self.export()
+        with open(transfer.data_path(self.directory, 'posts', 'ndjson'),
+                  'a', encoding='utf-8') as output:
+            output.write(json.dumps({
+                'id': 100, 'author__username': 'nobody', 'group__slug': None,
+                'text': '...', 'pub_date': '2022-01-01T00:00:00+00:00',
+                'image': ''}) + '\n')
+        with self.assertRaisesMessage(CommandError, "username='nobody'"):
+            self.import_()
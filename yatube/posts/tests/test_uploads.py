@@ -0,0 +1,164 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core.storage import is_content_addressed
+from core.tasks import run_pending
+from posts.models import Post
+from posts.utils.uploads import (ImageUploadHandler, process_image,
+                                 reset_upload_stats, upload_stats)
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(size, image_format='JPEG', mode='RGB'):
+    output = io.BytesIO()
+    Image.new(mode, size, 'red').save(output, image_format)
+    return output.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_MAX_SIDE=100)
+class ImageUploadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+        reset_upload_stats()
+
+    def create_post(self, content, name='picture.jpg', text='С картинкой'):
+        return self.client.post(reverse('posts:post_create'), {
+            'text': text,
+            'image': SimpleUploadedFile(name, content),
+        })
+
+    def test_upload_is_reencoded_by_worker(self):
+        content = make_image((400, 200))
+        digest = hashlib.sha256(content).hexdigest()
+        response = self.create_post(content)
+        self.assertRedirects(
+            response, reverse('posts:profile', args=[self.user.username]))
+        post = Post.objects.get(text='С картинкой')
+        self.assertEqual(post.image_source, digest)
+        # До выполнения задачи картинки у поста нет
+        self.assertEqual(post.image.name, '')
+
+        run_pending()
+        post.refresh_from_db()
+        self.assertTrue(is_content_addressed(post.image.name))
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        with default_storage.open(post.image.name) as image_file:
+            self.assertEqual(Image.open(image_file).size, (100, 50))
+        self.assertFalse(default_storage.exists(f'uploads/{digest}'))
+        # Сохранение картинки поставило в очередь миниатюру
+        run_pending()
+        post.refresh_from_db()
+        self.assertNotEqual(post.thumbnail.name, '')
+
+    def test_transparent_image_stays_png(self):
+        content = make_image((50, 50), 'PNG', 'RGBA')
+        self.create_post(content, name='picture.png')
+        run_pending()
+        post = Post.objects.get(text='С картинкой')
+        self.assertTrue(post.image.name.endswith('.png'))
+
+    def test_not_an_image_is_rejected(self):
+        response = self.create_post(b'not an image' * 100, name='file.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(response, 'image_form', 'image',
+                             'Файл не является картинкой')
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(upload_stats()['rejected'], 1)
+
+    def test_unsupported_format_is_rejected(self):
+        response = self.create_post(make_image((10, 10), 'BMP'),
+                                    name='picture.bmp')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['image_form'].is_valid())
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(IMAGE_UPLOAD_MAX_BYTES=1024 * 1024)
+    def test_oversized_file_is_not_written(self):
+        content = make_image((10, 10)) + b'\0' * (2 * 1024 * 1024)
+        response = self.create_post(content)
+        self.assertFalse(response.context['image_form'].is_valid())
+        self.assertFalse(Post.objects.exists())
+        self.assertLessEqual(upload_stats()['bytes_max'], 1024 * 1024)
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=100 * 100)
+    def test_too_many_pixels_is_rejected(self):
+        response = self.create_post(make_image((200, 200)))
+        self.assertFormError(response, 'image_form', 'image',
+                             'Слишком большая картинка: 200x200')
+
+    def test_memory_buffer_is_bounded(self):
+        # Шум почти не сжимается: файл около мегабайта
+        image = Image.frombytes('RGB', (600, 600), os.urandom(600 * 600 * 3))
+        output = io.BytesIO()
+        image.save(output, 'PNG')
+        self.create_post(output.getvalue(), name='noise.png')
+        stats = upload_stats()
+        self.assertGreater(stats['bytes_max'], 1024 * 1024)
+        self.assertLessEqual(
+            stats['buffer_max'],
+            ImageUploadHandler.chunk_size + settings.IMAGE_HEADER_MAX_BYTES)
+
+    def test_duplicate_upload_reuses_file(self):
+        content = make_image((300, 300))
+        self.create_post(content, text='Первый')
+        run_pending()
+        self.create_post(content, text='Второй')
+        first = Post.objects.get(text='Первый')
+        second = Post.objects.get(text='Второй')
+        # Картинка второго поста готова сразу, без задачи
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(upload_stats()['deduplicated'], 1)
+
+    def test_stale_upload_is_not_applied(self):
+        self.create_post(make_image((300, 300)))
+        post = Post.objects.get(text='С картинкой')
+        old_digest = post.image_source
+        response = self.client.post(
+            reverse('posts:post_edit', args=[post.pk]), {
+                'text': 'С картинкой',
+                'image': SimpleUploadedFile('new.jpg',
+                                            make_image((300, 300), 'PNG')),
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertIsNone(process_image(post.pk, old_digest))
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, '')
+        run_pending()
+        post.refresh_from_db()
+        self.assertNotEqual(post.image_source, old_digest)
+        self.assertTrue(post.image.name.endswith('.jpg'))
+
+    def test_edit_without_image_keeps_it(self):
+        self.create_post(make_image((300, 300)))
+        run_pending()
+        post = Post.objects.get(text='С картинкой')
+        image = post.image.name
+        self.client.post(reverse('posts:post_edit', args=[post.pk]),
+                         {'text': 'Новый текст'})
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, image)
@@ -16,11 +16,27 @@ urlpatterns = [
     path('profile/<str:username>/', views.profile, name='profile'),
     # Posts view
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    # Posts of the followed authors and groups
+    path('follow/', views.follow_index, name='follow_index'),
+    path('profile/<str:username>/follow/', views.profile_follow,
+         name='profile_follow'),
+    path('profile/<str:username>/unfollow/', views.profile_unfollow,
+         name='profile_unfollow'),
+    path('group/<slug:slug>/follow/', views.group_follow,
+         name='group_follow'),
+    path('group/<slug:slug>/unfollow/', views.group_unfollow,
+         name='group_unfollow'),
+    # Full-text search
+    path('search/', views.search, name='search'),
     # Create post
     path('create/', views.post_create, name='post_create'),
     # Post edit
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
-    path('posts/<int:post_id>/comment/', views.add_comment, name='add_comment')
+    path('posts/<int:post_id>/comment/', views.add_comment,
+         name='add_comment'),
+    # Comments page by cursor (HTML fragment or JSON)
+    path('posts/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
 ]
 
 # if settings.DEBUG:
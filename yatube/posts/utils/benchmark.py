@@ -0,0 +1,433 @@
+"""Наполнение базы и замер производительности страниц posts.
+
+Используется командой ``manage.py benchmark``.
+"""
+import asyncio
+import copy
+import io
+import random
+import shutil
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from faker import Faker
+from mixer.backend.django import mixer
+
+from core.asgi import ASGIHandler, build_environ
+from posts.models import Comment, Group, Post
+from posts.utils.counters import recount_posts
+from posts.utils.transfer import explicit_dates
+
+User = get_user_model()
+
+FILE_CACHE = 'django.core.cache.backends.filebased.FileBasedCache'
+
+SCALES = {
+    # (posts, users, groups, comments)
+    '1k': (1_000, 50, 5, 500),
+    '10k': (10_000, 500, 20, 5_000),
+    '100k': (100_000, 2_000, 100, 50_000),
+    '1m': (1_000_000, 10_000, 500, 500_000),
+}
+
+BATCH_SIZE = 5000
+TEXT_POOL_SIZE = 1000
+
+
+def _batches(total):
+    for start in range(0, total, BATCH_SIZE):
+        yield range(start, min(start + BATCH_SIZE, total))
+
+
+def seed(posts, users, groups, comments, log=print, seed_value=0):
+    """Заполняет базу до заданного объема. Уже созданное не дублирует."""
+    rng = random.Random(seed_value)
+    fake = Faker('ru_RU')
+    fake.seed_instance(seed_value)
+    texts = [fake.paragraph(nb_sentences=4) for _ in range(TEXT_POOL_SIZE)]
+
+    existing = User.objects.count()
+    missing = users - existing
+    if missing > 0:
+        with mixer.ctx(commit=False):
+            new_users = mixer.cycle(missing).blend(
+                User,
+                username=mixer.sequence(
+                    lambda number: f'bench_user_{existing + number}'),
+                password='!')
+        User.objects.bulk_create(new_users, batch_size=BATCH_SIZE)
+        log(f'users: +{missing}')
+
+    existing = Group.objects.count()
+    missing = groups - existing
+    if missing > 0:
+        with mixer.ctx(commit=False):
+            new_groups = mixer.cycle(missing).blend(
+                Group,
+                slug=mixer.sequence(
+                    lambda number: f'bench-group-{existing + number}'),
+                posts_count=0)
+        Group.objects.bulk_create(new_groups, batch_size=BATCH_SIZE)
+        log(f'groups: +{missing}')
+
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    group_ids = list(Group.objects.values_list('pk', flat=True)) + [None]
+    started = timezone.now() - timedelta(days=365)
+    step = timedelta(days=365) / max(posts, 1)
+
+    existing = Post.objects.count()
+    with explicit_dates(Post._meta.get_field('pub_date')):
+        for batch in _batches(max(posts - existing, 0)):
+            Post.objects.bulk_create(
+                Post(text=rng.choice(texts),
+                     author_id=rng.choice(user_ids),
+                     group_id=rng.choice(group_ids),
+                     pub_date=started + step * (existing + number))
+                for number in batch)
+            log(f'posts: {existing + batch.stop}/{posts}')
+
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    existing = Comment.objects.count()
+    for batch in _batches(max(comments - existing, 0)):
+        Comment.objects.bulk_create(
+            Comment(text=rng.choice(texts)[:200],
+                    author_id=rng.choice(user_ids),
+                    post_id=rng.choice(post_ids))
+            for _ in batch)
+        log(f'comments: {existing + batch.stop}/{comments}')
+
+    # bulk_create не вызывает сигналы, поэтому счетчики пересчитываем
+    recount_posts()
+
+
+class Scenario:
+    """Один сценарий нагрузки: как построить запрос к странице."""
+
+    def __init__(self, name, method, make_url, data=None, login=False):
+        self.name = name
+        self.method = method
+        self.make_url = make_url
+        self.data = data
+        self.login = login
+
+
+def default_scenarios(rng):
+    post_ids = list(Post.objects.order_by('?').values_list('pk', flat=True)
+                    [:1000])
+    slugs = list(Group.objects.order_by('?').values_list('slug', flat=True)
+                 [:100])
+    usernames = list(User.objects.filter(posts__isnull=False).distinct()
+                     .order_by('?').values_list('username', flat=True)
+                     [:100])
+    return [
+        Scenario('index', 'get', lambda: reverse('posts:index')
+                 + f'?page={rng.randint(1, 50)}'),
+        Scenario('group_posts', 'get', lambda: reverse(
+            'posts:group_list', kwargs={'slug': rng.choice(slugs)})),
+        Scenario('profile', 'get', lambda: reverse(
+            'posts:profile', kwargs={'username': rng.choice(usernames)})),
+        Scenario('post_detail', 'get', lambda: reverse(
+            'posts:post_detail', kwargs={'post_id': rng.choice(post_ids)})),
+        Scenario('post_create', 'post', lambda: reverse('posts:post_create'),
+                 data={'text': 'Запись из нагрузочного теста'}, login=True),
+        Scenario('add_comment', 'post', lambda: reverse(
+            'posts:add_comment', kwargs={'post_id': rng.choice(post_ids)}),
+            data={'text': 'Комментарий из нагрузочного теста'}, login=True),
+    ]
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1,
+                int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies, queries, elapsed):
+    return {
+        'requests': len(latencies),
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': statistics.mean(latencies) * 1000,
+        'queries_per_request': statistics.mean(queries) if queries else None,
+        'throughput_rps': len(latencies) / elapsed if elapsed else None,
+    }
+
+
+class ClientTransport:
+    """Запросы через django.test.Client в этом же процессе."""
+
+    def __init__(self, user):
+        self.anonymous = Client()
+        self.authorized = Client()
+        self.authorized.force_login(user)
+
+    def request(self, scenario):
+        client = self.authorized if scenario.login else self.anonymous
+        response = getattr(client, scenario.method)(
+            scenario.make_url(), scenario.data or {})
+        return response.status_code, response.get('X-Query-Count')
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class WSGITransport:
+    """Запросы по HTTP к локальному многопоточному WSGI-серверу."""
+
+    def __init__(self, user, host='127.0.0.1', port=0):
+        self.server = ThreadedWSGIServer((host, port), _QuietHandler)
+        self.server.set_app(get_wsgi_application())
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+        self.base_url = 'http://%s:%s' % self.server.server_address[:2]
+        client = Client()
+        client.force_login(user)
+        self.session_id = client.cookies['sessionid'].value
+        self._local = threading.local()
+
+    def _sessions(self):
+        if not hasattr(self._local, 'anonymous'):
+            self._local.anonymous = requests.Session()
+            authorized = requests.Session()
+            authorized.cookies.set('sessionid', self.session_id)
+            # Получаем csrftoken для POST-запросов
+            authorized.get(self.base_url + reverse('posts:post_create'))
+            self._local.authorized = authorized
+        return self._local.anonymous, self._local.authorized
+
+    def request(self, scenario):
+        anonymous, authorized = self._sessions()
+        session = authorized if scenario.login else anonymous
+        data = dict(scenario.data or {})
+        if scenario.method == 'post':
+            data['csrfmiddlewaretoken'] = session.cookies.get('csrftoken')
+        response = session.request(
+            scenario.method, self.base_url + scenario.make_url(),
+            data=data, allow_redirects=False)
+        return response.status_code, response.headers.get('X-Query-Count')
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _timed(transport, scenario):
+    started = time.perf_counter()
+    status, query_count = transport.request(scenario)
+    return time.perf_counter() - started, status, query_count
+
+
+def run(scenarios, transport, iterations, warmup=5, concurrency=1,
+        log=print):
+    """Прогоняет каждый сценарий iterations раз и возвращает сводку."""
+    results = {}
+    for scenario in scenarios:
+        for _ in range(warmup):
+            transport.request(scenario)
+        started = time.perf_counter()
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                samples = list(executor.map(
+                    lambda _: _timed(transport, scenario),
+                    range(iterations)))
+        else:
+            samples = [_timed(transport, scenario)
+                       for _ in range(iterations)]
+        elapsed = time.perf_counter() - started
+        latencies = [latency for latency, _, _ in samples]
+        queries = [int(count) for _, _, count in samples
+                   if count is not None]
+        summary = summarize(latencies, queries, elapsed)
+        summary['errors'] = sum(1 for _, status, _ in samples
+                                if status >= 400)
+        results[scenario.name] = summary
+        log(f"{scenario.name}: p50={summary['p50_ms']:.1f}ms "
+            f"p95={summary['p95_ms']:.1f}ms p99={summary['p99_ms']:.1f}ms "
+            f"{summary['throughput_rps']:.0f} rps")
+    return results
+
+
+def http_scope(url):
+    """ASGI scope GET-запроса к url."""
+    path, _, query = url.partition('?')
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'localhost')],
+        'server': ('localhost', 80),
+        'client': ('127.0.0.1', 0),
+    }
+
+
+def _split(total, parts):
+    """Делит total запросов между parts клиентами."""
+    return [total // parts + (index < total % parts)
+            for index in range(parts)]
+
+
+def _wsgi_slow_request(app, url, chunk_size, delay):
+    """Поток WSGI-сервера занят, пока клиент читает ответ."""
+    statuses = []
+    body = app(build_environ(http_scope(url), io.BytesIO()),
+               lambda status, headers, exc_info=None: statuses.append(
+                   int(status[:3])))
+    try:
+        for chunk in body:
+            # Каждый кусок ответа медленный клиент читает delay секунд
+            for _ in range(0, len(chunk), chunk_size):
+                time.sleep(delay)
+    finally:
+        body.close()
+    return statuses[0]
+
+
+def run_slow_wsgi(scenario, iterations, clients, workers, chunk_size,
+                  delay):
+    """clients медленных клиентов против WSGI-сервера с workers потоками."""
+    app = get_wsgi_application()
+    with ThreadPoolExecutor(max_workers=workers) as server:
+        def client(count):
+            samples = []
+            for _ in range(count):
+                started = time.perf_counter()
+                status = server.submit(
+                    _wsgi_slow_request, app, scenario.make_url(),
+                    chunk_size, delay).result()
+                samples.append((time.perf_counter() - started, status))
+            return samples
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            batches = list(pool.map(client, _split(iterations, clients)))
+    return ([sample for batch in batches for sample in batch],
+            time.perf_counter() - started)
+
+
+def run_slow_asgi(scenario, iterations, clients, workers, chunk_size,
+                  delay):
+    """То же против ASGI-адаптера с пулом из workers потоков."""
+    app = ASGIHandler(get_wsgi_application(), max_workers=workers,
+                      chunk_size=chunk_size)
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def request(url):
+        statuses = []
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+            elif message.get('body'):
+                await asyncio.sleep(delay)
+
+        await app(http_scope(url), receive, send)
+        return statuses[0]
+
+    async def client(count):
+        samples = []
+        for _ in range(count):
+            started = time.perf_counter()
+            status = await request(scenario.make_url())
+            samples.append((time.perf_counter() - started, status))
+        return samples
+
+    async def main():
+        batches = await asyncio.gather(
+            *(client(count) for count in _split(iterations, clients)))
+        return [sample for batch in batches for sample in batch]
+
+    started = time.perf_counter()
+    try:
+        samples = asyncio.run(main())
+    finally:
+        app.executor.shutdown()
+    return samples, time.perf_counter() - started
+
+
+def run_slow_clients(scenarios, iterations, clients, workers, delay,
+                     chunk_size=16 * 1024, log=print):
+    """Пропускная способность WSGI и ASGI при медленных клиентах.
+
+    Клиент читает каждые chunk_size байт ответа delay секунд. Под WSGI
+    поток сервера ждет клиента, под ASGI ждет корутина, а поток пула уже
+    выполняет следующий запрос. Сравниваются только GET-сценарии.
+    """
+    results = {}
+    for scenario in scenarios:
+        if scenario.method != 'get':
+            continue
+        results[scenario.name] = {}
+        for mode, runner in (('wsgi', run_slow_wsgi),
+                             ('asgi', run_slow_asgi)):
+            samples, elapsed = runner(scenario, iterations, clients,
+                                      workers, chunk_size, delay)
+            summary = summarize([latency for latency, _ in samples], [],
+                                elapsed)
+            summary['errors'] = sum(1 for _, status in samples
+                                    if status >= 400)
+            results[scenario.name][mode] = summary
+            log(f"{scenario.name} [{mode}]: "
+                f"p95={summary['p95_ms']:.1f}ms "
+                f"{summary['throughput_rps']:.0f} rps")
+    return results
+
+
+def compare(old, new):
+    """Изменение p95 и числа запросов относительно прошлого прогона."""
+    rows = {}
+    for name, result in new['results'].items():
+        before = old.get('results', {}).get(name)
+        if before is None:
+            continue
+        rows[name] = {
+            'p95_change': (result['p95_ms'] / before['p95_ms'] - 1
+                           if before['p95_ms'] else None),
+            'queries_change': (
+                (result['queries_per_request'] or 0)
+                - (before['queries_per_request'] or 0)),
+        }
+    return rows
+
+
+def isolated_caches():
+    """CACHES для замеров: свои ключи и каталоги файлового кеша.
+
+    Карточки и отметки изменений замеров не должны попасть в кеш сайта:
+    id постов в базе замеров совпадают с рабочими.
+    """
+    caches = copy.deepcopy(settings.CACHES)
+    for params in caches.values():
+        params['KEY_PREFIX'] = 'benchmark'
+        if params['BACKEND'] == FILE_CACHE:
+            params['LOCATION'] = params['LOCATION'].rstrip('/') + '-benchmark'
+    return caches
+
+
+def remove_file_caches(caches):
+    """Удаляет каталоги файлового кеша из isolated_caches()."""
+    for params in caches.values():
+        if params['BACKEND'] == FILE_CACHE:
+            shutil.rmtree(params['LOCATION'], ignore_errors=True)
@@ -0,0 +1,46 @@
+"""Массовая смена групп постов.
+
+bulk_update не отправляет post_save, поэтому здесь пачкой делается то
+же, что обработчики из posts/signals.py делают для одного поста:
+счетчики групп, отметки для условных GET и версии карточек.
+"""
+from collections import Counter
+
+from django.db import transaction
+
+from posts.models import Group, Post, User
+from posts.utils.conditional import POSTS, touch
+from posts.utils.counters import bump_group
+from posts.utils.fragments import bump_version
+
+
+def bulk_update_groups(posts):
+    """Сохраняет group у posts одним UPDATE и обновляет зависимое."""
+    moved = []
+    deltas = Counter()
+    for post in posts:
+        loaded = getattr(post, '_loaded_values', None) or {}
+        old_group = loaded.get('group_id', post.group_id)
+        if old_group != post.group_id:
+            moved.append(post)
+            deltas[old_group] -= 1
+            deltas[post.group_id] += 1
+    with transaction.atomic():
+        Post.objects.bulk_update(posts, ['group'])
+        for group_id, delta in deltas.items():
+            if delta:
+                bump_group(group_id, delta)
+    if not moved:
+        return
+    slugs = Group.objects.filter(pk__in=deltas).values_list('slug', flat=True)
+    usernames = User.objects.filter(
+        pk__in={post.author_id for post in moved}
+    ).values_list('username', flat=True)
+    touch(POSTS,
+          *[('post', post.pk) for post in moved],
+          *[('group', slug) for slug in slugs],
+          *[('author', username) for username in usernames])
+    for post in moved:
+        bump_version('post', post.pk)
+        post._loaded_values = dict(post._loaded_values,
+                                   group_id=post.group_id)
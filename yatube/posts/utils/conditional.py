@@ -0,0 +1,118 @@
+"""Условные GET (ETag / Last-Modified) для лент и страницы поста.
+
+Для каждой области данных - всех постов, группы, автора, поста - в кеше
+хранится время последнего изменения; его обновляют обработчики из
+posts/signals.py. Страница зависит от нескольких областей: ETag - хеш их
+времен, пользователя и PAGES_VERSION, Last-Modified - самое позднее из
+них. Совпадение проверяется до запроса страницы к базе и до шаблона,
+поэтому ответ 304 стоит одного обращения к кешу (и поиска автора для
+страницы поста).
+
+Области с ключом-строкой (группа по slug, автор по username) позволяют
+проверить ленту без запроса к базе.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import (get_conditional_response,
+                                patch_cache_control, patch_vary_headers)
+from django.utils.http import http_date
+
+CHANGED_KEY = 'changed:{scope}:{key}'
+
+# Области, у которых нет ключа
+POSTS = ('posts', '')
+GROUPS = ('groups', '')
+USERS = ('users', '')
+
+
+def _cache():
+    return caches[settings.FRAGMENT_CACHE_ALIAS]
+
+
+def touch(*scopes):
+    """Отмечает изменение областей (scope, key) после фиксации транзакции.
+
+    Отметка до фиксации открыла бы окно, в котором параллельный GET
+    получает новый ETag, но читает из базы старые строки - и потом
+    отвечает 304 на устаревшую страницу.
+    """
+    keys = [CHANGED_KEY.format(scope=scope, key=key)
+            for scope, key in scopes if key is not None]
+    if keys:
+        transaction.on_commit(lambda: _cache().set_many(
+            dict.fromkeys(keys, time.time()), None))
+
+
+def changed_at(scopes):
+    """Время последнего изменения каждой области.
+
+    Если запись вытеснена из кеша, область считается измененной сейчас:
+    лишний полный ответ безопаснее устаревшего 304.
+    """
+    keys = [CHANGED_KEY.format(scope=scope, key=key) for scope, key in scopes]
+    cache = _cache()
+    found = cache.get_many(keys)
+    missing = {key: time.time() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def validators(request, scopes):
+    """ETag и Last-Modified (секунды) страницы, зависящей от scopes."""
+    times = changed_at(scopes)
+    user = request.user.pk if request.user.is_authenticated else ''
+    source = ':'.join([settings.PAGES_VERSION, str(user)]
+                      + [repr(value) for value in times])
+    etag = 'W/"%s"' % hashlib.md5(source.encode()).hexdigest()
+    return etag, int(max(times))
+
+
+def conditional_page(get_scopes):
+    """Декоратор view: отвечает 304, если страница не менялась.
+
+    get_scopes(request, **kwargs) возвращает области, от которых зависит
+    страница, или None - тогда view выполняется как обычно (например,
+    чтобы вернуть 404).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            scopes = get_scopes(request, *args, **kwargs)
+            if scopes is None:
+                return view(request, *args, **kwargs)
+            # Версии читаются до отрисовки: изменение во время нее даст
+            # свежую страницу со старым ETag, и следующий запрос
+            # получит полный ответ
+            etag, last_modified = validators(request, scopes)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                response.setdefault('ETag', etag)
+                response.setdefault('Last-Modified',
+                                    http_date(last_modified))
+            # Страница зависит от пользователя: браузер должен
+            # переспрашивать сервер, а общие кеши - не хранить ее
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
+
+
+def viewer(request):
+    """Область подписок текущего пользователя (кнопки «Подписаться»)."""
+    if request.user.is_authenticated:
+        return [('viewer', request.user.pk)]
+    return []
@@ -0,0 +1,81 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import AuthorStats, Follow, Group, GroupFollow, Post, User
+
+
+def _bump_author_stats(author_id, field, delta, create_missing):
+    updated = AuthorStats.objects.filter(user_id=author_id).update(
+        **{field: F(field) + delta})
+    if not updated and create_missing:
+        # Счетчиков еще нет: считаем один раз по таблицам постов и подписок
+        AuthorStats.objects.get_or_create(
+            user_id=author_id,
+            defaults={
+                'posts_count': Post.objects.filter(
+                    author_id=author_id).count(),
+                'followers_count': Follow.objects.filter(
+                    author_id=author_id).count(),
+            })
+
+
+def bump_author(author_id, delta, create_missing=True):
+    """Изменяет счетчик постов автора на delta."""
+    _bump_author_stats(author_id, 'posts_count', delta, create_missing)
+
+
+def bump_author_followers(author_id, delta, create_missing=True):
+    """Изменяет счетчик подписчиков автора на delta."""
+    _bump_author_stats(author_id, 'followers_count', delta, create_missing)
+
+
+def bump_group(group_id, delta):
+    """Изменяет счетчик постов группы на delta."""
+    if group_id is not None:
+        Group.objects.filter(pk=group_id).update(
+            posts_count=F('posts_count') + delta)
+
+
+def bump_group_followers(group_id, delta):
+    """Изменяет счетчик подписчиков группы на delta."""
+    Group.objects.filter(pk=group_id).update(
+        followers_count=F('followers_count') + delta)
+
+
+def author_posts_count(author_id):
+    """Число постов автора из счетчика (без COUNT по постам).
+
+    Счетчики создаются вместе с пользователем (см. posts/signals.py);
+    если строки все же нет, посты считаются COUNT без записи в базу:
+    функция вызывается на страницах, которые читают с реплики.
+    """
+    count = AuthorStats.objects.filter(user_id=author_id).values_list(
+        'posts_count', flat=True).first()
+    if count is None:
+        return Post.objects.filter(author_id=author_id).count()
+    return count
+
+
+@transaction.atomic
+def recount_posts():
+    """Пересчитывает все счетчики по таблицам постов и подписок."""
+    per_group = (Post.objects.filter(group=OuterRef('pk'))
+                 .order_by().values('group')
+                 .annotate(total=Count('pk')).values('total'))
+    followers = (GroupFollow.objects.filter(group=OuterRef('pk'))
+                 .order_by().values('group')
+                 .annotate(total=Count('pk')).values('total'))
+    Group.objects.update(posts_count=Coalesce(Subquery(per_group), 0),
+                         followers_count=Coalesce(Subquery(followers), 0))
+
+    AuthorStats.objects.all().delete()
+    totals = (User.objects.annotate(
+        total=Count('posts', distinct=True),
+        followers=Count('following', distinct=True),
+    ).values_list('pk', 'total', 'followers').iterator())
+    AuthorStats.objects.bulk_create(
+        (AuthorStats(user_id=pk, posts_count=total,
+                     followers_count=followers)
+         for pk, total, followers in totals),
+        batch_size=1000)
@@ -0,0 +1,107 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core.cache import is_atomic
+
+VERSION_KEY = 'fragment:v:{kind}:{pk}'
+CARD_KEY = 'fragment:card:{template}:{pk}:{versions}'
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def _cache():
+    return caches[settings.FRAGMENT_CACHE_ALIAS]
+
+
+def _fresh_version():
+    # Версия, которой заведомо не было раньше: если ключ версии вытеснен
+    # из кеша, старые фрагменты не станут снова актуальными
+    return int(time.time() * 1000)
+
+
+def bump_version(kind, pk):
+    """Инвалидирует все фрагменты, зависящие от объекта kind/pk.
+
+    Неатомарный incr (файловый кеш) может потерять одно из двух
+    одновременных увеличений, и фрагменты останутся со старой версией.
+    Для такого кеша версия заменяется новой, большей прежней: из двух
+    одновременных записей выживет одна, но обе отличаются от старой.
+    """
+    if pk is None:
+        return
+    cache = _cache()
+    key = VERSION_KEY.format(kind=kind, pk=pk)
+    if is_atomic(cache):
+        try:
+            cache.incr(key)
+            return
+        except ValueError:
+            pass
+    cache.set(key, max(_fresh_version(), cache.get(key, 0) + 1), None)
+
+
+def _versions(posts):
+    """Версии поста, группы и автора для каждой карточки за один запрос."""
+    keys = {}
+    for post in posts:
+        keys[post.pk] = (
+            VERSION_KEY.format(kind='post', pk=post.pk),
+            VERSION_KEY.format(kind='group', pk=post.group_id),
+            VERSION_KEY.format(kind='author', pk=post.author_id),
+        )
+    cache = _cache()
+    found = cache.get_many({key for triple in keys.values()
+                            for key in triple})
+    missing = {key: _fresh_version()
+               for triple in keys.values() for key in triple
+               if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {pk: '.'.join(str(found[key]) for key in triple)
+            for pk, triple in keys.items()}
+
+
+def render_cards(posts, template_name):
+    """Возвращает HTML карточек постов, отрисовывая только устаревшие."""
+    posts = list(posts)
+    versions = _versions(posts)
+    card_keys = {
+        post.pk: CARD_KEY.format(template=template_name, pk=post.pk,
+                                 versions=versions[post.pk])
+        for post in posts
+    }
+    cache = _cache()
+    cached = cache.get_many(card_keys.values())
+    cards = []
+    rendered = {}
+    for post in posts:
+        key = card_keys[post.pk]
+        html = cached.get(key)
+        if html is None:
+            html = render_to_string(template_name, {'post': post})
+            rendered[key] = html
+        cards.append(mark_safe(html))
+    if rendered:
+        cache.set_many(rendered, settings.FRAGMENT_CACHE_TIMEOUT)
+    with _stats_lock:
+        _stats['hits'] += len(posts) - len(rendered)
+        _stats['misses'] += len(rendered)
+    return cards
+
+
+def stats():
+    """Счетчики попаданий и промахов кеша карточек в этом процессе."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.update(hits=0, misses=0)
@@ -1,9 +1,333 @@
+import base64
+import json
+
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# Режимы подсчета общего числа записей
+COUNT_EXACT = 'exact'
+COUNT_ESTIMATE = 'estimate'
+COUNT_NONE = 'none'
+
+FEED_ORDERING = ('-pub_date', '-id')
+
+
+# Наибольшее целое, которое базы принимают в запросе (BIGINT)
+MAX_INTEGER = 2 ** 63 - 1
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def _in_range(value):
+    """Значение из курсора годится для условия WHERE."""
+    if value is None:
+        return False
+    if isinstance(value, int):
+        return -MAX_INTEGER <= value <= MAX_INTEGER
+    return True
+
+
+class CursorPage(Page):
+    """Страница, которая сама знает, есть ли следующая и предыдущая.
+
+    Соседние страницы определяются по лишней выбранной записи, поэтому
+    ни ``has_next``, ни ``has_previous`` не требуют COUNT(*).
+    """
+
+    def __init__(self, object_list, number, paginator,
+                 has_next=False, has_previous=False):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<CursorPage %s>' % self.number
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+    @cached_property
+    def elided_page_range(self):
+        """Номера страниц для навигации, см. get_elided_page_range."""
+        return self.paginator.get_elided_page_range(
+            self.number, has_next=self.has_next())
+
+    @cached_property
+    def next_cursor(self):
+        if not self.has_next() or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self[-1], self.number + 1)
+
+    @cached_property
+    def previous_cursor(self):
+        if not self.has_previous() or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self[0],
+                                            max(self.number - 1, 1))
+
+    def start_index(self):
+        if not self.object_list:
+            return 0
+        return self.paginator.per_page * (self.number - 1) + 1
+
+    def end_index(self):
+        return self.start_index() + len(self) - 1 if self.object_list else 0
+
+
+class CursorPaginator(Paginator):
+    """Keyset-паджинатор по полям ``ordering`` (по умолчанию pub_date, id).
+
+    Переход на соседнюю страницу выполняется запросом
+    ``WHERE (pub_date, id) < (...) LIMIT per_page + 1`` и не зависит от
+    глубины страницы. Номерные страницы (``?page=N``) по-прежнему
+    доступны через OFFSET.
+
+    ``count_mode``:
+      * ``exact`` - обычный COUNT(*);
+      * ``estimate`` - COUNT(*) по подзапросу, ограниченному
+        ``PAGINATOR_ESTIMATE_LIMIT`` записями;
+      * ``none`` - общее число записей не считается вовсе.
+    Если заранее известное число записей передано в ``count``,
+    запрос не выполняется ни в одном из режимов.
+    """
+
+    def __init__(self, object_list, per_page, ordering=FEED_ORDERING,
+                 count_mode=COUNT_EXACT, count=None, **kwargs):
+        self.ordering = tuple(ordering)
+        self.count_mode = count_mode
+        self._known_count = count
+        super().__init__(object_list.order_by(*self.ordering), per_page,
+                         **kwargs)
+
+    @cached_property
+    def count(self):
+        if self._known_count is not None:
+            return self._known_count
+        if self.count_mode == COUNT_NONE:
+            return None
+        if self.count_mode == COUNT_ESTIMATE:
+            limit = settings.PAGINATOR_ESTIMATE_LIMIT
+            return self.object_list.order_by()[:limit].count()
+        return super().count
+
+    @cached_property
+    def count_is_estimate(self):
+        return (self._known_count is None
+                and self.count_mode == COUNT_ESTIMATE
+                and self.count >= settings.PAGINATOR_ESTIMATE_LIMIT)
+
+    @cached_property
+    def num_pages(self):
+        if self.count is None:
+            return None
+        return super().num_pages
+
+    @property
+    def page_range(self):
+        if self.num_pages is None:
+            return range(0)
+        return super().page_range
+
+    ELLIPSIS = '…'
+
+    def get_elided_page_range(self, number, on_each_side=None, on_ends=None,
+                              has_next=False):
+        """Компактный список номеров страниц вместо page_range.
+
+        Первые и последние on_ends страниц и on_each_side страниц вокруг
+        текущей; пропуски между ними - ELLIPSIS. Если точное число
+        страниц неизвестно (режимы none и estimate, а также страницы по
+        курсору), список кончается последней заведомо существующей
+        страницей и ELLIPSIS.
+        """
+        if on_each_side is None:
+            on_each_side = settings.PAGINATOR_ON_EACH_SIDE
+        if on_ends is None:
+            on_ends = settings.PAGINATOR_ON_ENDS
+        exact = self.num_pages is not None and not self.count_is_estimate
+        # Номер из курсора может оказаться за концом после удалений
+        if exact:
+            number = min(number, self.num_pages)
+        last = max(self.num_pages or 0, number + has_next)
+        window = set(range(1, min(on_ends, last) + 1))
+        window.update(range(max(number - on_each_side, 1),
+                            min(number + on_each_side, last) + 1))
+        if exact:
+            window.update(range(max(last - on_ends + 1, 1), last + 1))
+
+        pages = []
+        previous = 0
+        for page in sorted(window):
+            if page - previous == 2:
+                # Вместо многоточия на месте одной страницы - ее номер
+                pages.append(previous + 1)
+            elif page - previous > 2:
+                pages.append(self.ELLIPSIS)
+            pages.append(page)
+            previous = page
+        if not exact and (previous < last or has_next
+                          or self.count_is_estimate):
+            pages.append(self.ELLIPSIS)
+        return pages
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def get_page(self, number):
+        try:
+            return self.page(number)
+        except PageNotAnInteger:
+            return self.page(1)
+        except EmptyPage:
+            if self.num_pages:
+                return self.page(self.num_pages)
+            return self.page(1)
+
+    def page(self, number):
+        """Страница по номеру (OFFSET), без обращения к count."""
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('That page contains no results')
+        return self._get_page(rows[:self.per_page], number, self,
+                              has_next=len(rows) > self.per_page,
+                              has_previous=number > 1)
+
+    def page_after(self, cursor):
+        """Страница, следующая за записью из курсора."""
+        number, values = self.decode_cursor(cursor)
+        rows = list(self.object_list.filter(
+            self._keyset_filter(values, reverse=False)
+        )[:self.per_page + 1])
+        return self._get_page(rows[:self.per_page], number, self,
+                              has_next=len(rows) > self.per_page,
+                              has_previous=True)
+
+    def page_before(self, cursor):
+        """Страница, предшествующая записи из курсора."""
+        number, values = self.decode_cursor(cursor)
+        reversed_ordering = [self._invert(field) for field in self.ordering]
+        rows = list(self.object_list.filter(
+            self._keyset_filter(values, reverse=True)
+        ).order_by(*reversed_ordering)[:self.per_page + 1])
+        if not rows:
+            # Курсор новее всех записей: перед ним ничего нет
+            return self.page(1)
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return self._get_page(rows, number, self,
+                              has_next=True,
+                              has_previous=has_previous)
+
+    def _get_page(self, *args, **kwargs):
+        return CursorPage(*args, **kwargs)
+
+    def encode_cursor(self, obj, number):
+        values = [
+            self._field(name).value_to_string(obj)
+            for name in self._field_names
+        ]
+        raw = json.dumps([number] + values).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            number, *values = json.loads(
+                base64.urlsafe_b64decode(padded.encode()))
+            values = [
+                self._field(name).to_python(value)
+                for name, value in zip(self._field_names, values)
+            ]
+            number = int(number)
+        except (TypeError, ValueError, AttributeError, OverflowError,
+                ValidationError):
+            raise InvalidCursor(cursor)
+        if (not 1 <= number <= MAX_INTEGER
+                or len(values) != len(self._field_names)
+                or any(not _in_range(value) for value in values)):
+            raise InvalidCursor(cursor)
+        return number, values
+
+    @cached_property
+    def _field_names(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def _field(self, name):
+        return self.object_list.model._meta.get_field(name)
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else '-' + field
+
+    def _keyset_filter(self, values, reverse):
+        """Строит условие (a, b) < (x, y) в виде OR-цепочки.
+
+        Для ordering ('-a', '-b'): a <= x AND (a < x OR (a = x AND b < y)).
+        Избыточное a <= x позволяет базе искать по диапазону индекса,
+        а не просматривать его с начала.
+        """
+        condition = Q()
+        bound = None
+        equal = {}
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            lookup = 'lt' if descending else 'gt'
+            if bound is None:
+                bound = Q(**{f'{name}__{lookup}e': value})
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return bound & condition
+
 
+def get_page_context(queryset, request, count=None, count_mode=None,
+                     ordering=FEED_ORDERING, per_page=None,
+                     paginator_class=CursorPaginator, strict=False):
+    """Страница для шаблона: по курсору (after/before) или по номеру.
 
-def get_page_context(queryset, request):
-    paginator = Paginator(queryset, settings.POST_PER_PAGE)
+    Неверный курсор дает первую страницу, а со strict - InvalidCursor:
+    клиент API, получивший вместо следующей страницы первую, листал бы
+    ее по кругу.
+    """
+    paginator = paginator_class(
+        queryset,
+        per_page or settings.POST_PER_PAGE,
+        ordering=ordering,
+        count_mode=count_mode or settings.PAGINATOR_COUNT_MODE,
+        count=count,
+    )
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    try:
+        if after:
+            return paginator.page_after(after)
+        if before:
+            return paginator.page_before(before)
+    except InvalidCursor:
+        if strict:
+            raise
     # Из URL извлекаем номер запрошенной страницы - это значение параметра page
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
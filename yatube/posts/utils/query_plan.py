@@ -0,0 +1,178 @@
+"""Проверка планов SQL-запросов страниц posts.
+
+Каждая страница из posts.urls запрашивается тестовым клиентом, все
+выполненные SELECT перехватываются и для каждого уникального запроса
+выполняется ``EXPLAIN QUERY PLAN``. Просмотр таблицы или индекса целиком
+(SCAN) для запроса с условием и сортировка во временном B-дереве
+считаются проблемой.
+
+Используется командой ``manage.py explain_feeds``.
+"""
+import re
+
+from urllib.parse import urlencode
+
+from django.db import connection, transaction
+from django.http import QueryDict
+from django.test import Client
+from django.urls import reverse
+
+from core.profiling import fingerprint
+from posts import urls as posts_urls
+from posts.models import Comment, Post
+from posts.utils.search import FTS_TABLE
+
+# SCAN по виртуальной таблице FTS5 - поиск по ее собственному индексу
+_SCAN = re.compile(r'^SCAN (?!.*VIRTUAL TABLE)')
+_TEMP_SORT = 'USE TEMP B-TREE'
+_WHERE = re.compile(r'\bWHERE\b')
+_NEXT_CURSOR = re.compile(r'after=([\w-]+)')
+
+
+class PlannedQuery:
+    def __init__(self, url_name, sql, plan):
+        self.url_name = url_name
+        self.sql = sql
+        self.plan = plan
+
+    @property
+    def problems(self):
+        return [line for line in self.plan if is_problem(line, self.sql)]
+
+
+def is_problem(line, sql):
+    if _TEMP_SORT in line:
+        # Сортировку по релевантности (bm25) индексом не покрыть
+        return FTS_TABLE not in sql
+    if _SCAN.match(line):
+        # Без WHERE SCAN - это либо чтение всей таблицы по смыслу (список
+        # групп для формы), либо проход по индексу в порядке ORDER BY
+        # до LIMIT. С условием же строки должны находиться через SEARCH
+        return bool(_WHERE.search(sql))
+    return False
+
+
+def explain(sql, params):
+    """Строки плана запроса (столбец detail EXPLAIN QUERY PLAN)."""
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+class _Recorder:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith('SELECT'):
+            self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+def default_requests():
+    """Запросы (имя URL, метод, url, данные, нужен ли вход) ко всем
+    страницам posts и пользователь для страниц, требующих входа."""
+    post = (Post.objects.filter(group__isnull=False, comments__isnull=False)
+            .select_related('author', 'group').first()
+            or Post.objects.select_related('author', 'group').first())
+    if post is None:
+        return [], None
+    comment_post_id = (Comment.objects.values_list('post_id', flat=True)
+                       .first() or post.pk)
+    group_slug = post.group.slug if post.group else None
+    requests = [
+        ('index', 'get', reverse('posts:index'), None, False),
+        ('index', 'get', reverse('posts:index') + '?page=2', None, False),
+        ('profile', 'get', reverse(
+            'posts:profile', kwargs={'username': post.author.username}),
+         None, False),
+        ('post_detail', 'get', reverse(
+            'posts:post_detail', kwargs={'post_id': comment_post_id}),
+         None, False),
+        ('post_comments', 'get', reverse(
+            'posts:post_comments', kwargs={'post_id': comment_post_id}),
+         None, False),
+        ('search', 'get', reverse('posts:search') + '?' + urlencode(
+            {'q': (post.text.split() or ['a'])[0]}), None, False),
+        ('post_create', 'get', reverse('posts:post_create'), None, True),
+        ('post_edit', 'get', reverse(
+            'posts:post_edit', kwargs={'post_id': post.pk}), None, True),
+        ('add_comment', 'post', reverse(
+            'posts:add_comment', kwargs={'post_id': post.pk}),
+         {'text': 'explain'}, True),
+    ]
+    if group_slug:
+        group_kwargs = {'slug': group_slug}
+        requests += [
+            ('group_list', 'get', reverse(
+                'posts:group_list', kwargs=group_kwargs), None, False),
+            ('group_follow', 'get', reverse(
+                'posts:group_follow', kwargs=group_kwargs), None, True),
+        ]
+    other = (Post.objects.exclude(author=post.author)
+             .values_list('author__username', flat=True).first())
+    if other:
+        requests.append(('profile_follow', 'get', reverse(
+            'posts:profile_follow', kwargs={'username': other}), None, True))
+    # Лента читается после подписок, отписки - в конце
+    requests.append(
+        ('follow_index', 'get', reverse('posts:follow_index'), None, True))
+    if other:
+        requests.append(('profile_unfollow', 'get', reverse(
+            'posts:profile_unfollow', kwargs={'username': other}), None, True))
+    if group_slug:
+        requests.append(('group_unfollow', 'get', reverse(
+            'posts:group_unfollow', kwargs=group_kwargs), None, True))
+    return requests, post.author
+
+
+def uncovered_views(requests):
+    """Имена URL posts, для которых нет ни одного запроса."""
+    names = {pattern.name for pattern in posts_urls.urlpatterns}
+    return names - {name for name, *_ in requests}
+
+
+def next_page_url(url, response):
+    """Адрес следующей страницы по курсору из ответа или None."""
+    match = _NEXT_CURSOR.search(response.content.decode())
+    if match is None:
+        return None
+    path, _, query = url.partition('?')
+    params = QueryDict(query, mutable=True)
+    params.pop('page', None)
+    params['after'] = match.group(1)
+    return f'{path}?{params.urlencode()}'
+
+
+def collect(requests, user):
+    """Выполняет запросы и возвращает уникальные SELECT с их планами.
+
+    Для страниц со ссылкой "Следующая" запрашивается и она, чтобы
+    проверить keyset-запросы. Все изменения (сессия, комментарий)
+    откатываются.
+    """
+    recorders = {}
+    anonymous = Client()
+    authorized = Client()
+    with transaction.atomic():
+        authorized.force_login(user)
+        for url_name, method, url, data, login in requests:
+            client = authorized if login else anonymous
+            recorder = recorders.setdefault(url_name, _Recorder())
+            with connection.execute_wrapper(recorder):
+                response = getattr(client, method)(url, data or {})
+                next_url = next_page_url(url, response)
+                if next_url:
+                    client.get(next_url)
+        planned = []
+        seen = set()
+        for url_name, recorder in recorders.items():
+            for sql, params in recorder.queries:
+                key = (url_name, fingerprint(sql))
+                if key in seen:
+                    continue
+                seen.add(key)
+                planned.append(PlannedQuery(
+                    url_name, sql, explain(sql, params)))
+        transaction.set_rollback(True)
+    return planned
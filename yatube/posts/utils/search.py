@@ -0,0 +1,180 @@
+"""Полнотекстовый поиск по постам.
+
+Бэкенд выбирается настройкой POSTS_SEARCH_BACKEND. Для SQLite по
+умолчанию используется FTS5 (таблица posts_post_fts создается миграцией
+0009), для прочих баз - LikeSearchBackend без ранжирования.
+
+search() возвращает страницу попаданий - пары (post_id, score) в порядке
+релевантности - и ключ следующей страницы для keyset-паджинации.
+"""
+import base64
+import json
+import math
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.utils.functional import SimpleLazyObject
+from django.utils.module_loading import import_string
+
+from posts.models import Post
+from posts.utils.paginator import MAX_INTEGER
+
+FTS_TABLE = 'posts_post_fts'
+# Управляющие символы: NUL обрывает строку запроса FTS5
+CONTROL_CHARACTERS = re.compile(r'[\x00-\x1f\x7f]')
+
+
+class SearchPage:
+    def __init__(self, hits, has_next):
+        self.hits = hits
+        # Ключ keyset-паджинации - (score, post_id) последнего попадания
+        self.next_key = None
+        if has_next and hits:
+            post_id, score = hits[-1]
+            self.next_key = (score, post_id)
+
+    @property
+    def post_ids(self):
+        return [post_id for post_id, _ in self.hits]
+
+    @property
+    def next_cursor(self):
+        if self.next_key is None:
+            return None
+        raw = json.dumps(self.next_key).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Ключ (score, post_id) из курсора или None, если курсор испорчен."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        score, post_id = json.loads(base64.urlsafe_b64decode(padded))
+        score, post_id = float(score), int(post_id)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    if not math.isfinite(score) or not 0 < post_id <= MAX_INTEGER:
+        return None
+    return score, post_id
+
+
+class BaseSearchBackend:
+    """Интерфейс поискового бэкенда."""
+
+    def index(self, post):
+        raise NotImplementedError
+
+    def remove(self, post_id):
+        raise NotImplementedError
+
+    def search(self, query, after=None, limit=10):
+        raise NotImplementedError
+
+    def reindex(self, queryset, batch_size=1000):
+        """Полностью перестраивает индекс по queryset."""
+        self.clear()
+        for post in queryset.only('pk', 'text').iterator(
+                chunk_size=batch_size):
+            self.index(post)
+
+    def clear(self):
+        pass
+
+
+class LikeSearchBackend(BaseSearchBackend):
+    """Поиск LIKE по Post.text: без индекса и ранжирования.
+
+    Запасной вариант для баз без FTS5; порядок - от новых постов к старым.
+    """
+
+    def index(self, post):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def search(self, query, after=None, limit=10):
+        posts = Post.objects.all()
+        for word in query.split():
+            posts = posts.filter(text__icontains=word)
+        if after is not None:
+            posts = posts.filter(pk__lt=after[1])
+        ids = list(posts.order_by('-pk').values_list('pk', flat=True)
+                   [:limit + 1])
+        hits = [(post_id, 0.0) for post_id in ids[:limit]]
+        return SearchPage(hits, len(ids) > limit)
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    """Инвертированный индекс SQLite FTS5 с ранжированием bm25."""
+
+    @staticmethod
+    def match_expression(query):
+        # Каждое слово - отдельная фраза с префиксным поиском, чтобы
+        # операторы FTS5 во вводе пользователя не ломали запрос
+        query = CONTROL_CHARACTERS.sub(' ', query)
+        words = [word.replace('"', '""') for word in query.split()]
+        return ' '.join(f'"{word}"*' for word in words if word)
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, text) '
+                f'VALUES (%s, %s)', [post.pk, post.text])
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                           [post_id])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def search(self, query, after=None, limit=10):
+        expression = self.match_expression(query)
+        if not expression:
+            return SearchPage([], False)
+        # rank - встроенный столбец FTS5 со значением bm25(): чем меньше,
+        # тем документ релевантнее
+        sql = (f'SELECT rowid, rank FROM {FTS_TABLE} '
+               f'WHERE {FTS_TABLE} MATCH %s')
+        params = [expression]
+        if after is not None:
+            sql += ' AND (rank > %s OR (rank = %s AND rowid > %s))'
+            params += [after[0], after[0], after[1]]
+        sql += ' ORDER BY rank, rowid LIMIT %s'
+        params.append(limit + 1)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        hits = [(post_id, score) for post_id, score in rows[:limit]]
+        return SearchPage(hits, len(rows) > limit)
+
+
+def fts5_available():
+    return connection.vendor == 'sqlite'
+
+
+def _load_backend():
+    path = settings.POSTS_SEARCH_BACKEND
+    if path is None:
+        path = ('posts.utils.search.SQLiteFTS5Backend' if fts5_available()
+                else 'posts.utils.search.LikeSearchBackend')
+    return import_string(path)()
+
+
+backend = SimpleLazyObject(_load_backend)
+
+
+def search_posts(query, cursor=None, limit=None):
+    """Посты по запросу в порядке релевантности и курсор следующей страницы.
+    """
+    page = backend.search(query, after=decode_cursor(cursor),
+                          limit=limit or settings.POST_PER_PAGE)
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        page.post_ids)
+    return [posts[pk] for pk in page.post_ids if pk in posts], page
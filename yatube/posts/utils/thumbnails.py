@@ -0,0 +1,52 @@
+"""Миниатюры картинок постов.
+
+Миниатюру строит фоновая задача posts.tasks.generate_thumbnail, а для
+уже существующих постов - команда backfill_thumbnails.
+"""
+import django
+from django.conf import settings
+from django.db import connections
+
+
+def init_worker():
+    # Рабочий процесс запускается через spawn и настраивает Django заново
+    django.setup()
+
+
+def generate_thumbnail(post_id):
+    """Строит миниатюру поста и сохраняет ее имя в Post.thumbnail.
+
+    Возвращает имя файла миниатюры или None, если картинки нет.
+    """
+    from sorl.thumbnail import get_thumbnail
+
+    from posts.models import Post
+    from posts.utils.conditional import POSTS, touch
+    from posts.utils.fragments import bump_version
+
+    post = (Post.objects.select_related('author', 'group')
+            .only('image', 'author__username', 'group__slug')
+            .filter(pk=post_id).first())
+    if post is None or not post.image:
+        return None
+    thumbnail = get_thumbnail(post.image,
+                              settings.POST_THUMBNAIL_GEOMETRY,
+                              **settings.POST_THUMBNAIL_OPTIONS)
+    # Картинку могли заменить, пока строилась миниатюра
+    updated = Post.objects.filter(
+        pk=post_id, image=post.image.name
+    ).update(thumbnail=thumbnail.name)
+    if updated:
+        # update() не вызывает сигналы: страницы с постом отмечаем сами
+        bump_version('post', post_id)
+        touch(POSTS, ('post', post_id), ('author', post.author.username),
+              ('group', post.group.slug if post.group else None))
+        return thumbnail.name
+    return None
+
+
+def generate_in_worker(post_id):
+    try:
+        return generate_thumbnail(post_id)
+    finally:
+        connections.close_all()
@@ -0,0 +1,186 @@
+"""Материализованные ленты подписок (fan-out on write).
+
+Новый пост раскладывается фоновой задачей posts.tasks.fan_out пачками
+по TIMELINE_FANOUT_BATCH в ленты подписчиков автора и группы - это
+записи TimelineEntry. Лента хранит не больше TIMELINE_MAX_LENGTH самых
+новых записей. Посты авторов и групп, у которых не меньше
+TIMELINE_CELEBRITY_FOLLOWERS подписчиков, по лентам не раскладываются,
+а подмешиваются при чтении (fan-out on read).
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import CharField, Q, Value
+
+from posts.models import (AuthorStats, Follow, Group, GroupFollow, Post,
+                          TimelineEntry)
+from posts.utils.paginator import (COUNT_NONE, FEED_ORDERING,
+                                   CursorPaginator, get_page_context)
+
+# Ключ записи ленты (pub_date, post_id) совпадает с ключом поста (pub_date,
+# id), поэтому курсоры обоих вариантов ленты взаимозаменяемы
+TIMELINE_ORDERING = ('-pub_date', '-post_id')
+
+
+def is_celebrity(followers_count):
+    return followers_count >= settings.TIMELINE_CELEBRITY_FOLLOWERS
+
+
+def _author_followers(author_id):
+    return AuthorStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True).first() or 0
+
+
+def _group_followers(group_id):
+    return Group.objects.filter(pk=group_id).values_list(
+        'followers_count', flat=True).first() or 0
+
+
+def _batches(values, size):
+    batch = []
+    for value in values:
+        batch.append(value)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def trim_timelines(user_ids):
+    """Удаляет из лент записи сверх TIMELINE_MAX_LENGTH самых новых."""
+    table = TimelineEntry._meta.db_table
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE id IN ('
+            f'SELECT id FROM (SELECT id, ROW_NUMBER() OVER ('
+            f'PARTITION BY user_id ORDER BY pub_date DESC, post_id DESC'
+            f') AS position FROM {table} WHERE user_id IN ({placeholders})'
+            f') AS ranked WHERE position > %s)',
+            [*user_ids, settings.TIMELINE_MAX_LENGTH])
+        return cursor.rowcount
+
+
+def fan_out(post_id):
+    """Раскладывает пост по лентам подписчиков.
+
+    Возвращает число лент, в которые пост был записан.
+    """
+    post = (Post.objects.only('pk', 'pub_date', 'author_id', 'group_id')
+            .filter(pk=post_id).first())
+    if post is None:
+        return 0
+    sources = []
+    if not is_celebrity(_author_followers(post.author_id)):
+        sources.append(Follow.objects.filter(
+            author_id=post.author_id).values_list('user_id', flat=True))
+    if post.group_id and not is_celebrity(_group_followers(post.group_id)):
+        sources.append(GroupFollow.objects.filter(
+            group_id=post.group_id).values_list('user_id', flat=True))
+    if not sources:
+        return 0
+
+    # Обрезка ленты дороже записи, поэтому выполняется не для каждого
+    # поста: лента может ненадолго превысить предел
+    trim = post.pk % settings.TIMELINE_TRIM_EVERY == 0
+    followers = sources[0].union(*sources[1:]).iterator()
+    written = 0
+    for batch in _batches(followers, settings.TIMELINE_FANOUT_BATCH):
+        with transaction.atomic():
+            TimelineEntry.objects.bulk_create(
+                [TimelineEntry(user_id=user_id, post_id=post.pk,
+                               pub_date=post.pub_date)
+                 for user_id in batch],
+                ignore_conflicts=True)
+            if trim:
+                trim_timelines(batch)
+        written += len(batch)
+    return written
+
+
+def backfill(user_id, posts):
+    """Добавляет в ленту последние посты из posts (после подписки)."""
+    rows = (posts.order_by(*FEED_ORDERING)
+            .values_list('pk', 'pub_date')[:settings.TIMELINE_MAX_LENGTH])
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in rows],
+        ignore_conflicts=True)
+    trim_timelines([user_id])
+
+
+def follow_author(user_id, author_id):
+    if not is_celebrity(_author_followers(author_id)):
+        backfill(user_id, Post.objects.filter(author_id=author_id))
+
+
+def follow_group(user_id, group_id):
+    if not is_celebrity(_group_followers(group_id)):
+        backfill(user_id, Post.objects.filter(group_id=group_id))
+
+
+def unfollow_author(user_id, author_id):
+    # Пост остается в ленте, если пользователь подписан на его группу
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id,
+    ).exclude(post__group__followers__user_id=user_id).delete()
+
+
+def unfollow_group(user_id, group_id):
+    # Пост остается в ленте, если пользователь подписан на его автора
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__group_id=group_id,
+    ).exclude(post__author__following__user_id=user_id).delete()
+
+
+def celebrity_follows(user):
+    """Авторы и группы из подписок пользователя, которых нет в его ленте.
+    """
+    threshold = settings.TIMELINE_CELEBRITY_FOLLOWERS
+    authors = (Follow.objects
+               .filter(user=user,
+                       author__stats__followers_count__gte=threshold)
+               .annotate(kind=Value('author', CharField()))
+               .values_list('author_id', 'kind'))
+    groups = (GroupFollow.objects
+              .filter(user=user, group__followers_count__gte=threshold)
+              .annotate(kind=Value('group', CharField()))
+              .values_list('group_id', 'kind'))
+    follows = {'author': [], 'group': []}
+    for pk, kind in authors.union(groups, all=True):
+        follows[kind].append(pk)
+    return follows['author'], follows['group']
+
+
+class TimelinePaginator(CursorPaginator):
+    """Паджинатор по записям ленты; на страницах - сами посты."""
+
+    def _get_page(self, entries, *args, **kwargs):
+        return super()._get_page([entry.post for entry in entries],
+                                 *args, **kwargs)
+
+    def encode_cursor(self, post, number):
+        return super().encode_cursor(
+            TimelineEntry(pub_date=post.pub_date, post_id=post.pk), number)
+
+
+def get_feed_page(user, request):
+    """Страница ленты подписок пользователя.
+
+    Обычно это один проход по индексу ленты (user, pub_date, post).
+    """
+    authors, groups = celebrity_follows(user)
+    if not (authors or groups):
+        entries = (TimelineEntry.objects.filter(user=user)
+                   .select_related('post__author', 'post__group'))
+        return get_page_context(entries, request, count_mode=COUNT_NONE,
+                                ordering=TIMELINE_ORDERING,
+                                paginator_class=TimelinePaginator)
+    # Посты «знаменитостей» читаем напрямую, остальные - из ленты
+    posts = (Post.objects
+             .filter(Q(pk__in=TimelineEntry.objects.filter(user=user)
+                       .values('post_id'))
+                     | Q(author_id__in=authors)
+                     | Q(group_id__in=groups))
+             .select_related('author', 'group'))
+    return get_page_context(posts, request, count_mode=COUNT_NONE)
@@ -0,0 +1,287 @@
+"""Потоковая выгрузка и загрузка контента: пользователи, группы, посты,
+комментарии.
+
+Выгрузка - каталог с файлом на каждую модель в формате NDJSON (строка -
+JSON-объект) или CSV. Строки читаются ``iterator()`` по BATCH_SIZE,
+поэтому память не зависит от объема базы. Автор и группа записываются
+по username и slug, посты и комментарии сохраняют свои id.
+
+Загрузка идет пачками ``bulk_create`` в порядке зависимостей. Внешние
+ключи разрешаются по словарям username -> id и slug -> id в памяти.
+После каждой пачки в каталог выгрузки пишется контрольная точка, так
+что прерванную загрузку можно продолжить. ``bulk_create`` не вызывает
+сигналы, поэтому счетчики и поисковый индекс перестраиваются в конце, а
+области условных GET (posts/utils/conditional.py) отмечаются измененными.
+
+Используется командами ``manage.py export_content`` и ``import_content``.
+"""
+import csv
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from posts.models import Comment, Group, Post
+from posts.utils.conditional import GROUPS, POSTS, USERS, touch
+
+User = get_user_model()
+
+BATCH_SIZE = 2000
+FORMATS = ('ndjson', 'csv')
+CHECKPOINT_FILE = 'checkpoint.json'
+
+# Поля выгрузки каждой модели; «__» - поле связанной модели
+FIELDS = {
+    'users': (User, ('username', 'password', 'first_name', 'last_name',
+                     'email', 'is_active', 'is_staff', 'is_superuser',
+                     'date_joined')),
+    'groups': (Group, ('slug', 'title', 'description')),
+    'posts': (Post, ('id', 'author__username', 'group__slug', 'text',
+                     'pub_date', 'image')),
+    'comments': (Comment, ('id', 'post_id', 'author__username', 'text',
+                           'created')),
+}
+# Порядок загрузки: сначала то, на что ссылаются
+MODELS = ('users', 'groups', 'posts', 'comments')
+
+# В CSV нет null: пустая строка в этих полях - отсутствие связи
+_NULLABLE = ('group__slug', 'post_id')
+_BOOLEANS = ('is_active', 'is_staff', 'is_superuser')
+_DATES = ('date_joined', 'pub_date', 'created')
+
+
+class TransferError(Exception):
+    pass
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Временно отключает auto_now_add, чтобы задать даты при наполнении."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Throughput:
+    """Счетчик строк и скорости загрузки или выгрузки одной модели."""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def __str__(self):
+        rate = self.rows / self.elapsed if self.elapsed else 0
+        return (f'{self.name}: {self.rows} строк за {self.elapsed:.1f} с '
+                f'({rate:.0f} строк/с)')
+
+
+def data_path(directory, name, fmt):
+    return os.path.join(directory, f'{name}.{fmt}')
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return int(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def _write_csv(rows, output, fields):
+    writer = csv.writer(output)
+    writer.writerow(fields)
+    count = 0
+    for row in rows:
+        writer.writerow([_csv_value(value) for value in row])
+        count += 1
+    return count
+
+
+def _write_ndjson(rows, output, fields):
+    count = 0
+    for row in rows:
+        output.write(json.dumps(
+            dict(zip(fields, row)), ensure_ascii=False,
+            default=lambda value: value.isoformat()))
+        output.write('\n')
+        count += 1
+    return count
+
+
+def export(directory, fmt='ndjson', names=MODELS, batch_size=BATCH_SIZE,
+           log=print):
+    """Выгружает модели names в каталог directory."""
+    os.makedirs(directory, exist_ok=True)
+    stats = []
+    for name in names:
+        model, fields = FIELDS[name]
+        rows = (model.objects.order_by('pk').values_list(*fields)
+                .iterator(chunk_size=batch_size))
+        counter = Throughput(name)
+        with open(data_path(directory, name, fmt), 'w', newline='',
+                  encoding='utf-8') as output:
+            write = _write_csv if fmt == 'csv' else _write_ndjson
+            counter.rows = write(rows, output, fields)
+        log(str(counter))
+        stats.append(counter)
+    return stats
+
+
+def _read_rows(path, fmt):
+    with open(path, newline='', encoding='utf-8') as source:
+        if fmt == 'csv':
+            yield from csv.DictReader(source)
+        else:
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _clean(row):
+    """Приводит строку CSV или NDJSON к значениям полей модели."""
+    row = dict(row)
+    for field in _NULLABLE:
+        if row.get(field) == '':
+            row[field] = None
+    for field in _BOOLEANS:
+        if field in row and isinstance(row[field], str):
+            row[field] = row[field] not in ('0', 'False', 'false')
+    for field in _DATES:
+        if isinstance(row.get(field), str):
+            row[field] = parse_datetime(row[field])
+    return row
+
+
+class _Resolver:
+    """Словари натуральных ключей -> id для разрешения внешних ключей."""
+
+    def __init__(self):
+        self.maps = {}
+
+    def get(self, model, field, value, line):
+        if value is None:
+            return None
+        if model not in self.maps:
+            self.maps[model] = dict(
+                model.objects.values_list(field, 'pk').iterator())
+        try:
+            return self.maps[model][value]
+        except KeyError:
+            raise TransferError(
+                f'строка {line}: нет {model._meta.model_name} '
+                f'с {field}={value!r}')
+
+
+def _build(name, row, resolver, line):
+    row = _clean(row)
+    if name == 'users':
+        return User(**row)
+    if name == 'groups':
+        return Group(**row)
+    if name == 'posts':
+        return Post(
+            id=int(row['id']),
+            author_id=resolver.get(User, 'username',
+                                   row['author__username'], line),
+            group_id=resolver.get(Group, 'slug', row['group__slug'], line),
+            text=row['text'], pub_date=row['pub_date'],
+            image=row['image'] or '')
+    return Comment(
+        id=int(row['id']),
+        post_id=row['post_id'] and int(row['post_id']),
+        author_id=resolver.get(User, 'username',
+                               row['author__username'], line),
+        text=row['text'], created=row['created'])
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def load_checkpoint(directory):
+    path = os.path.join(directory, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as source:
+        return json.load(source)
+
+
+def save_checkpoint(directory, checkpoint):
+    # Запись через временный файл: обрыв не оставит битую точку
+    path = os.path.join(directory, CHECKPOINT_FILE)
+    with open(path + '.tmp', 'w') as output:
+        json.dump(checkpoint, output)
+    os.replace(path + '.tmp', path)
+
+
+def import_(directory, fmt='ndjson', names=MODELS, batch_size=BATCH_SIZE,
+            resume=False, log=print):
+    """Загружает выгрузку из каталога directory.
+
+    Уже существующие строки (тот же username, slug или id) пропускаются,
+    поэтому повторная загрузка пачки после сбоя безопасна. С resume
+    пачки до контрольной точки пропускаются без обращения к базе.
+    """
+    checkpoint = load_checkpoint(directory) if resume else {}
+    resolver = _Resolver()
+    dates = [Post._meta.get_field('pub_date'),
+             Comment._meta.get_field('created')]
+    stats = []
+    with explicit_dates(*dates):
+        for name in names:
+            path = data_path(directory, name, fmt)
+            if not os.path.exists(path):
+                continue
+            model = FIELDS[name][0]
+            done = checkpoint.get(name, 0)
+            counter = Throughput(name)
+            rows = enumerate(_read_rows(path, fmt), start=1)
+            for batch in _batches(rows, batch_size):
+                if batch[-1][0] <= done:
+                    continue
+                try:
+                    objects = [_build(name, row, resolver, line)
+                               for line, row in batch if line > done]
+                except TransferError as error:
+                    raise TransferError(f'{os.path.basename(path)}, {error}')
+                with transaction.atomic():
+                    model.objects.bulk_create(objects,
+                                              ignore_conflicts=True)
+                counter.rows += len(objects)
+                checkpoint[name] = batch[-1][0]
+                save_checkpoint(directory, checkpoint)
+                log(str(counter))
+            # Новые пользователи и группы нужны следующим моделям
+            resolver.maps.pop(model, None)
+            stats.append(counter)
+    # id постов и комментариев заданы явно - сдвигаем последовательности
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(),
+                                                     [Post, Comment]):
+            cursor.execute(sql)
+    # Каждая лента и страница поста зависит хотя бы от одной из них
+    touch(POSTS, GROUPS, USERS)
+    return stats
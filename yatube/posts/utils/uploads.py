@@ -0,0 +1,259 @@
+"""Загрузка картинок постов.
+
+Путь картинки от запроса до Post.image:
+
+  1. ImageUploadHandler пишет файл на диск кусками по мере чтения
+     запроса, попутно считая sha256. По первым байтам (заголовку) он
+     проверяет формат и размеры, и негодный файл дальше не пишется.
+     Больше IMAGE_UPLOAD_MAX_BYTES на диск не попадает, в памяти - один
+     кусок запроса и не больше IMAGE_HEADER_MAX_BYTES заголовка.
+  2. attach_image: если картинка с таким хешем уже перекодирована, пост
+     просто ссылается на тот же файл. Иначе исходник переносится (без
+     копирования) в IMAGE_STAGING_DIR, а перекодирование ставится в
+     очередь.
+  3. Задача posts.tasks.process_image в процессе воркера уменьшает
+     картинку до IMAGE_MAX_SIDE точек, сохраняет ее в хранилище Post.image
+     (имя по содержимому, см. core/storage.py) и записывает в пост, если
+     тот не успел получить другую.
+
+Замеры каждой загрузки (байты на диске, буфер в памяти, время)
+пишутся в лог и копятся в upload_stats().
+"""
+import hashlib
+import io
+import logging
+import resource
+import threading
+import time
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+_stats_lock = threading.Lock()
+_stats = {
+    'uploads': 0,
+    'rejected': 0,
+    'deduplicated': 0,
+    'bytes_max': 0,
+    'buffer_max': 0,
+    'decoded_bytes_max': 0,
+}
+
+
+def _record(**values):
+    with _stats_lock:
+        for name, value in values.items():
+            if name.endswith('_max'):
+                _stats[name] = max(_stats[name], value)
+            else:
+                _stats[name] += value
+
+
+def upload_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_upload_stats():
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """Потоковая запись загружаемых файлов на диск с проверкой заголовка.
+
+    Отклоненный файл не прерывает запрос: форма получает его с
+    upload_error и показывает ошибку рядом с остальными.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file = TemporaryUploadedFile(
+            self.file_name, self.content_type, 0, self.charset,
+            self.content_type_extra)
+        self.hash = hashlib.sha256()
+        # Начало файла, пока по нему не распознан заголовок
+        self.header = bytearray()
+        self.header_checked = False
+        self.size = 0
+        self.buffer_max = 0
+        self.error = None
+        self.started = time.perf_counter()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.buffer_max = max(self.buffer_max,
+                              len(raw_data) + len(self.header))
+        self.size += len(raw_data)
+        if self.error is not None:
+            return None
+        if self.size > settings.IMAGE_UPLOAD_MAX_BYTES:
+            limit = settings.IMAGE_UPLOAD_MAX_BYTES // (1024 * 1024)
+            self.error = f'Файл больше {limit} МБ'
+            return None
+        if not self.header_checked:
+            self.check_header(raw_data)
+            if self.error is not None:
+                return None
+        self.hash.update(raw_data)
+        self.file.write(raw_data)
+        return None
+
+    def check_header(self, raw_data):
+        """Формат и размеры по заголовку, не дожидаясь всего файла.
+
+        Image.open читает только заголовок и не выделяет память под
+        точки, поэтому его можно пробовать на неполном файле.
+        """
+        limit = settings.IMAGE_HEADER_MAX_BYTES
+        self.header += raw_data[:limit - len(self.header)]
+        try:
+            image = Image.open(io.BytesIO(self.header))
+        except Image.DecompressionBombError:
+            self.error = 'Слишком большая картинка'
+            return
+        except (OSError, SyntaxError, ValueError):
+            if len(self.header) >= limit:
+                self.error = 'Файл не является картинкой'
+            return
+        self.header_checked = True
+        self.header = bytearray()
+        width, height = image.size
+        if image.format not in settings.IMAGE_UPLOAD_FORMATS:
+            self.error = (f'Формат {image.format} не поддерживается, '
+                          f'нужен один из '
+                          f'{", ".join(settings.IMAGE_UPLOAD_FORMATS)}')
+        elif width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+            self.error = f'Слишком большая картинка: {width}x{height}'
+
+    def file_complete(self, file_size):
+        if not self.header_checked and self.error is None:
+            self.error = 'Файл не является картинкой'
+        written = self.file.tell()
+        self.file.seek(0)
+        # Размер присланного, а не записанного: иначе у отклоненного файла
+        # FileField увидит 0 байт и ошибка будет "файл пуст"
+        self.file.size = self.size
+        self.file.sha256 = self.hash.hexdigest()
+        self.file.upload_error = self.error
+        seconds = time.perf_counter() - self.started
+        _record(uploads=1, rejected=int(self.error is not None),
+                bytes_max=written, buffer_max=self.buffer_max)
+        logger.info('Загрузка %s: %d байт на диске, буфер %d байт, '
+                    '%.1f мс%s', self.file_name, written,
+                    self.buffer_max, seconds * 1000,
+                    f', отклонена: {self.error}' if self.error else '')
+        return self.file
+
+
+def staging_name(digest):
+    return f'{settings.IMAGE_STAGING_DIR}{digest}'
+
+
+def processed_name(digest):
+    """Уже перекодированная картинка с этим хешем исходника или None.
+
+    Пока загрузка ждет перекодирования, Post.image пуст (см.
+    attach_image), поэтому непустая картинка всегда получена из
+    image_source.
+    """
+    from posts.models import Post
+
+    names = Post.objects.filter(image_source=digest).exclude(
+        image='').values_list('image', flat=True)[:1]
+    return names[0] if names else None
+
+
+def attach_image(post, uploaded):
+    """Привязывает загруженную картинку к посту до его сохранения.
+
+    Повторно загруженная картинка берется готовой; новую после
+    сохранения поста перекодирует фоновая задача (см. posts/signals.py),
+    а до тех пор у поста нет картинки.
+    """
+    digest = uploaded.sha256
+    post.image_source = digest
+    existing = processed_name(digest)
+    if existing is not None:
+        post.image.name = existing
+        _record(deduplicated=1)
+        return
+    staged = staging_name(digest)
+    if not default_storage.exists(staged):
+        # TemporaryUploadedFile файловое хранилище переносит, а не копирует
+        default_storage.save(staged, uploaded)
+    post.image = ''
+    post._pending_image = digest
+
+
+def reencode(source):
+    """Уменьшенная картинка без метаданных: (байты, расширение, замеры)."""
+    with Image.open(source) as image:
+        width, height = image.size
+        max_side = settings.IMAGE_MAX_SIDE
+        # JPEG сразу декодируется в уменьшенном в 2-8 раз масштабе
+        image.draft('RGB', (max_side, max_side))
+        decoded = image.size[0] * image.size[1] * len(image.getbands())
+        transparent = (image.mode in ('RGBA', 'LA')
+                       or 'transparency' in image.info)
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        output = io.BytesIO()
+        if transparent:
+            image.convert('RGBA').save(output, 'PNG', optimize=True)
+            extension = 'png'
+        else:
+            image.convert('RGB').save(
+                output, 'JPEG', quality=settings.IMAGE_JPEG_QUALITY,
+                optimize=True, progressive=True)
+            extension = 'jpg'
+    return output.getvalue(), extension, {
+        'source_size': (width, height),
+        'decoded_bytes': decoded,
+    }
+
+
+def process_image(post_id, digest):
+    """Перекодирует загрузку и записывает ее в пост.
+
+    Возвращает имя файла или None, если исходника уже нет или пост
+    успел получить другую картинку.
+    """
+    from posts.models import Post
+
+    name = processed_name(digest)
+    staged = staging_name(digest)
+    if name is None:
+        if not default_storage.exists(staged):
+            return None
+        started = time.perf_counter()
+        with default_storage.open(staged) as source:
+            data, extension, measured = reencode(source)
+        field = Post._meta.get_field('image')
+        name = field.storage.save(
+            field.generate_filename(None, f'image.{extension}'),
+            ContentFile(data))
+        _record(decoded_bytes_max=measured['decoded_bytes'])
+        logger.info(
+            'Картинка %s: %dx%d -> %d байт, декодировано %d байт, '
+            'пик памяти процесса %d КБ, %.1f мс', digest,
+            *measured['source_size'], len(data), measured['decoded_bytes'],
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            (time.perf_counter() - started) * 1000)
+    if default_storage.exists(staged):
+        default_storage.delete(staged)
+
+    post = Post.objects.filter(pk=post_id, image_source=digest).first()
+    if post is None:
+        return None
+    if post.image.name != name:
+        post.image.name = name
+        # save(), а не update(): сигналы построят миниатюру и сбросят кеши
+        post.save(update_fields=['image', 'thumbnail'])
+    return name
@@ -1,13 +1,23 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-# from django.views.decorators.cache import cache_page
-from posts.utils.paginator import get_page_context
+from posts.utils import conditional
+from posts.utils.conditional import GROUPS, POSTS, USERS, conditional_page
+from posts.utils.counters import author_posts_count
+from posts.utils.paginator import COUNT_NONE, get_page_context
+from posts.utils.search import search_posts
+from posts.utils.timelines import get_feed_page
+from posts.utils.uploads import attach_image
 
-from .forms import PostForm, CommentForm
-from .models import Group, Post, User
+from .forms import CommentForm, PostForm, PostImageForm
+from .models import Comment, Follow, Group, GroupFollow, Post, User
 
+COMMENTS_ORDERING = ('-created', '-id')
 
-# @cache_page(20, key_prefix = 'index_page')
+
+@conditional_page(lambda request: [POSTS, GROUPS, USERS])
 def index(request):
     '''Main page'''
     post_list = (Post.objects.select_related("group", "author")
@@ -21,6 +31,8 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@conditional_page(lambda request, slug: [
+    ('group', slug), USERS, *conditional.viewer(request)])
 def group_posts(request, slug):
     '''Page with posts of the group'''
     # Функция get_object_or_404 получает по заданным критериям объект
@@ -32,32 +44,96 @@ def group_posts(request, slug):
     # Это аналог добавления
     # условия WHERE group_id = {group_id}
     # posts = get_list_or_404(Post.objects.order_by('-pub_date'), group=group)
-    posts = Post.objects.order_by('-pub_date').filter(group=group)
-    page_obj = get_page_context(posts, request)
+    posts = (Post.objects.select_related('author', 'group')
+             .order_by('-pub_date').filter(group=group))
+    page_obj = get_page_context(posts, request, count=group.posts_count)
     template = 'posts/group_list.html'
+    following = (request.user.is_authenticated
+                 and GroupFollow.objects.filter(
+                     user=request.user, group=group).exists())
     context = {
         'group': group,
         'page_obj': page_obj,
+        'following': following,
     }
     return render(request, template, context)
 
 
+@conditional_page(lambda request, username: [
+    ('author', username), GROUPS, *conditional.viewer(request)])
 def profile(request, username):
     user = get_object_or_404(User, username=username)
     posts = user.posts.select_related("group", "author").order_by('-pub_date')
-    count_post = posts.count()
+    # Число постов берем из счетчика, а не из COUNT(*) по постам
+    count_post = author_posts_count(user.pk)
 
-    page_obj = get_page_context(posts, request)
+    page_obj = get_page_context(posts, request, count=count_post)
+    following = (request.user.is_authenticated
+                 and Follow.objects.filter(
+                     user=request.user, author=user).exists())
 
     context = {
         'author': user,
         'page_obj': page_obj,
         'count_post': count_post,
-
+        'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@login_required
+def follow_index(request):
+    '''Posts of the followed authors and groups'''
+    page_obj = get_feed_page(request.user, request)
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/follow.html', context)
+
+
+@login_required
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        Follow.objects.get_or_create(user=request.user, author=author)
+    return redirect('posts:profile', username=username)
+
+
+@login_required
+def profile_unfollow(request, username):
+    # delete() по queryset вызывает сигналы для каждой подписки
+    Follow.objects.filter(user=request.user,
+                          author__username=username).delete()
+    return redirect('posts:profile', username=username)
+
+
+@login_required
+def group_follow(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    GroupFollow.objects.get_or_create(user=request.user, group=group)
+    return redirect('posts:group_list', slug=slug)
+
+
+@login_required
+def group_unfollow(request, slug):
+    GroupFollow.objects.filter(user=request.user, group__slug=slug).delete()
+    return redirect('posts:group_list', slug=slug)
+
+
+def search(request):
+    '''Full-text search by posts'''
+    query = request.GET.get('q', '').strip()
+    posts, page = [], None
+    if query:
+        posts, page = search_posts(query, request.GET.get('after'))
+    context = {
+        'query': query,
+        'posts': posts,
+        'next_cursor': page.next_cursor if page else None,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
@@ -70,34 +146,87 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def get_comments_page(request, post_id):
+    """Страница комментариев поста по курсору, авторы - тем же запросом."""
+    comments = (Comment.objects.filter(post_id=post_id)
+                .select_related('author'))
+    return get_page_context(comments, request,
+                            count_mode=COUNT_NONE,
+                            ordering=COMMENTS_ORDERING,
+                            per_page=settings.COMMENTS_PER_PAGE)
+
+
+def _post_detail_scopes(request, post_id):
+    author = (Post.objects.filter(pk=post_id)
+              .values_list('author__username', flat=True).first())
+    if author is None:
+        return None
+    # Комментаторы - любые пользователи, поэтому USERS
+    return [('post', post_id), ('author', author), GROUPS, USERS]
+
+
+@conditional_page(_post_detail_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    post_count = Post.objects.filter(author_id=post.author.id).count()
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id)
+    post_count = author_posts_count(post.author_id)
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
+    comments = get_comments_page(request, post.pk)
     context = {
         'post_count': post_count,
         'post': post,
+        'post_id': post.pk,
         'form': form,
         'comments': comments,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    """Следующая страница комментариев: HTML-фрагмент или JSON."""
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = get_comments_page(request, post_id)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created.isoformat(),
+                }
+                for comment in comments
+            ],
+            'next_cursor': comments.next_cursor,
+        })
+    context = {
+        'comments': comments,
+        'post_id': post_id,
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
     form = PostForm(request.POST or None)
-    if not form.is_valid():
-        return render(request, 'posts/create_post.html', {'form': form})
+    image_form = PostImageForm(request.POST or None, request.FILES or None)
+    if not all([form.is_valid(), image_form.is_valid()]):
+        return render(request, 'posts/create_post.html',
+                      {'form': form, 'image_form': image_form})
     post = form.save(commit=False)
     post.author = request.user
+    if image_form.cleaned_data['image']:
+        attach_image(post, image_form.cleaned_data['image'])
     post.save()
     return redirect('posts:profile', post.author)
 
 
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(Post.objects.select_related('author'),
+                             id=post_id)
 
     if request.user != post.author:
         return redirect('posts:profile', post.author)
@@ -106,13 +235,18 @@ def post_edit(request, post_id):
         request.POST or None,
         files=request.FILES or None,
         instance=post)
+    image_form = PostImageForm(request.POST or None, request.FILES or None)
 
-    if form.is_valid():
-        form.save()
+    if all([form.is_valid(), image_form.is_valid()]):
+        post = form.save(commit=False)
+        if image_form.cleaned_data['image']:
+            attach_image(post, image_form.cleaned_data['image'])
+        post.save()
         return redirect('posts:post_detail', post_id=post.id)
 
     context = {
         'form': form,
+        'image_form': image_form,
         'post': post,
         'is_edit': True,
     }
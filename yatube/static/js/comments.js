@@ -0,0 +1,13 @@
+// Подгружаем следующую страницу комментариев без перезагрузки страницы
+(function () {
+  var comments = document.getElementById('comments');
+  if (!comments) return;
+  comments.addEventListener('click', function (event) {
+    var link = event.target.closest('.comments-more');
+    if (!link) return;
+    event.preventDefault();
+    fetch(link.dataset.fragmentUrl)
+      .then(function (response) { return response.text(); })
+      .then(function (html) { link.outerHTML = html; });
+  });
+})();
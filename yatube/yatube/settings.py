@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     'posts.apps.PostsConfig',
     'about.apps.AboutConfig',
     'core.apps.CoreConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -51,6 +52,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.profiling.QueryProfilingMiddleware',
+    'core.db_router.ReplicaRoutingMiddleware',
+    'core.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,12 +67,21 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+# Убирать лишние пробелы из HTML-шаблонов при их разборе, см. core/minify.py
+TEMPLATE_MINIFY_HTML = True
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.ProfilingDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Время отрисовки каждого шаблона, см. core/template_loaders.py;
+            # в продакшене - с кешем (settings_production.py)
+            'loaders': [
+                ('core.template_loaders.ProfilingLoader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -82,6 +95,11 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# ASGI (yatube/asgi.py, core/asgi.py): потоков для представлений и
+# размер куска, которыми ответ отдается клиенту
+ASGI_THREADS = 8
+ASGI_CHUNK_SIZE = 16 * 1024
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -93,6 +111,25 @@ DATABASES = {
     }
 }
 
+# Реплики для чтения, см. core/db_router.py. Локально реплику можно
+# проверить вторым файлом SQLite: YATUBE_REPLICA_DB=/path/replica.sqlite3,
+# наполняет его manage.py sync_sqlite_replica
+if os.environ.get('YATUBE_REPLICA_DB'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['YATUBE_REPLICA_DB'],
+        # В тестах реплика - та же тестовая база
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.db_router.PrimaryReplicaRouter']
+# Сколько секунд после записи пользователь читает из основной базы
+REPLICA_STICKY_SECONDS = 5
+REPLICA_PIN_COOKIE = 'read_primary'
+# Реплика, отставшая сильнее, пропускается; проверка раз в интервал
+REPLICA_MAX_LAG = 10
+REPLICA_LAG_CHECK_INTERVAL = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -131,9 +168,18 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 STATIC_URL = '/static/'
-# STATIC_ROOT = os.path.join(BASE_DIR, "static")
+# Сюда собирает статику manage.py build_static, см. core/staticfiles.py
+STATIC_ROOT = os.path.join(BASE_DIR, 'static_build')
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
+# Наборы: файл, склеенный из исходников и сжатый при сборке. Шаблоны
+# подключают их тегом {% bundle %}
+STATIC_BUNDLES = {
+    'css/site.css': ['css/bootstrap.min.css', 'css/yatube.css'],
+    'js/site.js': ['js/comments.js'],
+}
+# Файлы с отпечатком в имени браузер кеширует без перепроверки
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -145,6 +191,36 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 # CONSTANTS
 POST_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+# Режим подсчета записей в паджинаторе: 'exact', 'estimate' или 'none'
+PAGINATOR_COUNT_MODE = 'exact'
+# Предел, до которого считаются записи в режиме 'estimate'
+PAGINATOR_ESTIMATE_LIMIT = 1000
+# Навигация: сколько номеров показывать вокруг текущей страницы и по краям
+PAGINATOR_ON_EACH_SIDE = 3
+PAGINATOR_ON_ENDS = 2
+# Списки в админке считают записи точно только до этого числа,
+# см. core/admin_performance.py
+ADMIN_EXACT_COUNT_LIMIT = 10000
+
+# JSON API (api/): размер страницы по умолчанию и верхняя граница ?limit=
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+# Сколько последних комментариев у поста в ?fields=comments; все
+# комментарии - по страницам в /api/v1/posts/<id>/comments/
+API_POST_COMMENTS = 3
+# Сжатие ответов, см. core/compression.py: ответы короче не сжимаются;
+# уровни - для сжатия на лету при каждом запросе
+COMPRESSION_MIN_SIZE = 200
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+COMPRESSION_CONTENT_TYPES = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+)
 
 # Change the default page of error 403 to custom page
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
@@ -152,10 +228,122 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 # Create folder to uploaded media
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Файлы с именем по содержимому (core/storage.py) не меняются: браузер
+# кеширует их без перепроверки. Команда gc_media не удаляет файлы
+# моложе MEDIA_GC_MIN_AGE секунд
+MEDIA_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+MEDIA_GC_MIN_AGE = 60 * 60
+
+# Миниатюры постов строит фоновая задача, см. core/tasks.py;
+# POST_THUMBNAIL_WORKERS - число процессов команды backfill_thumbnails
+POST_THUMBNAIL_GEOMETRY = '960x339'
+POST_THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+POST_THUMBNAIL_WORKERS = 2
+# Миниатюры sorl-thumbnail тоже хранятся под именами по содержимому
+THUMBNAIL_STORAGE = 'core.storage.ContentAddressedStorage'
+THUMBNAIL_BACKEND = (
+    'core.thumbnail_backends.ContentAddressedThumbnailBackend')
+THUMBNAIL_PREFIX = 'posts/thumbs/'
+
+# Загрузка картинок, см. posts/utils/uploads.py: файл пишется на диск по
+# мере чтения запроса, формат и размеры проверяются по заголовку
+FILE_UPLOAD_HANDLERS = ['posts.utils.uploads.ImageUploadHandler']
+IMAGE_UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+IMAGE_UPLOAD_MAX_PIXELS = 40_000_000
+IMAGE_UPLOAD_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+# Сколько байт начала файла держать в памяти, пока не найден заголовок
+IMAGE_HEADER_MAX_BYTES = 256 * 1024
+# Исходники до перекодирования и результат: не больше IMAGE_MAX_SIDE
+# точек по большей стороне
+IMAGE_STAGING_DIR = 'uploads/'
+IMAGE_MAX_SIDE = 1920
+IMAGE_JPEG_QUALITY = 85
+
+# Ленты подписок, см. posts/utils/timelines.py: длина ленты, размер
+# пачки при раскладке, частота обрезки лент и порог подписчиков, после
+# которого посты автора или группы не раскладываются, а читаются при
+# показе ленты
+TIMELINE_MAX_LENGTH = 500
+TIMELINE_FANOUT_BATCH = 500
+TIMELINE_TRIM_EVERY = 20
+TIMELINE_CELEBRITY_FOLLOWERS = 10000
+
+# Очередь фоновых задач, см. core/tasks.py. Воркеры: manage.py run_jobs.
+# JOBS_EAGER - выполнять задачи сразу при постановке в очередь
+JOBS_EAGER = False
+JOBS_WORKERS = 2
+JOBS_MAX_ATTEMPTS = 5
+# Задержка перед повтором, с: JOBS_RETRY_BACKOFF * 2^(попытка - 1)
+JOBS_RETRY_BACKOFF = 5
+JOBS_RETRY_BACKOFF_MAX = 60 * 60
+# Задание, которое выполняется дольше, считается брошенным воркером
+JOBS_LOCK_TIMEOUT = 15 * 60
+
+# Поиск по постам: None - FTS5 для SQLite, иначе LIKE;
+# либо путь к классу бэкенда из posts/utils/search.py
+POSTS_SEARCH_BACKEND = None
+
+# Профилирование запросов, см. core/profiling.py
+QUERY_PROFILING_HEADERS = DEBUG
+QUERY_REPORT_SIZE = 200
+# Сколько самых долгих шаблонов показывать в отчете для каждого URL
+TEMPLATE_REPORT_TOP = 10
+# Превышение бюджета - исключение (в тестах) или предупреждение в логе
+QUERY_BUDGET_STRICT = False
+QUERY_BUDGETS = {
+    'posts:index': 4,
+    'posts:group_list': 5,
+    'posts:profile': 6,
+    'posts:post_detail': 6,
+    'posts:post_comments': 4,
+    'posts:search': 3,
+    'posts:follow_index': 4,
+    # Запись идет в одной транзакции: BEGIN - тоже запрос. С картинкой
+    # на 2 больше: поиск уже перекодированной копии и задача
+    # перекодирования, см. posts/utils/uploads.py
+    'posts:post_create': 12,
+    'posts:post_edit': 10,
+    'posts:add_comment': 4,
+    # comments в fields - второй запрос
+    'api:post_list': 2,
+    'api:post_detail': 2,
+    'api:post_comments': 2,
+    'api:group_list': 1,
+    'api:group_detail': 1,
+    'api:profile_detail': 1,
+}
+
+# Условные GET для лент и страницы поста, см. posts/utils/conditional.py.
+# PAGES_VERSION входит в ETag: меняйте при выкладке новых шаблонов
+PAGES_VERSION = '1'
 
-# Add the CACHE tool
-CASHES = {
+# Кеш отрисованных карточек постов, см. posts/utils/fragments.py
+FRAGMENT_CACHE_ALIAS = 'default'
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Кеш: LRU в памяти процесса перед общим файловым кешем, см. core/cache.py.
+# add и incr у файлового кеша не атомарны: пересчет значения один на
+# процесс, а не на все. Для нескольких процессов нужен memcached, см.
+# settings_production.py
+CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.TieredCache',
+        'TIMEOUT': 300,
+        'KEY_FUNCTION': 'core.cache.database_key',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_MAX_ENTRIES': 1000,
+            'LOCAL_MAX_BYTES': 16 * 2 ** 20,
+            'LOCAL_TIMEOUT': 5,
+            'LOCK_TIMEOUT': 10,
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'KEY_FUNCTION': 'core.cache.database_key',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
 }
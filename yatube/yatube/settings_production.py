@@ -0,0 +1,79 @@
+"""Настройки для продакшена: DJANGO_SETTINGS_MODULE=yatube.settings_production.
+
+Отличаются от yatube/settings.py выключенным DEBUG, кешем
+разобранных шаблонов, пулом соединений с базой, общим кешем в memcached
+и статикой из манифеста (перед запуском - manage.py build_static).
+"""
+import copy
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES, DATABASES, TEMPLATES
+
+DEBUG = False
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS', 'localhost').split(',')
+
+QUERY_PROFILING_HEADERS = False
+
+# Статика из STATIC_ROOT: наборы и имена с отпечатками по манифесту,
+# см. core/staticfiles.py
+STATICFILES_STORAGE = 'core.staticfiles.BundledManifestStorage'
+
+# Шаблоны читаются и разбираются один раз на процесс, время отрисовки
+# по-прежнему замеряется
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        'OPTIONS': {
+            **TEMPLATES[0]['OPTIONS'],
+            'loaders': [
+                ('core.template_loaders.CachedLoader',
+                 TEMPLATES[0]['OPTIONS']['loaders'][0][1]),
+            ],
+        },
+    },
+]
+
+# Основная база - PostgreSQL, если задан POSTGRES_DB, иначе SQLite из
+# yatube/settings.py
+DATABASES = copy.deepcopy(DATABASES)
+if os.environ.get('POSTGRES_DB'):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ['POSTGRES_DB'],
+        'USER': os.environ.get('POSTGRES_USER', ''),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('POSTGRES_HOST', ''),
+        'PORT': os.environ.get('POSTGRES_PORT', ''),
+    }
+
+# Соединения живут в пуле процесса (core/db_pool.py). CONN_MAX_AGE = 0:
+# в конце запроса Django «закрывает» соединение, а бэкенд возвращает
+# его в пул, и следующий запрос любого потока получает уже открытое
+POOLED_ENGINES = {
+    'django.db.backends.sqlite3': 'core.db_backends.sqlite3',
+    'django.db.backends.postgresql': 'core.db_backends.postgresql',
+}
+for database in DATABASES.values():
+    database['ENGINE'] = POOLED_ENGINES.get(
+        database['ENGINE'], database['ENGINE'])
+    database['CONN_MAX_AGE'] = 0
+    database['POOL'] = {
+        'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+        'TIMEOUT': 5,
+        'IDLE_TIMEOUT': 300,
+        'HEALTH_CHECK_AFTER': 30,
+    }
+
+# Общий кеш процессов - memcached, если задан MEMCACHED_LOCATION (нужен
+# пакет pylibmc). В отличие от файлового кеша, add и incr в нем атомарны:
+# на них держатся единственный пересчет в get_or_set и версии карточек,
+# см. core/cache.py
+CACHES = copy.deepcopy(CACHES)
+if os.environ.get('MEMCACHED_LOCATION'):
+    CACHES['shared'] = {
+        'BACKEND': 'django.core.cache.backends.memcached.PyLibMCCache',
+        'LOCATION': os.environ['MEMCACHED_LOCATION'].split(','),
+        'KEY_FUNCTION': 'core.cache.database_key',
+    }
@@ -13,18 +13,37 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
+from django.conf import settings
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from core.views import (compression_report, db_pool_report, query_report,
+                        serve_media, serve_static)
 
 urlpatterns = [
     # Главная страница
     path('', include('posts.urls', namespace='posts')),
     # Старница со списком сообществ
+    # JSON API только для чтения
+    path('api/v1/', include('api.urls', namespace='api')),
+    path('admin/query-report/', query_report, name='query_report'),
+    path('admin/db-pool/', db_pool_report, name='db_pool_report'),
+    path('admin/compression/', compression_report,
+         name='compression_report'),
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('group/', include('posts.urls', namespace='group')),
     path('about/', include('about.urls', namespace='about')),
+    # Картинки постов; перед приложением их лучше отдавать nginx с тем же
+    # Cache-Control, см. core/storage.py
+    re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')),
+            serve_media, name='media'),
+    # Собранная статика (build_static); при DEBUG ее отдает runserver
+    re_path(r'^%s(?P<path>.*)$' % re.escape(settings.STATIC_URL.lstrip('/')),
+            serve_static, name='static'),
 ]
 
 handler404 = 'core.views.page_not_found'